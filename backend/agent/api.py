@@ -18,7 +18,9 @@ from utils.auth_utils import get_current_user_id_from_jwt, get_user_id_from_stre
 from utils.logger import logger
 from services.billing import check_billing_status, can_use_model
 from utils.config import config
-from sandbox.sandbox import create_sandbox, delete_sandbox, get_or_start_sandbox
+from sandbox.sandbox import delete_sandbox, get_or_start_sandbox
+from sandbox.pool import acquire_sandbox
+from daytona_sdk import FileUpload
 from services.llm import make_llm_api_call
 from run_agent_background import run_agent_background, _cleanup_redis_response_list, update_agent_run_status
 from utils.constants import MODEL_NAME_ALIASES
@@ -32,6 +34,9 @@ instance_id = None # Global instance ID for this backend instance
 # TTL for Redis response lists (24 hours)
 REDIS_RESPONSE_LIST_TTL = 3600 * 24
 
+# Maximum concurrent per-file uploads when the bulk upload falls back
+UPLOAD_CONCURRENCY = 4
+
 
 class AgentStartRequest(BaseModel):
     model_name: Optional[str] = None  # Will be set from config.MODEL_TO_USE in the endpoint
@@ -819,6 +824,63 @@ async def generate_and_update_project_name(project_id: str, prompt: str):
         # No need to disconnect DBConnection singleton instance here
         logger.info(f"Finished background naming task for project: {project_id}")
 
+async def upload_files_to_sandbox(sandbox, files: List[tuple[str, bytes]], workspace_path: str = "/workspace") -> tuple[List[str], List[str]]:
+    """
+    Upload files into a sandbox workspace and verify them with a single listing.
+
+    All files are sent in one multipart request. If that fails, they are uploaded
+    individually with bounded concurrency so one bad file doesn't fail the rest.
+
+    Returns:
+        Tuple of (uploaded target paths, filenames that failed to upload)
+    """
+    if not files:
+        return [], []
+
+    targets = {filename: f"{workspace_path}/{filename}" for filename, _ in files}
+    logger.info(f"Uploading {len(files)} files to sandbox {sandbox.id}")
+
+    failed_uploads = []
+    try:
+        await asyncio.to_thread(
+            sandbox.fs.upload_files,
+            [FileUpload(source=content, destination=targets[filename]) for filename, content in files]
+        )
+    except Exception as bulk_error:
+        logger.warning(f"Bulk upload to sandbox {sandbox.id} failed, uploading files individually: {str(bulk_error)}")
+        semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+        async def upload_one(filename: str, content: bytes):
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(sandbox.fs.upload_file, content, targets[filename])
+                except Exception as upload_error:
+                    logger.error(f"Error during sandbox upload call for {filename}: {str(upload_error)}", exc_info=True)
+                    failed_uploads.append(filename)
+
+        await asyncio.gather(*(upload_one(filename, content) for filename, content in files))
+
+    # Verify everything with one listing of the workspace
+    try:
+        files_in_dir = await asyncio.to_thread(sandbox.fs.list_files, workspace_path)
+        file_names_in_dir = {f.name for f in files_in_dir}
+    except Exception as verify_error:
+        logger.error(f"Error verifying uploaded files in sandbox {sandbox.id}: {str(verify_error)}", exc_info=True)
+        return [], [filename for filename, _ in files]
+
+    successful_uploads = []
+    for filename, _ in files:
+        if filename in failed_uploads:
+            continue
+        if filename in file_names_in_dir:
+            successful_uploads.append(targets[filename])
+            logger.info(f"Successfully uploaded and verified file {filename} to sandbox path {targets[filename]}")
+        else:
+            logger.error(f"Verification failed for {filename}: File not found in {workspace_path} after upload attempt.")
+            failed_uploads.append(filename)
+
+    return successful_uploads, failed_uploads
+
 @router.post("/agent/initiate", response_model=InitiateAgentResponse)
 async def initiate_agent_with_files(
     prompt: str = Form(...),
@@ -897,7 +959,7 @@ async def initiate_agent_with_files(
         sandbox_id = None
         try:
           sandbox_pass = str(uuid.uuid4())
-          sandbox = create_sandbox(sandbox_pass, project_id)
+          sandbox = await acquire_sandbox(sandbox_pass, project_id)
           sandbox_id = sandbox.id
           logger.info(f"Created new sandbox {sandbox_id} for project {project_id}")
           
@@ -966,53 +1028,22 @@ async def initiate_agent_with_files(
         # 4. Upload Files to Sandbox (if any)
         message_content = prompt
         if files:
-            successful_uploads = []
+            pending_uploads = []
             failed_uploads = []
             for file in files:
                 if file.filename:
                     try:
                         safe_filename = file.filename.replace('/', '_').replace('\\', '_')
-                        target_path = f"/workspace/{safe_filename}"
-                        logger.info(f"Attempting to upload {safe_filename} to {target_path} in sandbox {sandbox_id}")
-                        content = await file.read()
-                        upload_successful = False
-                        try:
-                            if hasattr(sandbox, 'fs') and hasattr(sandbox.fs, 'upload_file'):
-                                import inspect
-                                if inspect.iscoroutinefunction(sandbox.fs.upload_file):
-                                    await sandbox.fs.upload_file(content, target_path)
-                                else:
-                                    sandbox.fs.upload_file(content, target_path)
-                                logger.debug(f"Called sandbox.fs.upload_file for {target_path}")
-                                upload_successful = True
-                            else:
-                                raise NotImplementedError("Suitable upload method not found on sandbox object.")
-                        except Exception as upload_error:
-                            logger.error(f"Error during sandbox upload call for {safe_filename}: {str(upload_error)}", exc_info=True)
-
-                        if upload_successful:
-                            try:
-                                await asyncio.sleep(0.2)
-                                parent_dir = os.path.dirname(target_path)
-                                files_in_dir = sandbox.fs.list_files(parent_dir)
-                                file_names_in_dir = [f.name for f in files_in_dir]
-                                if safe_filename in file_names_in_dir:
-                                    successful_uploads.append(target_path)
-                                    logger.info(f"Successfully uploaded and verified file {safe_filename} to sandbox path {target_path}")
-                                else:
-                                    logger.error(f"Verification failed for {safe_filename}: File not found in {parent_dir} after upload attempt.")
-                                    failed_uploads.append(safe_filename)
-                            except Exception as verify_error:
-                                logger.error(f"Error verifying file {safe_filename} after upload: {str(verify_error)}", exc_info=True)
-                                failed_uploads.append(safe_filename)
-                        else:
-                            failed_uploads.append(safe_filename)
+                        pending_uploads.append((safe_filename, await file.read()))
                     except Exception as file_error:
                         logger.error(f"Error processing file {file.filename}: {str(file_error)}", exc_info=True)
                         failed_uploads.append(file.filename)
                     finally:
                         await file.close()
 
+            successful_uploads, upload_failures = await upload_files_to_sandbox(sandbox, pending_uploads)
+            failed_uploads.extend(upload_failures)
+
             if successful_uploads:
                 message_content += "\n\n" if message_content else ""
                 for file_path in successful_uploads: message_content += f"[Uploaded File: {file_path}]\n"
@@ -24,7 +24,7 @@ from agent.prompt import get_system_prompt
 from utils.logger import logger
 from utils.auth_utils import get_account_id_from_thread
 from services.billing import check_billing_status
-from agent.tools.sb_vision_tool import SandboxVisionTool
+from agent.tools.sb_vision_tool import SandboxVisionTool, pop_image_contexts
 from services.langfuse import langfuse
 from langfuse.client import StatefulTraceClient
 from services.langfuse import langfuse
@@ -382,33 +382,31 @@ async def run_agent(
                 logger.error(f"Error parsing browser state: {e}")
                 trace.event(name="error_parsing_browser_state", level="ERROR", status_message=(f"{e}"))
 
-        # Get the latest image_context message (NEW)
-        latest_image_context_msg = await client.table('messages').select('*').eq('thread_id', thread_id).eq('type', 'image_context').order('created_at', desc=True).limit(1).execute()
-        if latest_image_context_msg.data and len(latest_image_context_msg.data) > 0:
-            try:
-                image_context_content = latest_image_context_msg.data[0]["content"] if isinstance(latest_image_context_msg.data[0]["content"], dict) else json.loads(latest_image_context_msg.data[0]["content"])
-                base64_image = image_context_content.get("base64")
-                mime_type = image_context_content.get("mime_type")
-                file_path = image_context_content.get("file_path", "unknown file")
-
-                if base64_image and mime_type:
-                    temp_message_content_list.append({
-                        "type": "text",
-                        "text": f"Here is the image you requested to see: '{file_path}'"
-                    })
-                    temp_message_content_list.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{base64_image}",
-                        }
-                    })
-                else:
-                    logger.warning(f"Image context found for '{file_path}' but missing base64 or mime_type.")
-
-                await client.table('messages').delete().eq('message_id', latest_image_context_msg.data[0]["message_id"]).execute()
-            except Exception as e:
-                logger.error(f"Error parsing image context: {e}")
-                trace.event(name="error_parsing_image_context", level="ERROR", status_message=(f"{e}"))
+        # Get the images loaded by see_image since the last turn
+        try:
+            image_contexts = await pop_image_contexts(thread_id)
+        except Exception as e:
+            logger.error(f"Error loading image context: {e}")
+            trace.event(name="error_loading_image_context", level="ERROR", status_message=(f"{e}"))
+            image_contexts = []
+        for image_context_content in image_contexts:
+            base64_image = image_context_content.get("base64")
+            mime_type = image_context_content.get("mime_type")
+            file_path = image_context_content.get("file_path", "unknown file")
+
+            if base64_image and mime_type:
+                temp_message_content_list.append({
+                    "type": "text",
+                    "text": f"Here is the image you requested to see: '{file_path}'"
+                })
+                temp_message_content_list.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{mime_type};base64,{base64_image}",
+                    }
+                })
+            else:
+                logger.warning(f"Image context found for '{file_path}' but missing base64 or mime_type.")
 
         # If we have any content, construct the temporary_message
         if temp_message_content_list:
@@ -441,7 +439,7 @@ async def run_agent(
                     native_tool_calling=False,
                     execute_tools=True,
                     execute_on_stream=True,
-                    tool_execution_strategy="parallel",
+                    tool_execution_strategy="dependency",
                     xml_adding_strategy="user_message"
                 ),
                 native_max_auto_continues=native_max_auto_continues,
@@ -1,6 +1,33 @@
+import asyncio
+import hashlib
+import json
 import os
-import requests
-from typing import Dict, Any, Optional, TypedDict, Literal
+import random
+import httpx
+from typing import Dict, Any, Optional, TypedDict, Literal, NotRequired
+
+from services import redis
+from utils.logger import logger
+
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+# Longest Retry-After delay that is honoured before giving up on a retry (seconds)
+MAX_RETRY_AFTER = 10
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Shared HTTP client for all providers, so connections to RapidAPI are reused."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
 
 
 class EndpointSchema(TypedDict):
@@ -9,29 +36,41 @@ class EndpointSchema(TypedDict):
     name: str
     description: str
     payload: Dict[str, Any]
+    # Seconds to cache responses of this endpoint, overriding the provider default
+    cache_ttl: NotRequired[int]
 
 
 class RapidDataProviderBase:
-    def __init__(self, base_url: str, endpoints: Dict[str, EndpointSchema]):
+    def __init__(self, base_url: str, endpoints: Dict[str, EndpointSchema], cache_ttl: int = 0):
+        """
+        Args:
+            base_url: Base URL of the RapidAPI service
+            endpoints: Endpoint configurations by route key
+            cache_ttl: Default seconds to cache successful responses (0 disables caching)
+        """
         self.base_url = base_url
         self.endpoints = endpoints
-    
+        self.cache_ttl = cache_ttl
+
     def get_endpoints(self):
         return self.endpoints
-    
-    def call_endpoint(
+
+    async def call_endpoint(
             self,
             route: str,
             payload: Optional[Dict[str, Any]] = None
     ):
         """
         Call an API endpoint with the given parameters and data.
-        
+
+        Requests that fail with 429, a 5xx status or a transport error are
+        retried with backoff. Successful responses are cached when the endpoint
+        or provider has a cache TTL.
+
         Args:
-            endpoint (EndpointSchema): The endpoint configuration dictionary
-            params (dict, optional): Query parameters for GET requests
-            payload (dict, optional): JSON payload for POST requests
-            
+            route (str): The key of the endpoint to call
+            payload (dict, optional): Query parameters for GET requests or JSON payload for POST requests
+
         Returns:
             dict: The JSON response from the API
         """
@@ -41,21 +80,73 @@ class RapidDataProviderBase:
         endpoint = self.endpoints.get(route)
         if not endpoint:
             raise ValueError(f"Endpoint {route} not found")
-        
+
         url = f"{self.base_url}{endpoint['route']}"
-        
+        method = endpoint.get('method', 'GET').upper()
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        cache_ttl = endpoint.get('cache_ttl', self.cache_ttl)
+        cache_key = None
+        if cache_ttl:
+            request_id = json.dumps([method, url, payload or {}], sort_keys=True, default=str)
+            cache_key = f"data_provider_cache:{hashlib.sha256(request_id.encode()).hexdigest()}"
+            cached = await self._get_cached(cache_key)
+            if cached is not None:
+                logger.debug(f"Using cached response for {url}")
+                return cached
+
         headers = {
             "x-rapidapi-key": os.getenv("RAPID_API_KEY"),
             "x-rapidapi-host": url.split("//")[1].split("/")[0],
             "Content-Type": "application/json"
         }
 
-        method = endpoint.get('method', 'GET').upper()
-        
-        if method == 'GET':
-            response = requests.get(url, params=payload, headers=headers)
-        elif method == 'POST':
-            response = requests.post(url, json=payload, headers=headers)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
-        return response.json()
+        response = await self._request(method, url, payload, headers)
+        data = response.json()
+
+        if cache_key and response.is_success:
+            try:
+                await redis.set(cache_key, json.dumps(data), ex=cache_ttl)
+            except Exception as e:
+                logger.warning(f"Failed to cache data provider response for {url}: {str(e)}")
+        return data
+
+    async def _get_cached(self, cache_key: str):
+        try:
+            cached = await redis.get(cache_key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logger.warning(f"Failed to read data provider cache: {str(e)}")
+            return None
+
+    async def _request(self, method: str, url: str, payload: Optional[Dict[str, Any]], headers: Dict[str, str]) -> httpx.Response:
+        client = _get_client()
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                if method == 'GET':
+                    response = await client.get(url, params=payload, headers=headers)
+                else:
+                    response = await client.post(url, json=payload, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                logger.warning(f"Request to {url} failed (attempt {attempt}/{MAX_RETRIES}): {str(e)}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= MAX_RETRIES:
+                return response
+
+            delay = self._backoff(attempt)
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                if int(retry_after) > MAX_RETRY_AFTER:
+                    return response
+                delay = max(delay, int(retry_after))
+            logger.warning(f"Request to {url} returned {response.status_code} (attempt {attempt}/{MAX_RETRIES}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return RETRY_BACKOFF * 2 ** (attempt - 1) + random.uniform(0, RETRY_BACKOFF)
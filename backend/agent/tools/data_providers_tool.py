@@ -1,7 +1,7 @@
 import json
 from typing import Union, Dict, Any
 
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolFootprint
 from agent.tools.data_providers.LinkedinProvider import LinkedinProvider
 from agent.tools.data_providers.YahooFinanceProvider import YahooFinanceProvider
 from agent.tools.data_providers.AmazonProvider import AmazonProvider
@@ -38,7 +38,7 @@ class DataProvidersTool(Tool):
                 "required": ["service_name"]
             }
         }
-    })
+    }, cache_ttl=3600, cache_scope="global", footprint=ToolFootprint())
     @xml_schema(
         tag_name="get-data-provider-endpoints",
         mappings=[
@@ -109,7 +109,7 @@ Use this tool when you need to discover what endpoints are available.
                 "required": ["service_name", "route"]
             }
         }
-    })
+    }, cache_ttl=600, cache_scope="thread", footprint=ToolFootprint())
     @xml_schema(
         tag_name="execute-data-provider-call",
         mappings=[
@@ -176,7 +176,7 @@ Use this tool when you need to discover what endpoints are available.
                 return self.fail_response(f"Endpoint '{route}' not found in {service_name} data provider.")
             
             
-            result = data_provider.call_endpoint(route, payload)
+            result = await data_provider.call_endpoint(route, payload)
             return self.success_response(result)
             
         except Exception as e:
@@ -1,4 +1,4 @@
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolFootprint
 from agentpress.thread_manager import ThreadManager
 import json
 
@@ -26,7 +26,7 @@ class ExpandMessageTool(Tool):
                 "required": ["message_id"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="expand-message",
         mappings=[
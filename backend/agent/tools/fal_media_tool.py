@@ -7,16 +7,23 @@ Based on the fal.ai Python client documentation: https://docs.fal.ai/clients/pyt
 
 import asyncio
 import os
+import shlex
 import aiohttp
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse
 import fal_client
 from pydantic import BaseModel, Field
 
-from agentpress.tool import ToolResult, openapi_schema
+from agentpress.tool import ToolResult, openapi_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase
 from utils.logger import logger
 
+# Maximum number of generated files saved to the sandbox at the same time
+MEDIA_SAVE_CONCURRENCY = 4
+# Time limit for the sandbox to fetch one generated file (seconds)
+MEDIA_FETCH_TIMEOUT = 300
+
 
 class FalMediaRequest(BaseModel):
     """Request model for fal.ai media generation"""
@@ -96,46 +103,95 @@ class FalMediaTool(SandboxToolsBase):
             except Exception as fallback_error:
                 raise Exception(f"Both subscribe and run failed. Subscribe error: {str(e)}, Run error: {str(fallback_error)}")
 
-    async def _download_and_save_image(self, image_url: str, prompt: str, model_id: str, seed: Optional[int] = None) -> str:
-        """Download an image from URL and save it to the workspace"""
+    def _extract_media_urls(self, result: Dict[str, Any], model_id: str) -> Tuple[List[str], List[str]]:
+        """Return the (image URLs, video URLs) of a fal.ai result"""
+        images, videos = [], []
+        if self._is_video_model(model_id):
+            if "video" in result:
+                if isinstance(result["video"], str):
+                    videos = [result["video"]]
+                elif isinstance(result["video"], dict) and "url" in result["video"]:
+                    videos = [result["video"]["url"]]
+            elif "videos" in result:
+                videos = [video["url"] if isinstance(video, dict) else video for video in result["videos"]]
+        elif "images" in result:
+            images = [img["url"] for img in result["images"]]
+        return images, videos
+
+    async def _save_media(self, media_url: str, directory: str, filename: str) -> str:
+        """Save a generated file to the workspace and return its relative path.
+
+        The sandbox fetches the file itself, so it is streamed to disk without
+        passing through this process. If that fails, the file is downloaded
+        here and uploaded.
+        """
+        file_path = f"{self.workspace_path}/{directory}/{filename}"
+        relative_path = f"{directory}/{filename}"
+
+        logger.info(f"Saving {media_url} to {file_path}")
+        tmp_path = f"{file_path}.part"
+        command = (
+            f"curl -sSfL --max-time {MEDIA_FETCH_TIMEOUT} -o {shlex.quote(tmp_path)} {shlex.quote(media_url)}"
+            f" && mv {shlex.quote(tmp_path)} {shlex.quote(file_path)}"
+        )
         try:
-            logger.info(f"Ensuring sandbox is available for image saving...")
-            # Ensure sandbox is initialized
-            await self._ensure_sandbox()
-            logger.info(f"Sandbox available (ID: {self.sandbox_id}). Proceeding with image download.")
-            
-            # Create images directory if it doesn't exist
-            images_dir = f"{self.workspace_path}/generated_images"
-            self.sandbox.fs.create_folder(images_dir, "755")
-            
-            # Generate filename with timestamp and model info
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            model_name = model_id.split('/')[-1] if '/' in model_id else model_id
-            seed_suffix = f"_seed{seed}" if seed is not None else ""
-            filename = f"{timestamp}_{model_name}{seed_suffix}.png"
-            file_path = f"{images_dir}/{filename}"
-            
-            # Download the image
-            logger.info(f"Downloading image from {image_url} to {file_path}")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        
-                        # Save to workspace
-                        self.sandbox.fs.upload_file(file_path, image_data)
-                        
-                        # Return relative path for display
-                        relative_path = f"generated_images/{filename}"
-                        logger.info(f"✅ Image saved to workspace: {relative_path}")
-                        return relative_path
-                    else:
-                        logger.error(f"Failed to download image: HTTP {response.status}")
-                        raise Exception(f"Failed to download image: HTTP {response.status}")
-                        
+            response = await asyncio.to_thread(self.sandbox.process.exec, command, timeout=MEDIA_FETCH_TIMEOUT + 30)
+            if response.exit_code == 0:
+                logger.info(f"✅ Media saved to workspace: {relative_path}")
+                return relative_path
+            logger.warning(f"Sandbox could not fetch {media_url} (exit code {response.exit_code}): {response.result}")
         except Exception as e:
-            logger.error(f"❌ Error in _download_and_save_image: {str(e)}", exc_info=True)
-            raise e
+            logger.warning(f"Sandbox could not fetch {media_url}: {str(e)}")
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(media_url) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to download media: HTTP {response.status}")
+                media_data = await response.read()
+        await asyncio.to_thread(self.sandbox.fs.upload_file, media_data, file_path)
+        logger.info(f"✅ Media saved to workspace: {relative_path}")
+        return relative_path
+
+    async def _save_all_media(self, media: List[Tuple[str, str]], model_id: str, seed: Optional[int]) -> Tuple[List[str], List[str]]:
+        """Save generated files concurrently. media is a list of (url, "image" | "video").
+
+        Returns:
+            Tuple of (saved relative paths, error messages)
+        """
+        logger.info(f"Ensuring sandbox is available for saving {len(media)} generated files...")
+        await self._ensure_sandbox()
+
+        directories = {"image": "generated_images", "video": "generated_videos"}
+        for kind in {kind for _, kind in media}:
+            await asyncio.to_thread(self.sandbox.fs.create_folder, f"{self.workspace_path}/{directories[kind]}", "755")
+
+        # Generate filenames with timestamp and model info; the index keeps files of one batch apart
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        model_name = model_id.split('/')[-1] if '/' in model_id else model_id
+        seed_suffix = f"_seed{seed}" if seed is not None else ""
+        semaphore = asyncio.Semaphore(MEDIA_SAVE_CONCURRENCY)
+
+        async def save(index: int, media_url: str, kind: str) -> str:
+            default_ext = "mp4" if kind == "video" else "png"
+            ext = os.path.splitext(urlparse(media_url).path)[1].lstrip('.').lower() or default_ext
+            filename = f"{timestamp}_{model_name}{seed_suffix}_{index + 1}.{ext}"
+            async with semaphore:
+                return await self._save_media(media_url, directories[kind], filename)
+
+        results = await asyncio.gather(
+            *(save(i, media_url, kind) for i, (media_url, kind) in enumerate(media)),
+            return_exceptions=True
+        )
+
+        saved_files, errors = [], []
+        for i, ((media_url, kind), result) in enumerate(zip(media, results)):
+            if isinstance(result, Exception):
+                error_message = f"Failed to save {kind} {i + 1} from {media_url}: {str(result)}"
+                logger.error(error_message)
+                errors.append(error_message)
+            else:
+                saved_files.append(result)
+        return saved_files, errors
 
     @openapi_schema({
         "type": "function",
@@ -149,6 +205,11 @@ class FalMediaTool(SandboxToolsBase):
                         "type": "string",
                         "description": "The text prompt for media generation"
                     },
+                    "additional_prompts": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Further independent prompts to generate with the same settings. All prompts are generated concurrently, which is much faster than separate calls."
+                    },
                     "model_id": {
                         "type": "string",
                         "description": "The fal.ai model ID",
@@ -188,7 +249,7 @@ class FalMediaTool(SandboxToolsBase):
                 "required": ["prompt", "model_id"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace"]))
     async def fal_media_generation(
         self,
         prompt: str,
@@ -197,7 +258,8 @@ class FalMediaTool(SandboxToolsBase):
         image_size: Optional[str] = "landscape_4_3",
         num_images: Optional[int] = 1,
         num_inference_steps: Optional[int] = None,
-        guidance_scale: Optional[float] = None
+        guidance_scale: Optional[float] = None,
+        additional_prompts: Optional[List[str]] = None
     ) -> ToolResult:
         """Generate media using fal.ai and save to workspace"""
         
@@ -213,22 +275,29 @@ class FalMediaTool(SandboxToolsBase):
             if selected_model and selected_model != model_id:
                 print(f"🎨 Using selected media model: {effective_model_id} (overriding {model_id})")
             
-            # Create request object
-            request = FalMediaRequest(
-                prompt=prompt,
-                model_id=effective_model_id,
-                seed=seed,
-                image_size=image_size,
-                num_images=num_images,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale
-            )
-            
-            # Prepare arguments for the specific model
-            arguments = self._prepare_arguments(request)
+            # Create a request object per prompt
+            prompts = [prompt] + [p for p in (additional_prompts or []) if p]
+            requests = [
+                FalMediaRequest(
+                    prompt=p,
+                    model_id=effective_model_id,
+                    seed=seed,
+                    image_size=image_size,
+                    num_images=num_images,
+                    num_inference_steps=num_inference_steps,
+                    guidance_scale=guidance_scale
+                )
+                for p in prompts
+            ]
             
-            # Generate media using fal.ai
-            result = await self._generate_media_async(request.model_id, arguments)
+            # Generate media for all prompts concurrently
+            results = await asyncio.gather(
+                *(self._generate_media_async(request.model_id, self._prepare_arguments(request)) for request in requests),
+                return_exceptions=True
+            )
+            successful_results = [result for result in results if not isinstance(result, Exception)]
+            if not successful_results:
+                raise results[0]
             
             # Parse the response based on media type
             response_data = {
@@ -236,44 +305,30 @@ class FalMediaTool(SandboxToolsBase):
                 "images": [],
                 "videos": [],
                 "saved_files": [],
-                "request_id": result.get("request_id")
+                "request_id": successful_results[0].get("request_id")
             }
             
-            if self._is_video_model(request.model_id):
-                # Handle video response
-                if "video" in result:
-                    if isinstance(result["video"], str):
-                        response_data["videos"] = [result["video"]]
-                    elif isinstance(result["video"], dict) and "url" in result["video"]:
-                        response_data["videos"] = [result["video"]["url"]]
-                elif "videos" in result:
-                    response_data["videos"] = [video["url"] if isinstance(video, dict) else video for video in result["videos"]]
-            else:
-                # Handle image response and download/save images
-                if "images" in result:
-                    response_data["images"] = [img["url"] for img in result["images"]]
-                    
-                    # Download and save images
-                    logger.info("Starting image download and save process...")
-                    saved_files = []
-                    download_errors = []
-                    for i, image_url in enumerate(response_data["images"]):
-                        try:
-                            logger.info(f"Processing image {i+1} at URL: {image_url}")
-                            saved_path = await self._download_and_save_image(image_url, prompt, request.model_id, seed)
-                            saved_files.append(saved_path)
-                        except Exception as e:
-                            error_message = f"Failed to save image {i+1} from {image_url}: {str(e)}"
-                            logger.error(error_message, exc_info=True)
-                            download_errors.append(error_message)
-                    
-                    response_data["saved_files"] = saved_files
-                    logger.info(f"Completed image download process. Saved {len(saved_files)} files.")
-
-                    if download_errors:
-                        # If some images failed to download, add error details to the response
-                        error_summary = "\n".join(download_errors)
-                        response_data['error'] = f"Could not save all generated images to the workspace. The following errors occurred:\n{error_summary}"
+            generation_errors = []
+            for p, result in zip(prompts, results):
+                if isinstance(result, Exception):
+                    generation_errors.append(f"Generation failed for prompt '{p}': {str(result)}")
+                    continue
+                images, videos = self._extract_media_urls(result, effective_model_id)
+                response_data["images"].extend(images)
+                response_data["videos"].extend(videos)
+            
+            # Download and save all generated files concurrently
+            media = [(url, "image") for url in response_data["images"]] + [(url, "video") for url in response_data["videos"]]
+            download_errors = []
+            if media:
+                logger.info("Starting media download and save process...")
+                response_data["saved_files"], download_errors = await self._save_all_media(media, effective_model_id, seed)
+                logger.info(f"Completed media download process. Saved {len(response_data['saved_files'])} files.")
+
+            if download_errors or generation_errors:
+                # If some files failed to generate or download, add error details to the response
+                error_summary = "\n".join(generation_errors + download_errors)
+                response_data['error'] = f"Could not save all generated media to the workspace. The following errors occurred:\n{error_summary}"
 
             # Create success message
             success_message_parts = []
@@ -283,12 +338,12 @@ class FalMediaTool(SandboxToolsBase):
             if response_data["saved_files"]:
                 files_list = "\n".join([f"- {path}" for path in response_data["saved_files"]])
                 success_message_parts.append(f"Saved {len(response_data['saved_files'])} to your workspace:\n{files_list}")
-                success_message_parts.append("The images are now available in your workspace files and will be displayed in the chat history.")
+                success_message_parts.append("The files are now available in your workspace and will be displayed in the chat history.")
 
             if response_data.get("error"):
-                 success_message_parts.append(f"\nHowever, some images could not be saved:\n{response_data['error']}")
+                 success_message_parts.append(f"\nHowever, some media could not be saved:\n{response_data['error']}")
                  if not response_data["saved_files"]:
-                     success_message_parts.append(f"You can try to access them at these temporary URLs: {response_data.get('images', [])}")
+                     success_message_parts.append(f"You can try to access them at these temporary URLs: {response_data.get('images', []) + response_data.get('videos', [])}")
 
             if response_data.get("videos"):
                 success_message_parts.append(f"Successfully generated video. URL: {response_data.get('videos', [])}")
@@ -7,17 +7,21 @@ server tool calls through dynamically generated individual function methods.
 
 import json
 from typing import Any, Dict, List, Optional
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolSchema, SchemaType
+from agentpress.tool import Tool, ToolResult, ToolCachePolicy, ToolFootprint, openapi_schema, xml_schema, ToolSchema, SchemaType
 from mcp_local.client import MCPManager
 from utils.logger import logger
 import inspect
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-from mcp.client.stdio import stdio_client
-from mcp.client.streamable_http import streamablehttp_client
-from mcp import StdioServerParameters
+from mcp_local.session_pool import mcp_session_pool, session_key, http_transport, sse_transport, stdio_transport
+from mcp_local.tool_cache import get_cached_tools, cache_tools, tool_to_dict, is_read_only
 import asyncio
 
+# Overall time budget for discovering the tools of all configured MCP servers
+DISCOVERY_TIMEOUT = 20
+# Connection timeout for a single custom MCP server
+CUSTOM_CONNECT_TIMEOUT = 15
+# Seconds to reuse results of MCP tools annotated as read-only within a thread
+READ_ONLY_TOOL_CACHE_TTL = 300
+
 
 class MCPToolWrapper(Tool):
     """
@@ -52,266 +56,160 @@ class MCPToolWrapper(Tool):
             standard_configs = [cfg for cfg in self.mcp_configs if not cfg.get('isCustom', False)]
             custom_configs = [cfg for cfg in self.mcp_configs if cfg.get('isCustom', False)]
             
-            # Initialize standard MCPs through MCPManager
-            if standard_configs:
-                for config in standard_configs:
-                    try:
-                        await self.mcp_manager.connect_server(config)
-                    except Exception as e:
-                        logger.error(f"Failed to connect to MCP server {config['qualifiedName']}: {e}")
-            
-            # Initialize custom MCPs directly
-            if custom_configs:
-                await self._initialize_custom_mcps(custom_configs)
+            # Discover all servers concurrently; tool lists come from the shared cache when possible
+            tasks = [asyncio.create_task(self._connect_standard_mcp(config)) for config in standard_configs]
+            tasks += [asyncio.create_task(self._initialize_custom_mcp(config)) for config in custom_configs]
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=DISCOVERY_TIMEOUT)
+                if pending:
+                    logger.warning(f"MCP tool discovery exceeded {DISCOVERY_TIMEOUT}s, skipping {len(pending)} slow servers")
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
             
             # Create dynamic tools for all connected servers
             await self._create_dynamic_tools()
             self._initialized = True
     
+    def _custom_session_key(self, server_name, server_config):
+        return session_key(f"custom:{server_name}", server_config)
+
+    def _list_tools_info(self, tools_result):
+        return [tool_to_dict(tool) for tool in tools_result.tools]
+
     async def _connect_sse_server(self, server_name, server_config, all_tools, timeout):
         url = server_config["url"]
         headers = server_config.get("headers", {})
         
         async with asyncio.timeout(timeout):
-            try:
-                async with sse_client(url, headers=headers) as (read, write):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        tools_result = await session.list_tools()
-                        tools_info = []
-                        for tool in tools_result.tools:
-                            tool_info = {
-                                "name": tool.name,
-                                "description": tool.description,
-                                "input_schema": tool.inputSchema
-                            }
-                            tools_info.append(tool_info)
-                        
-                        all_tools[server_name] = {
-                            "status": "connected",
-                            "transport": "sse",
-                            "url": url,
-                            "tools": tools_info
-                        }
-                        
-                        logger.info(f"  {server_name}: Connected via SSE ({len(tools_info)} tools)")
-            except TypeError as e:
-                if "unexpected keyword argument" in str(e):
-                    async with sse_client(url) as (read, write):
-                        async with ClientSession(read, write) as session:
-                            await session.initialize()
-                            tools_result = await session.list_tools()
-                            tools_info = []
-                            for tool in tools_result.tools:
-                                tool_info = {
-                                    "name": tool.name,
-                                    "description": tool.description,
-                                    "input_schema": tool.inputSchema
-                                }
-                                tools_info.append(tool_info)
-                            
-                            all_tools[server_name] = {
-                                "status": "connected",
-                                "transport": "sse",
-                                "url": url,
-                                "tools": tools_info
-                            }
-                            logger.info(f"  {server_name}: Connected via SSE ({len(tools_info)} tools)")
-                else:
-                    raise
-    
-    async def _connect_streamable_http_server(self, url):
-        async with streamablehttp_client(url) as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tool_result = await session.list_tools()
-                print(f"Connected via HTTP ({len(tool_result.tools)} tools)")
+            # The pooled session stays open, so the first tool call does not reconnect
+            key = self._custom_session_key(server_name, server_config)
+            async with mcp_session_pool.session(key, sse_transport(url, headers)) as session:
+                tools_result = await session.list_tools()
+                tools_info = self._list_tools_info(tools_result)
                 
-                tools_info = []
-                for tool in tool_result.tools:
-                    tool_info = {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "inputSchema": tool.inputSchema
-                    }
-                    tools_info.append(tool_info)
+                all_tools[server_name] = {
+                    "status": "connected",
+                    "transport": "sse",
+                    "url": url,
+                    "tools": tools_info
+                }
                 
-                return tools_info
+                logger.info(f"  {server_name}: Connected via SSE ({len(tools_info)} tools)")
+    
+    async def _connect_streamable_http_server(self, url, server_name=None, server_config=None):
+        key = self._custom_session_key(server_name or url, server_config or {"url": url})
+        async with mcp_session_pool.session(key, http_transport(url)) as session:
+            tool_result = await session.list_tools()
+            print(f"Connected via HTTP ({len(tool_result.tools)} tools)")
+            
+            return self._list_tools_info(tool_result)
         
     async def _connect_stdio_server(self, server_name, server_config, all_tools, timeout):
         """Connect to a stdio-based MCP server."""
-        server_params = StdioServerParameters(
-            command=server_config["command"],
-            args=server_config.get("args", []),
-            env=server_config.get("env", {})
+        transport = stdio_transport(
+            server_config["command"],
+            server_config.get("args", []),
+            server_config.get("env", {})
         )
         
         async with asyncio.timeout(timeout):
-            async with stdio_client(server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    tools_info = []
-                    for tool in tools_result.tools:
-                        tool_info = {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "input_schema": tool.inputSchema
-                        }
-                        tools_info.append(tool_info)
-                    
-                    all_tools[server_name] = {
-                        "status": "connected",
-                        "transport": "stdio",
-                        "tools": tools_info
-                    }
-                    
-                    logger.info(f"  {server_name}: Connected via stdio ({len(tools_info)} tools)")
-
-    async def _initialize_custom_mcps(self, custom_configs):
-        """Initialize custom MCP servers."""
-        for config in custom_configs:
-            try:
-                logger.info(f"Initializing custom MCP: {config}")
-                custom_type = config.get('customType', 'sse')
-                server_config = config.get('config', {})
-                enabled_tools = config.get('enabledTools', [])
-                server_name = config.get('name', 'Unknown')
+            key = self._custom_session_key(server_name, server_config)
+            async with mcp_session_pool.session(key, transport) as session:
+                tools_result = await session.list_tools()
+                tools_info = self._list_tools_info(tools_result)
                 
-                logger.info(f"Initializing custom MCP: {server_name} (type: {custom_type})")
-                
-                if custom_type == 'sse':
-                    if 'url' not in server_config:
-                        logger.error(f"Custom MCP {server_name}: Missing 'url' in config")
-                        continue
-                        
-                    url = server_config['url']
-                    logger.info(f"Initializing custom MCP {url} with SSE type")
-                    
-                    try:
-                        # Use the working connect_sse_server method
-                        all_tools = {}
-                        await self._connect_sse_server(server_name, server_config, all_tools, 15)
-                        
-                        # Process the results
-                        if server_name in all_tools and all_tools[server_name].get('status') == 'connected':
-                            tools_info = all_tools[server_name].get('tools', [])
-                            tools_registered = 0
-                            
-                            for tool_info in tools_info:
-                                tool_name_from_server = tool_info['name']
-                                if not enabled_tools or tool_name_from_server in enabled_tools:
-                                    tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
-                                    self._custom_tools[tool_name] = {
-                                        'name': tool_name,
-                                        'description': tool_info['description'],
-                                        'parameters': tool_info['input_schema'],
-                                        'server': server_name,
-                                        'original_name': tool_name_from_server,
-                                        'is_custom': True,
-                                        'custom_type': custom_type,
-                                        'custom_config': server_config
-                                    }
-                                    tools_registered += 1
-                                    logger.debug(f"Registered custom tool: {tool_name}")
-                            
-                            logger.info(f"Successfully initialized custom MCP {server_name} with {tools_registered} tools")
-                        else:
-                            logger.error(f"Failed to connect to custom MCP {server_name}")
-                            
-                    except Exception as e:
-                        logger.error(f"Custom MCP {server_name}: Connection failed - {str(e)}")
-                        continue
+                all_tools[server_name] = {
+                    "status": "connected",
+                    "transport": "stdio",
+                    "tools": tools_info
+                }
                 
-                elif custom_type == 'http':
-                    if 'url' not in server_config:
-                        logger.error(f"Custom MCP {server_name}: Missing 'url' in config")
-                        continue
-                        
-                    url = server_config['url']
-                    logger.info(f"Initializing custom MCP {url} with HTTP type")
-                    
-                    try:
+                logger.info(f"  {server_name}: Connected via stdio ({len(tools_info)} tools)")
 
-                        tools_info = await self._connect_streamable_http_server(url)
-                        tools_registered = 0
-                        
-                        for tool_info in tools_info:
-                            tool_name_from_server = tool_info['name']
-                            if not enabled_tools or tool_name_from_server in enabled_tools:
-                                tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
-                                self._custom_tools[tool_name] = {
-                                    'name': tool_name,
-                                    'description': tool_info['description'],
-                                    'parameters': tool_info['inputSchema'],
-                                    'server': server_name,
-                                    'original_name': tool_name_from_server,
-                                    'is_custom': True,
-                                    'custom_type': custom_type,
-                                    'custom_config': server_config
-                                }
-                                tools_registered += 1
-                                logger.debug(f"Registered custom tool: {tool_name}")
-                        
-                        logger.info(f"Successfully initialized custom MCP {server_name} with {tools_registered} tools")
-                            
-                    except Exception as e:
-                        logger.error(f"Custom MCP {server_name}: Connection failed - {str(e)}")
-                        continue
-                        
-                elif custom_type == 'json':
-                    if 'command' not in server_config:
-                        logger.error(f"Custom MCP {server_name}: Missing 'command' in config")
-                        continue
-                        
-                    logger.info(f"Initializing custom MCP {server_name} with JSON/stdio type")
-                    
-                    try:
-                        # Use the stdio connection method
-                        all_tools = {}
-                        await self._connect_stdio_server(server_name, server_config, all_tools, 15)
-                        
-                        # Process the results
-                        if server_name in all_tools and all_tools[server_name].get('status') == 'connected':
-                            tools_info = all_tools[server_name].get('tools', [])
-                            tools_registered = 0
-                            
-                            for tool_info in tools_info:
-                                tool_name_from_server = tool_info['name']
-                                if not enabled_tools or tool_name_from_server in enabled_tools:
-                                    tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
-                                    self._custom_tools[tool_name] = {
-                                        'name': tool_name,
-                                        'description': tool_info['description'],
-                                        'parameters': tool_info['input_schema'],
-                                        'server': server_name,
-                                        'original_name': tool_name_from_server,
-                                        'is_custom': True,
-                                        'custom_type': custom_type,
-                                        'custom_config': server_config
-                                    }
-                                    tools_registered += 1
-                                    logger.debug(f"Registered custom tool: {tool_name}")
-                            
-                            logger.info(f"Successfully initialized custom MCP {server_name} with {tools_registered} tools")
-                        else:
-                            logger.error(f"Failed to connect to custom MCP {server_name}")
-                            
-                    except Exception as e:
-                        logger.error(f"Custom MCP {server_name}: Connection failed - {str(e)}")
-                        continue
-                        
-                else:
-                    logger.error(f"Custom MCP {server_name}: Unsupported type '{custom_type}', supported types are 'sse', 'http' and 'json'")
-                    continue
-                    
+    async def _connect_standard_mcp(self, config):
+        """Connect to a Smithery MCP server through MCPManager."""
+        try:
+            await self.mcp_manager.connect_server(config)
+        except Exception as e:
+            logger.error(f"Failed to connect to MCP server {config['qualifiedName']}: {e}")
+
+    async def _discover_custom_tools(self, server_name, custom_type, server_config):
+        """List the tools of a custom MCP server, using the shared tool cache."""
+        key = self._custom_session_key(server_name, server_config)
+        cached_tools = await get_cached_tools(key)
+        if cached_tools is not None:
+            logger.info(f"Using cached tool list for custom MCP {server_name}")
+            return cached_tools
+
+        if custom_type == 'sse':
+            all_tools = {}
+            await self._connect_sse_server(server_name, server_config, all_tools, CUSTOM_CONNECT_TIMEOUT)
+            tools_info = all_tools.get(server_name, {}).get('tools')
+        elif custom_type == 'http':
+            async with asyncio.timeout(CUSTOM_CONNECT_TIMEOUT):
+                tools_info = await self._connect_streamable_http_server(server_config['url'], server_name, server_config)
+        else:
+            all_tools = {}
+            await self._connect_stdio_server(server_name, server_config, all_tools, CUSTOM_CONNECT_TIMEOUT)
+            tools_info = all_tools.get(server_name, {}).get('tools')
+
+        if tools_info is not None:
+            await cache_tools(key, tools_info)
+        return tools_info
+
+    async def _initialize_custom_mcp(self, config):
+        """Initialize a single custom MCP server."""
+        server_name = config.get('name', 'Unknown')
+        try:
+            custom_type = config.get('customType', 'sse')
+            server_config = config.get('config', {})
+            enabled_tools = config.get('enabledTools', [])
+            
+            logger.info(f"Initializing custom MCP: {server_name} (type: {custom_type})")
+            
+            if custom_type not in ('sse', 'http', 'json'):
+                logger.error(f"Custom MCP {server_name}: Unsupported type '{custom_type}', supported types are 'sse', 'http' and 'json'")
+                return
+            
+            required_field = 'command' if custom_type == 'json' else 'url'
+            if required_field not in server_config:
+                logger.error(f"Custom MCP {server_name}: Missing '{required_field}' in config")
+                return
+            
+            try:
+                tools_info = await self._discover_custom_tools(server_name, custom_type, server_config)
             except Exception as e:
-                logger.error(f"Failed to initialize custom MCP {config.get('name', 'Unknown')}: {e}")
-                continue
+                logger.error(f"Custom MCP {server_name}: Connection failed - {str(e)}")
+                return
+            
+            if tools_info is None:
+                logger.error(f"Failed to connect to custom MCP {server_name}")
+                return
+            
+            tools_registered = 0
+            for tool_info in tools_info:
+                tool_name_from_server = tool_info['name']
+                if not enabled_tools or tool_name_from_server in enabled_tools:
+                    tool_name = f"custom_{server_name.replace(' ', '_').lower()}_{tool_name_from_server}"
+                    self._custom_tools[tool_name] = {
+                        'name': tool_name,
+                        'description': tool_info['description'],
+                        'parameters': tool_info['inputSchema'],
+                        'read_only': is_read_only(tool_info.get('annotations')),
+                        'server': server_name,
+                        'original_name': tool_name_from_server,
+                        'is_custom': True,
+                        'custom_type': custom_type,
+                        'custom_config': server_config
+                    }
+                    tools_registered += 1
+                    logger.debug(f"Registered custom tool: {tool_name}")
+            
+            logger.info(f"Successfully initialized custom MCP {server_name} with {tools_registered} tools")
+                
+        except Exception as e:
+            logger.error(f"Failed to initialize custom MCP {server_name}: {e}")
     
     async def initialize_and_register_tools(self, tool_registry=None):
         """Initialize MCP tools and optionally update the tool registry.
@@ -353,7 +251,8 @@ class MCPToolWrapper(Tool):
                 openapi_tool_info = {
                     "name": tool_name,
                     "description": tool_info['description'],
-                    "parameters": tool_info['parameters']
+                    "parameters": tool_info['parameters'],
+                    "read_only": tool_info.get('read_only', False)
                 }
                 self._create_dynamic_method(tool_name, openapi_tool_info)
                     
@@ -416,6 +315,18 @@ class MCPToolWrapper(Tool):
         # Also add the schema to the method itself (for compatibility)
         dynamic_tool_method.tool_schemas = [tool_schema]
         
+        # Memoize tools the server declares read-only. Thread scope, since the
+        # same tool name can point at servers with different credentials
+        if tool_info.get("read_only"):
+            dynamic_tool_method.tool_cache_policy = ToolCachePolicy(ttl=READ_ONLY_TOOL_CACHE_TTL, scope="thread")
+        
+        # MCP tools only touch their own server: read-only tools run alongside
+        # anything, other calls to the same server keep their order
+        if tool_info.get("read_only"):
+            dynamic_tool_method.tool_footprint = ToolFootprint()
+        else:
+            dynamic_tool_method.tool_footprint = ToolFootprint(writes=[f"mcp:{server_name}"])
+        
         # Store the method and its info
         self._dynamic_tools[tool_name] = {
             'method': dynamic_tool_method,
@@ -493,145 +404,50 @@ class MCPToolWrapper(Tool):
             logger.error(f"Error executing MCP tool {tool_name}: {str(e)}")
             return self.fail_response(f"Error executing tool: {str(e)}")
     
+    def _result_to_text(self, result) -> str:
+        """Flatten an MCP tool result into text."""
+        if not hasattr(result, 'content'):
+            return str(result)
+        content = result.content
+        if isinstance(content, list):
+            # Extract text from content list
+            text_parts = []
+            for item in content:
+                if hasattr(item, 'text'):
+                    text_parts.append(item.text)
+                else:
+                    text_parts.append(str(item))
+            return "\n".join(text_parts)
+        elif hasattr(content, 'text'):
+            return content.text
+        return str(content)
+
     async def _execute_custom_mcp_tool(self, tool_name: str, arguments: Dict[str, Any], tool_info: Dict[str, Any]) -> ToolResult:
-        """Execute a custom MCP tool call."""
+        """Execute a custom MCP tool call on the pooled session for its server."""
         try:
             custom_type = tool_info['custom_type']
             custom_config = tool_info['custom_config']
             original_tool_name = tool_info['original_name']
             
             if custom_type == 'sse':
-                # Execute SSE-based custom MCP using the same pattern as _connect_sse_server
-                url = custom_config['url']
-                headers = custom_config.get('headers', {})
-                
-                async with asyncio.timeout(30):  # 30 second timeout for tool execution
-                    try:
-                        # Try with headers first (same pattern as _connect_sse_server)
-                        async with sse_client(url, headers=headers) as (read, write):
-                            async with ClientSession(read, write) as session:
-                                await session.initialize()
-                                result = await session.call_tool(original_tool_name, arguments)
-                                
-                                # Handle the result properly
-                                if hasattr(result, 'content'):
-                                    content = result.content
-                                    if isinstance(content, list):
-                                        # Extract text from content list
-                                        text_parts = []
-                                        for item in content:
-                                            if hasattr(item, 'text'):
-                                                text_parts.append(item.text)
-                                            else:
-                                                text_parts.append(str(item))
-                                        content_str = "\n".join(text_parts)
-                                    elif hasattr(content, 'text'):
-                                        content_str = content.text
-                                    else:
-                                        content_str = str(content)
-                                    
-                                    return self.success_response(content_str)
-                                else:
-                                    return self.success_response(str(result))
-                                    
-                    except TypeError as e:
-                        if "unexpected keyword argument" in str(e):
-                            # Fallback: try without headers (exact pattern from _connect_sse_server)
-                            async with sse_client(url) as (read, write):
-                                async with ClientSession(read, write) as session:
-                                    await session.initialize()
-                                    result = await session.call_tool(original_tool_name, arguments)
-                                    
-                                    # Handle the result properly
-                                    if hasattr(result, 'content'):
-                                        content = result.content
-                                        if isinstance(content, list):
-                                            # Extract text from content list
-                                            text_parts = []
-                                            for item in content:
-                                                if hasattr(item, 'text'):
-                                                    text_parts.append(item.text)
-                                                else:
-                                                    text_parts.append(str(item))
-                                            content_str = "\n".join(text_parts)
-                                        elif hasattr(content, 'text'):
-                                            content_str = content.text
-                                        else:
-                                            content_str = str(content)
-                                        
-                                        return self.success_response(content_str)
-                                    else:
-                                        return self.success_response(str(result))
-                        else:
-                            raise
-            
+                transport = sse_transport(custom_config['url'], custom_config.get('headers', {}))
             elif custom_type == 'http':
-                # Execute HTTP-based custom MCP
-                url = custom_config['url']
-                
-                async with asyncio.timeout(30):  # 30 second timeout for tool execution
-                    async with streamablehttp_client(url) as (read, write, _):
-                        async with ClientSession(read, write) as session:
-                            await session.initialize()
-                            result = await session.call_tool(original_tool_name, arguments)
-                            
-                            # Handle the result properly
-                            if hasattr(result, 'content'):
-                                content = result.content
-                                if isinstance(content, list):
-                                    # Extract text from content list
-                                    text_parts = []
-                                    for item in content:
-                                        if hasattr(item, 'text'):
-                                            text_parts.append(item.text)
-                                        else:
-                                            text_parts.append(str(item))
-                                    content_str = "\n".join(text_parts)
-                                elif hasattr(content, 'text'):
-                                    content_str = content.text
-                                else:
-                                    content_str = str(content)
-                                
-                                return self.success_response(content_str)
-                            else:
-                                return self.success_response(str(result))
-                                
+                transport = http_transport(custom_config['url'])
             elif custom_type == 'json':
-                # Execute stdio-based custom MCP using the same pattern as _connect_stdio_server
-                server_params = StdioServerParameters(
-                    command=custom_config["command"],
-                    args=custom_config.get("args", []),
-                    env=custom_config.get("env", {})
+                transport = stdio_transport(
+                    custom_config["command"],
+                    custom_config.get("args", []),
+                    custom_config.get("env", {})
                 )
-                
-                async with asyncio.timeout(30):  # 30 second timeout for tool execution
-                    async with stdio_client(server_params) as (read, write):
-                        async with ClientSession(read, write) as session:
-                            await session.initialize()
-                            result = await session.call_tool(original_tool_name, arguments)
-                            
-                            # Handle the result properly
-                            if hasattr(result, 'content'):
-                                content = result.content
-                                if isinstance(content, list):
-                                    # Extract text from content list
-                                    text_parts = []
-                                    for item in content:
-                                        if hasattr(item, 'text'):
-                                            text_parts.append(item.text)
-                                        else:
-                                            text_parts.append(str(item))
-                                    content_str = "\n".join(text_parts)
-                                elif hasattr(content, 'text'):
-                                    content_str = content.text
-                                else:
-                                    content_str = str(content)
-                                
-                                return self.success_response(content_str)
-                            else:
-                                return self.success_response(str(result))
             else:
                 return self.fail_response(f"Unsupported custom MCP type: {custom_type}")
+            
+            key = self._custom_session_key(tool_info['server'], custom_config)
+            
+            async with asyncio.timeout(30):  # 30 second timeout for tool execution
+                result = await mcp_session_pool.call_tool(key, transport, original_tool_name, arguments)
+            
+            return self.success_response(self._result_to_text(result))
                                 
         except asyncio.TimeoutError:
             return self.fail_response(f"Tool execution timeout for {tool_name}")
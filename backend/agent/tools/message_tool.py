@@ -1,5 +1,5 @@
 from typing import List, Optional, Union
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolFootprint
 from utils.logger import logger
 
 class MessageTool(Tool):
@@ -37,7 +37,7 @@ class MessageTool(Tool):
                 "required": ["text"]
             }
         }
-    })
+    }, footprint=ToolFootprint(terminating=True))
     @xml_schema(
         tag_name="ask",
         mappings=[
@@ -101,7 +101,7 @@ This information will help me make sure the cake meets your expectations for the
                 "required": ["text"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["browser"]))
     @xml_schema(
         tag_name="web-browser-takeover",
         mappings=[
@@ -224,7 +224,7 @@ If you encounter any issues or need to take additional steps, please let me know
                 "required": []
             }
         }
-    })
+    }, footprint=ToolFootprint(terminating=True))
     @xml_schema(
         tag_name="complete",
         mappings=[],
@@ -2,13 +2,45 @@ import traceback
 import json
 import base64
 import io
+import asyncio
+import time
+from typing import Optional
+
+import httpx
 from PIL import Image
 
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from agentpress.thread_manager import ThreadManager
 from sandbox.tool_base import SandboxToolsBase
 from utils.logger import logger
-from utils.s3_upload_utils import upload_base64_image
+from utils.s3_upload_utils import upload_image_bytes
+
+# Port of the browser automation API inside the sandbox
+BROWSER_API_PORT = 8003
+
+BROWSER_API_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+# Screenshots whose 256-bit perceptual hashes differ by at most this many bits
+# are treated as the same frame and reuse the previously uploaded image
+SCREENSHOT_PHASH_THRESHOLD = 3
+
+# After the preview URL refuses connections, use exec for this long before trying it again (seconds)
+EXEC_FALLBACK_RETRY_INTERVAL = 300
+
+# Browser actions change the page, and pages are often served from the
+# workspace (file:// URLs, dev servers), so they also wait for earlier
+# workspace writes such as create_file or execute_command
+BROWSER_ACTION_FOOTPRINT = ToolFootprint(reads=["workspace"], writes=["browser"])
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Keep-alive HTTP client for browser APIs, shared by all tool instances in the process."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=BROWSER_API_TIMEOUT)
+    return _http_client
 
 
 class SandboxBrowserTool(SandboxToolsBase):
@@ -17,6 +49,15 @@ class SandboxBrowserTool(SandboxToolsBase):
     def __init__(self, project_id: str, thread_id: str, thread_manager: ThreadManager):
         super().__init__(project_id, thread_manager)
         self.thread_id = thread_id
+        self._browser_api_url: Optional[str] = None
+        self._browser_api_headers: dict = {}
+        # Until this time the API is called through exec, because the preview URL
+        # refused connections (e.g. self-hosted Daytona without a proxy)
+        self._exec_fallback_until = 0.0
+        # (perceptual hash, image URL) of the last uploaded screenshot
+        self._last_screenshot: Optional[tuple[Optional[str], str]] = None
+        # Browser API ID of the latest screenshot, used to request its OCR text
+        self._last_screenshot_id: Optional[str] = None
 
     def _validate_base64_image(self, base64_string: str, max_size_mb: int = 10) -> tuple[bool, str]:
         """
@@ -29,34 +70,37 @@ class SandboxBrowserTool(SandboxToolsBase):
         Returns:
             tuple[bool, str]: (is_valid, error_message)
         """
-        try:
-            # Check if data exists and has reasonable length
-            if not base64_string or len(base64_string) < 10:
-                return False, "Base64 string is empty or too short"
-            
-            # Remove data URL prefix if present (data:image/jpeg;base64,...)
-            if base64_string.startswith('data:'):
-                try:
-                    base64_string = base64_string.split(',', 1)[1]
-                except (IndexError, ValueError):
-                    return False, "Invalid data URL format"
-            
-            # Check if string contains only valid base64 characters
-            # Base64 alphabet: A-Z, a-z, 0-9, +, /, = (padding)
-            import re
-            if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', base64_string):
-                return False, "Invalid base64 characters detected"
-            
-            # Check if base64 string length is valid (must be multiple of 4)
-            if len(base64_string) % 4 != 0:
-                return False, "Invalid base64 string length"
-            
-            # Attempt to decode base64
+        # Check if data exists and has reasonable length
+        if not base64_string or len(base64_string) < 10:
+            return False, "Base64 string is empty or too short"
+        
+        # Remove data URL prefix if present (data:image/jpeg;base64,...)
+        if base64_string.startswith('data:'):
             try:
-                image_data = base64.b64decode(base64_string, validate=True)
-            except Exception as e:
-                return False, f"Base64 decoding failed: {str(e)}"
+                base64_string = base64_string.split(',', 1)[1]
+            except (IndexError, ValueError):
+                return False, "Invalid data URL format"
+        
+        # Strict decoding rejects invalid characters and lengths
+        try:
+            image_data = base64.b64decode(base64_string, validate=True)
+        except Exception as e:
+            return False, f"Base64 decoding failed: {str(e)}"
+        
+        return self._validate_image_bytes(image_data, max_size_mb)
+
+    def _validate_image_bytes(self, image_data: bytes, max_size_mb: int = 10) -> tuple[bool, str]:
+        """
+        Validate that raw bytes are a supported image of reasonable size.
+        
+        Args:
+            image_data (bytes): The image data
+            max_size_mb (int): Maximum allowed image size in megabytes
             
+        Returns:
+            tuple[bool, str]: (is_valid, error_message)
+        """
+        try:
             # Check decoded data size
             if len(image_data) == 0:
                 return False, "Decoded image data is empty"
@@ -66,43 +110,147 @@ class SandboxBrowserTool(SandboxToolsBase):
             if len(image_data) > max_size_bytes:
                 return False, f"Image size ({len(image_data)} bytes) exceeds limit ({max_size_bytes} bytes)"
             
-            # Validate that decoded data is actually a valid image using PIL
+            # Validate the image header with PIL; format and size are read without decoding pixels
             try:
-                image_stream = io.BytesIO(image_data)
-                with Image.open(image_stream) as img:
-                    # Verify the image by attempting to load it
-                    img.verify()
-                    
+                with Image.open(io.BytesIO(image_data)) as img:
                     # Check if image format is supported
                     supported_formats = {'JPEG', 'PNG', 'GIF', 'BMP', 'WEBP', 'TIFF'}
                     if img.format not in supported_formats:
                         return False, f"Unsupported image format: {img.format}"
                     
-                    # Re-open for dimension checks (verify() closes the image)
-                    image_stream.seek(0)
-                    with Image.open(image_stream) as img_check:
-                        width, height = img_check.size
-                        
-                        # Check reasonable dimension limits
-                        max_dimension = 8192  # 8K resolution limit
-                        if width > max_dimension or height > max_dimension:
-                            return False, f"Image dimensions ({width}x{height}) exceed limit ({max_dimension}x{max_dimension})"
-                        
-                        # Check minimum dimensions
-                        if width < 1 or height < 1:
-                            return False, f"Invalid image dimensions: {width}x{height}"
-                        
-                        logger.debug(f"Valid image detected: {img.format}, {width}x{height}, {len(image_data)} bytes")
-                        
+                    width, height = img.size
+                    
+                    # Check reasonable dimension limits
+                    max_dimension = 8192  # 8K resolution limit
+                    if width > max_dimension or height > max_dimension:
+                        return False, f"Image dimensions ({width}x{height}) exceed limit ({max_dimension}x{max_dimension})"
+                    
+                    # Check minimum dimensions
+                    if width < 1 or height < 1:
+                        return False, f"Invalid image dimensions: {width}x{height}"
+                    
+                    logger.debug(f"Valid image detected: {img.format}, {width}x{height}, {len(image_data)} bytes")
+                    
             except Exception as e:
                 return False, f"Invalid image data: {str(e)}"
             
             return True, "Valid image"
             
         except Exception as e:
-            logger.error(f"Unexpected error during base64 image validation: {e}")
+            logger.error(f"Unexpected error during image validation: {e}")
             return False, f"Validation error: {str(e)}"
 
+    @staticmethod
+    def _is_same_frame(phash_a: Optional[str], phash_b: Optional[str]) -> bool:
+        """Whether two perceptual hashes differ by no more than SCREENSHOT_PHASH_THRESHOLD bits."""
+        if not phash_a or not phash_b or len(phash_a) != len(phash_b):
+            return False
+        try:
+            return bin(int(phash_a, 16) ^ int(phash_b, 16)).count('1') <= SCREENSHOT_PHASH_THRESHOLD
+        except ValueError:
+            return False
+
+    async def _fetch_screenshot(self, screenshot_id: str) -> bytes:
+        """Download screenshot bytes from the browser API."""
+        client = _get_http_client()
+        url = f"{await self._get_browser_api_url()}/api/automation/screenshot/{screenshot_id}"
+        response = await client.get(url, headers=self._browser_api_headers)
+        response.raise_for_status()
+        return response.content
+
+    async def _process_screenshot(self, result: dict):
+        """
+        Upload the screenshot of a browser action result and set result["image_url"].
+        
+        Frames that look the same as the previous one (perceptual hash within the
+        threshold) reuse the previous URL without downloading or uploading anything.
+        """
+        phash = result.get("screenshot_phash")
+        if self._last_screenshot and self._is_same_frame(phash, self._last_screenshot[0]):
+            result["image_url"] = self._last_screenshot[1]
+            logger.debug("Screenshot unchanged, reusing previous image URL")
+            return
+        
+        if result.get("screenshot_base64"):
+            is_valid, validation_message = self._validate_base64_image(result["screenshot_base64"])
+            image_data = base64.b64decode(result["screenshot_base64"].split(',', 1)[-1]) if is_valid else None
+        else:
+            image_data = await self._fetch_screenshot(result["screenshot_id"])
+            is_valid, validation_message = self._validate_image_bytes(image_data)
+        
+        if not is_valid:
+            logger.warning(f"Screenshot validation failed: {validation_message}")
+            result["image_validation_error"] = validation_message
+            return
+        
+        logger.debug(f"Screenshot validation passed: {validation_message}")
+        image_url = await upload_image_bytes(image_data)
+        result["image_url"] = image_url
+        self._last_screenshot = (phash, image_url)
+        logger.debug(f"Uploaded screenshot to {image_url}")
+
+    async def _get_browser_api_url(self) -> str:
+        """Resolve the preview URL of the sandbox browser API once per tool instance."""
+        if self._browser_api_url is None:
+            preview_link = await asyncio.to_thread(self.sandbox.get_preview_link, BROWSER_API_PORT)
+            url = preview_link.url if hasattr(preview_link, 'url') else str(preview_link)
+            token = getattr(preview_link, 'token', None)
+            self._browser_api_headers = {
+                "X-Daytona-Skip-Preview-Warning": "true",
+                # Screenshots are fetched separately as binary, and only when they changed
+                "X-Screenshot-Transfer": "binary",
+            }
+            if token:
+                self._browser_api_headers["X-Daytona-Preview-Token"] = token
+            self._browser_api_url = url.rstrip('/')
+        return self._browser_api_url
+
+    async def _request_via_http(self, endpoint: str, params: Optional[dict], method: str) -> str:
+        """Call the browser API directly through the sandbox preview URL, reusing connections."""
+        client = _get_http_client()
+        url = f"{await self._get_browser_api_url()}/api/automation/{endpoint}"
+        logger.debug(f"Browser API request: {method} {url}")
+        if method == "GET":
+            response = await client.get(url, params=params, headers=self._browser_api_headers)
+        else:
+            response = await client.request(method, url, json=params, headers=self._browser_api_headers)
+        return response.text
+
+    async def _request_via_exec(self, endpoint: str, params: Optional[dict], method: str) -> str:
+        """Call the browser API with curl inside the sandbox."""
+        url = f"http://localhost:{BROWSER_API_PORT}/api/automation/{endpoint}"
+        
+        if method == "GET" and params:
+            query_params = "&".join([f"{k}={v}" for k, v in params.items()])
+            url = f"{url}?{query_params}"
+            curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
+        else:
+            curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
+            if params:
+                json_data = json.dumps(params)
+                curl_cmd += f" -d '{json_data}'"
+        
+        logger.debug("\033[95mExecuting curl command:\033[0m")
+        logger.debug(f"{curl_cmd}")
+        
+        response = await asyncio.to_thread(self.sandbox.process.exec, curl_cmd, timeout=30)
+        if response.exit_code != 0:
+            raise RuntimeError(f"Browser automation request failed: {response}")
+        return response.result
+
+    async def _request(self, endpoint: str, params: Optional[dict] = None, method: str = "POST") -> str:
+        """Call the browser API through the preview URL, or through exec when it refuses connections."""
+        if time.monotonic() >= self._exec_fallback_until:
+            try:
+                return await self._request_via_http(endpoint, params, method)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # The request never reached the API, so it is safe to send it again.
+                # Errors after connecting (e.g. read timeouts) are reported instead,
+                # since the action may already have run.
+                logger.warning(f"Browser API not reachable through preview URL, falling back to exec: {e}")
+                self._exec_fallback_until = time.monotonic() + EXEC_FALLBACK_RETRY_INTERVAL
+        return await self._request_via_exec(endpoint, params, method)
+
     async def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST") -> ToolResult:
         """Execute a browser automation action through the API
         
@@ -118,100 +266,69 @@ class SandboxBrowserTool(SandboxToolsBase):
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            # Build the curl command
-            url = f"http://localhost:8003/api/automation/{endpoint}"
-            
-            if method == "GET" and params:
-                query_params = "&".join([f"{k}={v}" for k, v in params.items()])
-                url = f"{url}?{query_params}"
-                curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
-            else:
-                curl_cmd = f"curl -s -X {method} '{url}' -H 'Content-Type: application/json'"
-                if params:
-                    json_data = json.dumps(params)
-                    curl_cmd += f" -d '{json_data}'"
-            
-            logger.debug("\033[95mExecuting curl command:\033[0m")
-            logger.debug(f"{curl_cmd}")
+            raw_response = await self._request(endpoint, params, method)
             
-            response = self.sandbox.process.exec(curl_cmd, timeout=30)
-            
-            if response.exit_code == 0:
-                try:
-                    result = json.loads(response.result)
+            try:
+                result = json.loads(raw_response)
 
-                    if not "content" in result:
-                        result["content"] = ""
-                    
-                    if not "role" in result:
-                        result["role"] = "assistant"
+                if not "content" in result:
+                    result["content"] = ""
+                
+                if not "role" in result:
+                    result["role"] = "assistant"
 
-                    logger.info("Browser automation request completed successfully")
+                logger.info("Browser automation request completed successfully")
 
-                    if "screenshot_base64" in result:
-                        try:
-                            # Comprehensive validation of the base64 image data
-                            screenshot_data = result["screenshot_base64"]
-                            is_valid, validation_message = self._validate_base64_image(screenshot_data)
-                            
-                            if is_valid:
-                                logger.debug(f"Screenshot validation passed: {validation_message}")
-                                image_url = await upload_base64_image(screenshot_data)
-                                result["image_url"] = image_url
-                                logger.debug(f"Uploaded screenshot to {image_url}")
-                            else:
-                                logger.warning(f"Screenshot validation failed: {validation_message}")
-                                result["image_validation_error"] = validation_message
-                                
-                            # Remove base64 data from result to keep it clean
-                            del result["screenshot_base64"]
-                            
-                        except Exception as e:
-                            logger.error(f"Failed to process screenshot: {e}")
-                            result["image_upload_error"] = str(e)
+                if result.get("screenshot_id"):
+                    self._last_screenshot_id = result["screenshot_id"]
 
-                    added_message = await self.thread_manager.add_message(
-                        thread_id=self.thread_id,
-                        type="browser_state",
-                        content=result,
-                        is_llm_message=False
-                    )
+                if result.get("screenshot_base64") or result.get("screenshot_id"):
+                    try:
+                        await self._process_screenshot(result)
+                    except Exception as e:
+                        logger.error(f"Failed to process screenshot: {e}")
+                        result["image_upload_error"] = str(e)
+                
+                # Remove base64 data from result to keep it clean
+                result.pop("screenshot_base64", None)
 
-                    success_response = {}
+                added_message = await self.thread_manager.add_message(
+                    thread_id=self.thread_id,
+                    type="browser_state",
+                    content=result,
+                    is_llm_message=False
+                )
 
-                    if result.get("success"):
-                        success_response["success"] = result["success"]
-                        success_response["message"] = result.get("message", "Browser action completed successfully")
-                    else:
-                        success_response["success"] = False
-                        success_response["message"] = result.get("message", "Browser action failed")
+                success_response = {}
 
-                    if added_message and 'message_id' in added_message:
-                        success_response['message_id'] = added_message['message_id']
-                    if result.get("url"):
-                        success_response["url"] = result["url"]
-                    if result.get("title"):
-                        success_response["title"] = result["title"]
-                    if result.get("element_count"):
-                        success_response["elements_found"] = result["element_count"]
-                    if result.get("pixels_below"):
-                        success_response["scrollable_content"] = result["pixels_below"] > 0
-                    if result.get("ocr_text"):
-                        success_response["ocr_text"] = result["ocr_text"]
-                    if result.get("image_url"):
-                        success_response["image_url"] = result["image_url"]
+                if result.get("success"):
+                    success_response["success"] = result["success"]
+                    success_response["message"] = result.get("message", "Browser action completed successfully")
+                else:
+                    success_response["success"] = False
+                    success_response["message"] = result.get("message", "Browser action failed")
 
-                    if success_response.get("success"):
-                        return self.success_response(success_response)
-                    else:
-                        return self.fail_response(success_response)
+                if added_message and 'message_id' in added_message:
+                    success_response['message_id'] = added_message['message_id']
+                if result.get("url"):
+                    success_response["url"] = result["url"]
+                if result.get("title"):
+                    success_response["title"] = result["title"]
+                if result.get("element_count"):
+                    success_response["elements_found"] = result["element_count"]
+                if result.get("pixels_below"):
+                    success_response["scrollable_content"] = result["pixels_below"] > 0
+                if result.get("image_url"):
+                    success_response["image_url"] = result["image_url"]
 
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse response JSON: {response.result} {e}")
-                    return self.fail_response(f"Failed to parse response JSON: {response.result} {e}")
-            else:
-                logger.error(f"Browser automation request failed 2: {response}")
-                return self.fail_response(f"Browser automation request failed 2: {response}")
+                if success_response.get("success"):
+                    return self.success_response(success_response)
+                else:
+                    return self.fail_response(success_response)
+
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse response JSON: {raw_response} {e}")
+                return self.fail_response(f"Failed to parse response JSON: {raw_response} {e}")
 
         except Exception as e:
             logger.error(f"Error executing browser action: {e}")
@@ -235,7 +352,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["url"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-navigate-to",
         mappings=[
@@ -310,7 +427,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "properties": {}
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-go-back",
         mappings=[],
@@ -345,7 +462,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 }
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-wait",
         mappings=[
@@ -387,7 +504,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["index"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-click-element",
         mappings=[
@@ -433,7 +550,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["index", "text"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-input-text",
         mappings=[
@@ -478,7 +595,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["keys"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-send-keys",
         mappings=[
@@ -520,7 +637,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["page_id"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-switch-tab",
         mappings=[
@@ -602,7 +719,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["page_id"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-close-tab",
         mappings=[
@@ -702,7 +819,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 }
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-scroll-down",
         mappings=[
@@ -749,7 +866,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 }
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-scroll-up",
         mappings=[
@@ -797,7 +914,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["text"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-scroll-to-text",
         mappings=[
@@ -839,7 +956,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["index"]
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["browser"]))
     @xml_schema(
         tag_name="browser-get-dropdown-options",
         mappings=[
@@ -885,7 +1002,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["index", "text"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-select-dropdown-option",
         mappings=[
@@ -949,7 +1066,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 }
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-drag-drop",
         mappings=[
@@ -1022,7 +1139,7 @@ class SandboxBrowserTool(SandboxToolsBase):
                 "required": ["x", "y"]
             }
         }
-    })
+    }, footprint=BROWSER_ACTION_FOOTPRINT)
     @xml_schema(
         tag_name="browser-click-coordinates",
         mappings=[
@@ -1049,4 +1166,47 @@ class SandboxBrowserTool(SandboxToolsBase):
             dict: Result of the execution
         """
         logger.debug(f"\033[95mClicking at coordinates: ({x}, {y})\033[0m")
-        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y})
\ No newline at end of file
+        return await self._execute_browser_action("click_coordinates", {"x": x, "y": y})
+
+    @openapi_schema({
+        "type": "function",
+        "function": {
+            "name": "browser_get_screen_text",
+            "description": "Read the text visible in the latest browser screenshot using OCR. Use this when text is not available as page elements, e.g. text in images, canvases or embedded documents. Requires a previous browser action.",
+            "parameters": {
+                "type": "object",
+                "properties": {}
+            }
+        }
+    }, footprint=ToolFootprint(reads=["browser"]))
+    @xml_schema(
+        tag_name="browser-get-screen-text",
+        mappings=[],
+        example='''
+        <function_calls>
+        <invoke name="browser_get_screen_text">
+        </invoke>
+        </function_calls>
+        '''
+    )
+    async def browser_get_screen_text(self) -> ToolResult:
+        """Read the text of the latest screenshot with OCR
+        
+        Returns:
+            dict: Result of the execution
+        """
+        if not self._last_screenshot_id:
+            return self.fail_response("No screenshot available. Perform a browser action first, e.g. navigate to a page.")
+        
+        logger.debug(f"\033[95mReading screen text of screenshot: {self._last_screenshot_id}\033[0m")
+        try:
+            await self._ensure_sandbox()
+            raw_response = await self._request(f"ocr/{self._last_screenshot_id}", method="GET")
+            result = json.loads(raw_response)
+        except Exception as e:
+            logger.error(f"Error reading screen text: {e}")
+            return self.fail_response(f"Error reading screen text: {e}")
+        
+        if "ocr_text" not in result:
+            return self.fail_response(result.get("detail", "Screen text is not available for the latest screenshot"))
+        return self.success_response({"ocr_text": result["ocr_text"]})
@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase
 from utils.files_utils import clean_path
 from agentpress.thread_manager import ThreadManager
@@ -40,7 +40,7 @@ class SandboxDeployTool(SandboxToolsBase):
                 "required": ["name", "directory_path"]
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["workspace:directory_path"]))
     @xml_schema(
         tag_name="deploy",
         mappings=[
@@ -1,4 +1,4 @@
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase
 from agentpress.thread_manager import ThreadManager
 
@@ -26,7 +26,7 @@ class SandboxExposeTool(SandboxToolsBase):
                 "required": ["port"]
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["workspace"]))
     @xml_schema(
         tag_name="expose-port",
         mappings=[
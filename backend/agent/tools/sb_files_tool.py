@@ -1,8 +1,11 @@
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase    
 from utils.files_utils import should_exclude_file, clean_path
 from agentpress.thread_manager import ThreadManager
 from utils.logger import logger
+from sandbox.file_edits import fits_inline, replace_in_file, write_file
+from sandbox.workspace_manifest import ContentCache, WorkspaceManifest, build_manifest, get_manifest, diff_manifests, fetch_files
+from typing import Dict, List, Optional
 import os
 
 class SandboxFilesTool(SandboxToolsBase):
@@ -12,6 +15,7 @@ class SandboxFilesTool(SandboxToolsBase):
         super().__init__(project_id, thread_manager)
         self.SNIPPET_LINES = 4  # Number of context lines to show around edits
         self.workspace_path = "/workspace"  # Ensure we're always operating in /workspace
+        self._content_cache = ContentCache()  # Decoded file contents by content hash
 
     def clean_path(self, path: str) -> str:
         """Clean and normalize a path to be relative to /workspace"""
@@ -30,33 +34,29 @@ class SandboxFilesTool(SandboxToolsBase):
             return False
 
     async def get_workspace_state(self) -> dict:
-        """Get the current workspace state by reading all files"""
+        """Get the current workspace state with the contents of the top-level text files.
+
+        File metadata and content hashes come from a manifest computed inside the
+        sandbox in one exec; only files whose hash is not in the local content
+        cache are downloaded.
+        """
         files_state = {}
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            files = self.sandbox.fs.list_files(self.workspace_path)
-            for file_info in files:
-                rel_path = file_info.name
-                
-                # Skip excluded files and directories
-                if self._should_exclude_file(rel_path) or file_info.is_dir:
-                    continue
-
-                try:
-                    full_path = f"{self.workspace_path}/{rel_path}"
-                    content = self.sandbox.fs.download_file(full_path).decode()
-                    files_state[rel_path] = {
-                        "content": content,
-                        "is_dir": file_info.is_dir,
-                        "size": file_info.size,
-                        "modified": file_info.mod_time
-                    }
-                except Exception as e:
-                    print(f"Error reading file {rel_path}: {e}")
-                except UnicodeDecodeError:
-                    print(f"Skipping binary file: {rel_path}")
+            manifest = await build_manifest(self.sandbox, self.workspace_path)
+            top_level = [path for path in manifest.entries if "/" not in path]
+            contents = await self._get_contents(manifest, top_level)
+            
+            for rel_path, content in contents.items():
+                entry = manifest.entries[rel_path]
+                files_state[rel_path] = {
+                    "content": content,
+                    "is_dir": False,
+                    "size": entry.size,
+                    "modified": entry.mtime
+                }
 
             return files_state
         
@@ -64,6 +64,60 @@ class SandboxFilesTool(SandboxToolsBase):
             print(f"Error getting workspace state: {str(e)}")
             return {}
 
+    async def get_workspace_changes(self, since_version: Optional[str] = None) -> dict:
+        """Get the workspace changes since a previous manifest version.
+
+        Unlike get_workspace_state, this covers files in subdirectories too.
+
+        Args:
+            since_version: Version returned by an earlier call. If omitted or no
+                longer stored, every file is reported as added.
+
+        Returns:
+            dict with the new "version", "added"/"modified"/"deleted" paths and the
+            "files" contents of added and modified text files
+        """
+        await self._ensure_sandbox()
+        
+        manifest = await build_manifest(self.sandbox, self.workspace_path)
+        previous = await get_manifest(self.sandbox_id, since_version) if since_version else None
+        diff = diff_manifests(previous, manifest)
+        
+        return {
+            "version": manifest.version,
+            "previous_version": since_version if previous else None,
+            "added": diff.added,
+            "modified": diff.modified,
+            "deleted": diff.deleted,
+            "files": await self._get_contents(manifest, diff.changed)
+        }
+
+    async def _get_contents(self, manifest: WorkspaceManifest, paths: List[str]) -> Dict[str, str]:
+        """Text contents of the given paths, downloading only files whose hash is not cached."""
+        contents = {}
+        missing = []
+        for path in paths:
+            digest = manifest.entries[path].hash
+            if digest in self._content_cache:
+                content = self._content_cache.get(digest)
+                if content is not None:
+                    contents[path] = content
+            else:
+                missing.append(path)
+        
+        for path, raw in (await fetch_files(self.sandbox, self.workspace_path, missing)).items():
+            digest = manifest.entries[path].hash
+            try:
+                content = raw.decode()
+            except UnicodeDecodeError:
+                # Remember binary files so they are not downloaded again
+                self._content_cache.put(digest, None)
+                print(f"Skipping binary file: {path}")
+                continue
+            self._content_cache.put(digest, content)
+            contents[path] = content
+        return contents
+
 
     # def _get_preview_url(self, file_path: str) -> Optional[str]:
     #     """Get the preview URL for a file if it's an HTML file."""
@@ -96,7 +150,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 "required": ["file_path", "file_contents"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace:file_path"]))
     @xml_schema(
         tag_name="create-file",
         mappings=[
@@ -126,17 +180,23 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if self._file_exists(full_path):
-                return self.fail_response(f"File '{file_path}' already exists. Use update_file to modify existing files.")
-            
-            # Create parent directories if needed
-            parent_dir = '/'.join(full_path.split('/')[:-1])
-            if parent_dir:
-                self.sandbox.fs.create_folder(parent_dir, "755")
-            
-            # Write the file content
-            self.sandbox.fs.upload_file(file_contents.encode(), full_path)
-            self.sandbox.fs.set_file_permissions(full_path, permissions)
+            if fits_inline(full_path, file_contents):
+                # Existence check, parent directories, write and permissions in one exec
+                result = await write_file(self.sandbox, full_path, file_contents, permissions, must_not_exist=True)
+                if result["status"] == "exists":
+                    return self.fail_response(f"File '{file_path}' already exists. Use update_file to modify existing files.")
+            else:
+                if self._file_exists(full_path):
+                    return self.fail_response(f"File '{file_path}' already exists. Use update_file to modify existing files.")
+                
+                # Create parent directories if needed
+                parent_dir = '/'.join(full_path.split('/')[:-1])
+                if parent_dir:
+                    self.sandbox.fs.create_folder(parent_dir, "755")
+                
+                # Write the file content
+                self.sandbox.fs.upload_file(file_contents.encode(), full_path)
+                self.sandbox.fs.set_file_permissions(full_path, permissions)
             
             message = f"File '{file_path}' created successfully."
             
@@ -178,7 +238,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 "required": ["file_path", "old_str", "new_str"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace:file_path"]))
     @xml_schema(
         tag_name="str-replace",
         mappings=[
@@ -203,33 +263,38 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
-                return self.fail_response(f"File '{file_path}' does not exist")
-            
-            content = self.sandbox.fs.download_file(full_path).decode()
             old_str = old_str.expandtabs()
             new_str = new_str.expandtabs()
             
-            occurrences = content.count(old_str)
-            if occurrences == 0:
-                return self.fail_response(f"String '{old_str}' not found in file")
-            if occurrences > 1:
-                lines = [i+1 for i, line in enumerate(content.split('\n')) if old_str in line]
-                return self.fail_response(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
-            
-            # Perform replacement
-            new_content = content.replace(old_str, new_str)
-            self.sandbox.fs.upload_file(new_content.encode(), full_path)
-            
-            # Show snippet around the edit
-            replacement_line = content.split(old_str)[0].count('\n')
-            start_line = max(0, replacement_line - self.SNIPPET_LINES)
-            end_line = replacement_line + self.SNIPPET_LINES + new_str.count('\n')
-            snippet = '\n'.join(new_content.split('\n')[start_line:end_line + 1])
+            if fits_inline(full_path, old_str, new_str):
+                # Uniqueness check and replacement happen inside the sandbox
+                result = await replace_in_file(self.sandbox, full_path, old_str, new_str)
+                if result["status"] == "not_found":
+                    return self.fail_response(f"File '{file_path}' does not exist")
+                if result["status"] == "no_match":
+                    return self.fail_response(f"String '{old_str}' not found in file")
+                if result["status"] == "multiple":
+                    return self.fail_response(f"Multiple occurrences found in lines {result['lines']}. Please ensure string is unique")
+                line = result["line"]
+            else:
+                if not self._file_exists(full_path):
+                    return self.fail_response(f"File '{file_path}' does not exist")
+                
+                content = self.sandbox.fs.download_file(full_path).decode()
+                occurrences = content.count(old_str)
+                if occurrences == 0:
+                    return self.fail_response(f"String '{old_str}' not found in file")
+                if occurrences > 1:
+                    lines = [i+1 for i, line in enumerate(content.split('\n')) if old_str in line]
+                    return self.fail_response(f"Multiple occurrences found in lines {lines}. Please ensure string is unique")
+                
+                # Perform replacement
+                self.sandbox.fs.upload_file(content.replace(old_str, new_str).encode(), full_path)
+                line = content.split(old_str)[0].count('\n') + 1
             
             # Get preview URL if it's an HTML file
             # preview_url = self._get_preview_url(file_path)
-            message = f"Replacement successful."
+            message = f"Replacement successful at line {line}."
             # if preview_url:
             #     message += f"\n\nYou can preview this HTML file at: {preview_url}"
             
@@ -263,7 +328,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 "required": ["file_path", "file_contents"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace:file_path"]))
     @xml_schema(
         tag_name="full-file-rewrite",
         mappings=[
@@ -291,11 +356,17 @@ class SandboxFilesTool(SandboxToolsBase):
             
             file_path = self.clean_path(file_path)
             full_path = f"{self.workspace_path}/{file_path}"
-            if not self._file_exists(full_path):
-                return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
-            
-            self.sandbox.fs.upload_file(file_contents.encode(), full_path)
-            self.sandbox.fs.set_file_permissions(full_path, permissions)
+            if fits_inline(full_path, file_contents):
+                # Existence check, write and permissions in one exec
+                result = await write_file(self.sandbox, full_path, file_contents, permissions, must_exist=True)
+                if result["status"] == "not_found":
+                    return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
+            else:
+                if not self._file_exists(full_path):
+                    return self.fail_response(f"File '{file_path}' does not exist. Use create_file to create a new file.")
+                
+                self.sandbox.fs.upload_file(file_contents.encode(), full_path)
+                self.sandbox.fs.set_file_permissions(full_path, permissions)
             
             message = f"File '{file_path}' completely rewritten successfully."
             
@@ -329,7 +400,7 @@ class SandboxFilesTool(SandboxToolsBase):
                 "required": ["file_path"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace:file_path"]))
     @xml_schema(
         tag_name="delete-file",
         mappings=[
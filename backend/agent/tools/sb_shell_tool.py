@@ -1,8 +1,8 @@
 from typing import Optional, Dict, Any
-import time
 from uuid import uuid4
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase
+from sandbox.command_runner import SandboxCommandRunner, CommandResult
 from agentpress.thread_manager import ThreadManager
 
 class SandboxShellTool(SandboxToolsBase):
@@ -11,30 +11,26 @@ class SandboxShellTool(SandboxToolsBase):
 
     def __init__(self, project_id: str, thread_manager: ThreadManager):
         super().__init__(project_id, thread_manager)
-        self._sessions: Dict[str, str] = {}  # Maps session names to session IDs
         self.workspace_path = "/workspace"  # Ensure we're always operating in /workspace
+        self._command_runner: Optional[SandboxCommandRunner] = None
 
-    async def _ensure_session(self, session_name: str = "default") -> str:
-        """Ensure a session exists and return its ID."""
-        if session_name not in self._sessions:
-            session_id = str(uuid4())
-            try:
-                await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.create_session(session_id)
-                self._sessions[session_name] = session_id
-            except Exception as e:
-                raise RuntimeError(f"Failed to create session: {str(e)}")
-        return self._sessions[session_name]
+    @property
+    def command_runner(self) -> SandboxCommandRunner:
+        """Get the command runner for the sandbox. Call _ensure_sandbox() first."""
+        if self._command_runner is None:
+            self._command_runner = SandboxCommandRunner(self.sandbox)
+        return self._command_runner
 
-    async def _cleanup_session(self, session_name: str):
-        """Clean up a session if it exists."""
-        if session_name in self._sessions:
-            try:
-                await self._ensure_sandbox()  # Ensure sandbox is initialized
-                self.sandbox.process.delete_session(self._sessions[session_name])
-                del self._sessions[session_name]
-            except Exception as e:
-                print(f"Warning: Failed to cleanup session {session_name}: {str(e)}")
+    def _format_output(self, result: CommandResult) -> str:
+        """Prefix command output with a summary when older output was omitted."""
+        if not result.omitted_bytes:
+            return result.output
+        return (
+            f"[Output truncated: {result.omitted_bytes} bytes omitted, showing the last "
+            f"{result.total_size - result.start_offset - result.omitted_bytes} of {result.total_size - result.start_offset} new bytes "
+            f"(total log size {result.total_size} bytes). Use check_command_output with since or tail_lines to read specific parts.]\n"
+            + result.output
+        )
 
     @openapi_schema({
         "type": "function",
@@ -70,7 +66,7 @@ class SandboxShellTool(SandboxToolsBase):
                 "required": ["command"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace"]))
     @xml_schema(
         tag_name="execute-command",
         mappings=[
@@ -129,52 +125,28 @@ class SandboxShellTool(SandboxToolsBase):
             if not session_name:
                 session_name = f"session_{str(uuid4())[:8]}"
             
-            # Check if tmux session already exists
-            check_session = await self._execute_raw_command(f"tmux has-session -t {session_name} 2>/dev/null || echo 'not_exists'")
-            session_exists = "not_exists" not in check_session.get("output", "")
-            
-            if not session_exists:
-                # Create a new tmux session
-                await self._execute_raw_command(f"tmux new-session -d -s {session_name}")
-                
-            # Ensure we're in the correct directory and send command to tmux
-            full_command = f"cd {cwd} && {command}"
-            wrapped_command = full_command.replace('"', '\\"')  # Escape double quotes
-            
-            # Send command to tmux session
-            await self._execute_raw_command(f'tmux send-keys -t {session_name} "{wrapped_command}" Enter')
+            # Send the command to the tmux session (created if needed), wrapped with an exit-code sentinel
+            await self.command_runner.start(session_name, command, cwd)
             
             if blocking:
-                # For blocking execution, wait and capture output
-                start_time = time.time()
-                while (time.time() - start_time) < timeout:
-                    # Wait a bit before checking
-                    time.sleep(2)
-                    
-                    # Check if session still exists (command might have exited)
-                    check_result = await self._execute_raw_command(f"tmux has-session -t {session_name} 2>/dev/null || echo 'ended'")
-                    if "ended" in check_result.get("output", ""):
-                        break
-                        
-                    # Get current output and check for common completion indicators
-                    output_result = await self._execute_raw_command(f"tmux capture-pane -t {session_name} -p -S - -E -")
-                    current_output = output_result.get("output", "")
-                    
-                    # Check for prompt indicators that suggest command completion
-                    last_lines = current_output.split('\n')[-3:]
-                    completion_indicators = ['$', '#', '>', 'Done', 'Completed', 'Finished', '✓']
-                    if any(indicator in line for indicator in completion_indicators for line in last_lines):
-                        break
+                # Wait for the sentinel inside the sandbox; returns as soon as the command exits
+                result = await self.command_runner.wait(session_name, timeout)
                 
-                # Capture final output
-                output_result = await self._execute_raw_command(f"tmux capture-pane -t {session_name} -p -S - -E -")
-                final_output = output_result.get("output", "")
+                if not result.completed:
+                    return self.success_response({
+                        "output": self._format_output(result),
+                        "session_name": session_name,
+                        "cwd": cwd,
+                        "message": f"Command did not finish within {timeout} seconds and is still running in tmux session '{session_name}'. Use check_command_output to view further results.",
+                        "completed": False
+                    })
                 
                 # Kill the session after capture
-                await self._execute_raw_command(f"tmux kill-session -t {session_name}")
+                await self.command_runner.kill_session(session_name)
                 
                 return self.success_response({
-                    "output": final_output,
+                    "output": self._format_output(result),
+                    "exit_code": result.exit_code,
                     "session_name": session_name,
                     "cwd": cwd,
                     "completed": True
@@ -192,38 +164,17 @@ class SandboxShellTool(SandboxToolsBase):
             # Attempt to clean up session in case of error
             if session_name:
                 try:
-                    await self._execute_raw_command(f"tmux kill-session -t {session_name}")
+                    await self.command_runner.kill_session(session_name)
                 except:
                     pass
             return self.fail_response(f"Error executing command: {str(e)}")
 
     async def _execute_raw_command(self, command: str) -> Dict[str, Any]:
         """Execute a raw command directly in the sandbox."""
-        # Ensure session exists for raw commands
-        session_id = await self._ensure_session("raw_commands")
-        
-        # Execute command in session
-        from sandbox.sandbox import SessionExecuteRequest
-        req = SessionExecuteRequest(
-            command=command,
-            var_async=False,
-            cwd=self.workspace_path
-        )
-        
-        response = self.sandbox.process.execute_session_command(
-            session_id=session_id,
-            req=req,
-            timeout=30  # Short timeout for utility commands
-        )
-        
-        logs = self.sandbox.process.get_session_command_logs(
-            session_id=session_id,
-            command_id=response.cmd_id
-        )
-        
+        result = (await self.command_runner.run_batch([command]))[0]
         return {
-            "output": logs,
-            "exit_code": response.exit_code
+            "output": result.output,
+            "exit_code": result.exit_code
         }
 
     @openapi_schema({
@@ -242,17 +193,27 @@ class SandboxShellTool(SandboxToolsBase):
                         "type": "boolean",
                         "description": "Whether to terminate the tmux session after checking. Set to true when you're done with the command.",
                         "default": False
+                    },
+                    "since": {
+                        "type": "integer",
+                        "description": "Optional byte offset in the session output to read from. Defaults to the end of the previous check, so only new output is returned. Use 0 to read the output from the beginning."
+                    },
+                    "tail_lines": {
+                        "type": "integer",
+                        "description": "Optional number of lines to return from the end of the selected output. Useful for long-running builds and servers."
                     }
                 },
                 "required": ["session_name"]
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["workspace"]))
     @xml_schema(
         tag_name="check-command-output",
         mappings=[
             {"param_name": "session_name", "node_type": "attribute", "path": ".", "required": True},
-            {"param_name": "kill_session", "node_type": "attribute", "path": ".", "required": False}
+            {"param_name": "kill_session", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "since", "node_type": "attribute", "path": ".", "required": False},
+            {"param_name": "tail_lines", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <function_calls>
@@ -268,37 +229,60 @@ class SandboxShellTool(SandboxToolsBase):
         <parameter name="kill_session">true</parameter>
         </invoke>
         </function_calls>
+        
+        <!-- Example 3: Show the last 50 lines of all output -->
+        <function_calls>
+        <invoke name="check_command_output">
+        <parameter name="session_name">dev_server</parameter>
+        <parameter name="since">0</parameter>
+        <parameter name="tail_lines">50</parameter>
+        </invoke>
+        </function_calls>
         '''
     )
     async def check_command_output(
         self,
         session_name: str,
-        kill_session: bool = False
+        kill_session: bool = False,
+        since: Optional[int] = None,
+        tail_lines: Optional[int] = None
     ) -> ToolResult:
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            # Check if session exists
-            check_result = await self._execute_raw_command(f"tmux has-session -t {session_name} 2>/dev/null || echo 'not_exists'")
-            if "not_exists" in check_result.get("output", ""):
-                return self.fail_response(f"Tmux session '{session_name}' does not exist.")
+            # Check the session, read new output and optionally kill it in one round trip
+            runner = self.command_runner
+            commands = [
+                runner.has_session_command(session_name),
+                runner.read_output_command(
+                    session_name,
+                    since=int(since) if since is not None else None,
+                    tail_lines=int(tail_lines) if tail_lines else None,
+                ),
+            ]
+            if kill_session:
+                commands.append(runner.kill_session_command(session_name))
+            batch = await runner.run_batch(commands)
             
-            # Get output from tmux pane
-            output_result = await self._execute_raw_command(f"tmux capture-pane -t {session_name} -p -S - -E -")
-            output = output_result.get("output", "")
+            if batch[0].exit_code != 0:
+                return self.fail_response(f"Tmux session '{session_name}' does not exist.")
+            result = runner.parse_output(session_name, batch[1].output)
             
-            # Kill session if requested
             if kill_session:
-                await self._execute_raw_command(f"tmux kill-session -t {session_name}")
                 termination_status = "Session terminated."
+            elif result.completed:
+                termination_status = f"Command finished with exit code {result.exit_code}. Session still open."
             else:
                 termination_status = "Session still running."
             
             return self.success_response({
-                "output": output,
+                "output": self._format_output(result),
                 "session_name": session_name,
-                "status": termination_status
+                "status": termination_status,
+                "exit_code": result.exit_code,
+                "offset": result.offset,
+                "total_size": result.total_size
             })
                 
         except Exception as e:
@@ -320,7 +304,7 @@ class SandboxShellTool(SandboxToolsBase):
                 "required": ["session_name"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["workspace"]))
     @xml_schema(
         tag_name="terminate-command",
         mappings=[
@@ -342,14 +326,15 @@ class SandboxShellTool(SandboxToolsBase):
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
             
-            # Check if session exists
-            check_result = await self._execute_raw_command(f"tmux has-session -t {session_name} 2>/dev/null || echo 'not_exists'")
-            if "not_exists" in check_result.get("output", ""):
+            # Check if the session exists and kill it in one round trip
+            runner = self.command_runner
+            batch = await runner.run_batch([
+                runner.has_session_command(session_name),
+                runner.kill_session_command(session_name),
+            ])
+            if batch[0].exit_code != 0:
                 return self.fail_response(f"Tmux session '{session_name}' does not exist.")
             
-            # Kill the session
-            await self._execute_raw_command(f"tmux kill-session -t {session_name}")
-            
             return self.success_response({
                 "message": f"Tmux session '{session_name}' terminated successfully."
             })
@@ -367,7 +352,7 @@ class SandboxShellTool(SandboxToolsBase):
                 "properties": {}
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["workspace"]))
     @xml_schema(
         tag_name="list-commands",
         mappings=[],
@@ -411,13 +396,10 @@ class SandboxShellTool(SandboxToolsBase):
             return self.fail_response(f"Error listing commands: {str(e)}")
 
     async def cleanup(self):
-        """Clean up all sessions."""
-        for session_name in list(self._sessions.keys()):
-            await self._cleanup_session(session_name)
-        
-        # Also clean up any tmux sessions
+        """Clean up all tmux sessions and the control session."""
         try:
             await self._ensure_sandbox()
             await self._execute_raw_command("tmux kill-server 2>/dev/null || true")
+            await self.command_runner.close()
         except:
             pass
\ No newline at end of file
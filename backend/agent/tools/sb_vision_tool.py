@@ -1,13 +1,25 @@
 import os
+import asyncio
 import base64
+import hashlib
 import mimetypes
-from typing import Optional, Tuple
-from io import BytesIO
-from PIL import Image
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
 
-from agentpress.tool import ToolResult, openapi_schema, xml_schema
+from agentpress.tool import ToolResult, openapi_schema, xml_schema, ToolFootprint
 from sandbox.tool_base import SandboxToolsBase
 from agentpress.thread_manager import ThreadManager
+from services import redis
+from utils.image_compression import (
+    compress_image_bytes,
+    DEFAULT_MAX_WIDTH,
+    DEFAULT_MAX_HEIGHT,
+    DEFAULT_JPEG_QUALITY,
+    DEFAULT_PNG_COMPRESS_LEVEL,
+)
+from utils.logger import logger
 import json
 
 # Add common image MIME types if mimetypes module is limited
@@ -21,11 +33,52 @@ mimetypes.add_type("image/gif", ".gif")
 MAX_IMAGE_SIZE = 10 * 1024 * 1024
 MAX_COMPRESSED_SIZE = 5 * 1024 * 1024
 
-# Compression settings
-DEFAULT_MAX_WIDTH = 1920
-DEFAULT_MAX_HEIGHT = 1080
-DEFAULT_JPEG_QUALITY = 85
-DEFAULT_PNG_COMPRESS_LEVEL = 6
+# Worker processes for image compression, so resizing and encoding stay off the event loop
+COMPRESSION_WORKERS = int(os.getenv("IMAGE_COMPRESSION_WORKERS", "2"))
+# How long compressed variants of sandbox images are reused (seconds)
+VARIANT_CACHE_TTL = 3600
+# How long a loaded image waits for the next LLM turn (seconds)
+IMAGE_CONTEXT_TTL = 600
+
+_compression_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_compression_pool() -> ProcessPoolExecutor:
+    global _compression_pool
+    if _compression_pool is None:
+        _compression_pool = ProcessPoolExecutor(
+            max_workers=COMPRESSION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _compression_pool
+
+
+async def compress_image_async(image_bytes: bytes, mime_type: str, file_path: str) -> Tuple[bytes, str]:
+    """Compress an image in the worker pool without blocking the event loop."""
+    global _compression_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_compression_pool(), compress_image_bytes, image_bytes, mime_type, file_path)
+    except BrokenProcessPool:
+        logger.warning("Image compression pool broke, compressing in a thread instead")
+        _compression_pool = None
+        return await asyncio.to_thread(compress_image_bytes, image_bytes, mime_type, file_path)
+
+
+def _image_context_key(thread_id: str) -> str:
+    return f"image_context:{thread_id}"
+
+
+async def pop_image_contexts(thread_id: str) -> List[dict]:
+    """Take the images loaded by see_image for a thread since the last LLM turn."""
+    redis_client = await redis.get_client()
+    # Read and clear atomically so an image queued in between is not lost
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.lrange(_image_context_key(thread_id), 0, -1)
+        pipe.delete(_image_context_key(thread_id))
+        entries, _ = await pipe.execute()
+    return [json.loads(entry) for entry in entries]
+
 
 class SandboxVisionTool(SandboxToolsBase):
     """Tool for allowing the agent to 'see' images within the sandbox."""
@@ -37,68 +90,13 @@ class SandboxVisionTool(SandboxToolsBase):
         self.thread_manager = thread_manager
 
     def compress_image(self, image_bytes: bytes, mime_type: str, file_path: str) -> Tuple[bytes, str]:
-        """Compress an image to reduce its size while maintaining reasonable quality.
-        
-        Args:
-            image_bytes: Original image bytes
-            mime_type: MIME type of the image
-            file_path: Path to the image file (for logging)
-            
-        Returns:
-            Tuple of (compressed_bytes, new_mime_type)
-        """
-        try:
-            # Open image from bytes
-            img = Image.open(BytesIO(image_bytes))
-            
-            # Convert RGBA to RGB if necessary (for JPEG)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Create a white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            width, height = img.size
-            if width > DEFAULT_MAX_WIDTH or height > DEFAULT_MAX_HEIGHT:
-                ratio = min(DEFAULT_MAX_WIDTH / width, DEFAULT_MAX_HEIGHT / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(f"[SeeImage] Resized image from {width}x{height} to {new_width}x{new_height}")
-            
-            # Save to bytes with compression
-            output = BytesIO()
-            
-            # Determine output format based on original mime type
-            if mime_type == 'image/gif':
-                # Keep GIFs as GIFs to preserve animation
-                img.save(output, format='GIF', optimize=True)
-                output_mime = 'image/gif'
-            elif mime_type == 'image/png':
-                # Compress PNG
-                img.save(output, format='PNG', optimize=True, compress_level=DEFAULT_PNG_COMPRESS_LEVEL)
-                output_mime = 'image/png'
-            else:
-                # Convert everything else to JPEG for better compression
-                img.save(output, format='JPEG', quality=DEFAULT_JPEG_QUALITY, optimize=True)
-                output_mime = 'image/jpeg'
-            
-            compressed_bytes = output.getvalue()
-            
-            # Log compression results
-            original_size = len(image_bytes)
-            compressed_size = len(compressed_bytes)
-            compression_ratio = (1 - compressed_size / original_size) * 100
-            print(f"[SeeImage] Compressed '{file_path}' from {original_size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB ({compression_ratio:.1f}% reduction)")
-            
-            return compressed_bytes, output_mime
-            
-        except Exception as e:
-            print(f"[SeeImage] Failed to compress image: {str(e)}. Using original.")
-            return image_bytes, mime_type
+        """Compress an image synchronously. See compress_image_bytes."""
+        return compress_image_bytes(image_bytes, mime_type, file_path)
+
+    def _variant_cache_key(self, full_path: str, file_info) -> str:
+        settings = f"{DEFAULT_MAX_WIDTH}x{DEFAULT_MAX_HEIGHT}:{DEFAULT_JPEG_QUALITY}:{DEFAULT_PNG_COMPRESS_LEVEL}"
+        identity = f"{self.sandbox_id}:{full_path}:{file_info.size}:{getattr(file_info, 'mod_time', '')}:{settings}"
+        return f"image_variant:{hashlib.sha256(identity.encode()).hexdigest()}"
 
     @openapi_schema({
         "type": "function",
@@ -116,7 +114,7 @@ class SandboxVisionTool(SandboxToolsBase):
                 "required": ["file_path"]
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["workspace:file_path"]))
     @xml_schema(
         tag_name="see-image",
         mappings=[
@@ -132,7 +130,7 @@ class SandboxVisionTool(SandboxToolsBase):
         '''
     )
     async def see_image(self, file_path: str) -> ToolResult:
-        """Reads an image file, compresses it, converts it to base64, and adds it as a temporary message."""
+        """Reads an image file, compresses it, converts it to base64, and queues it for the next LLM turn."""
         try:
             # Ensure sandbox is initialized
             await self._ensure_sandbox()
@@ -143,7 +141,7 @@ class SandboxVisionTool(SandboxToolsBase):
 
             # Check if file exists and get info
             try:
-                file_info = self.sandbox.fs.get_file_info(full_path)
+                file_info = await asyncio.to_thread(self.sandbox.fs.get_file_info, full_path)
                 if file_info.is_dir:
                     return self.fail_response(f"Path '{cleaned_path}' is a directory, not an image file.")
             except Exception as e:
@@ -153,12 +151,6 @@ class SandboxVisionTool(SandboxToolsBase):
             if file_info.size > MAX_IMAGE_SIZE:
                 return self.fail_response(f"Image file '{cleaned_path}' is too large ({file_info.size / (1024*1024):.2f}MB). Maximum size is {MAX_IMAGE_SIZE / (1024*1024)}MB.")
 
-            # Read image file content
-            try:
-                image_bytes = self.sandbox.fs.download_file(full_path)
-            except Exception as e:
-                return self.fail_response(f"Could not read image file: {cleaned_path}")
-
             # Determine MIME type
             mime_type, _ = mimetypes.guess_type(full_path)
             if not mime_type or not mime_type.startswith('image/'):
@@ -171,15 +163,45 @@ class SandboxVisionTool(SandboxToolsBase):
                 else:
                     return self.fail_response(f"Unsupported or unknown image format for file: '{cleaned_path}'. Supported: JPG, PNG, GIF, WEBP.")
 
-            # Compress the image
-            compressed_bytes, compressed_mime_type = self.compress_image(image_bytes, mime_type, cleaned_path)
-            
-            # Check if compressed image is still too large
-            if len(compressed_bytes) > MAX_COMPRESSED_SIZE:
-                return self.fail_response(f"Image file '{cleaned_path}' is still too large after compression ({len(compressed_bytes) / (1024*1024):.2f}MB). Maximum compressed size is {MAX_COMPRESSED_SIZE / (1024*1024)}MB.")
+            # Reuse the compressed variant if this version of the file was seen before
+            variant_key = self._variant_cache_key(full_path, file_info)
+            variant = None
+            try:
+                cached_variant = await redis.get(variant_key)
+                variant = json.loads(cached_variant) if cached_variant else None
+            except Exception as e:
+                logger.warning(f"Failed to read image variant cache: {str(e)}")
 
-            # Convert to base64
-            base64_image = base64.b64encode(compressed_bytes).decode('utf-8')
+            if variant:
+                base64_image = variant["base64"]
+                compressed_mime_type = variant["mime_type"]
+                compressed_size = variant["compressed_size"]
+            else:
+                # Read image file content
+                try:
+                    image_bytes = await asyncio.to_thread(self.sandbox.fs.download_file, full_path)
+                except Exception as e:
+                    return self.fail_response(f"Could not read image file: {cleaned_path}")
+
+                # Compress the image
+                compressed_bytes, compressed_mime_type = await compress_image_async(image_bytes, mime_type, cleaned_path)
+                compressed_size = len(compressed_bytes)
+                
+                # Check if compressed image is still too large
+                if compressed_size > MAX_COMPRESSED_SIZE:
+                    return self.fail_response(f"Image file '{cleaned_path}' is still too large after compression ({compressed_size / (1024*1024):.2f}MB). Maximum compressed size is {MAX_COMPRESSED_SIZE / (1024*1024)}MB.")
+
+                # Convert to base64
+                base64_image = base64.b64encode(compressed_bytes).decode('utf-8')
+
+                try:
+                    await redis.set(variant_key, json.dumps({
+                        "base64": base64_image,
+                        "mime_type": compressed_mime_type,
+                        "compressed_size": compressed_size
+                    }), ex=VARIANT_CACHE_TTL)
+                except Exception as e:
+                    logger.warning(f"Failed to cache image variant: {str(e)}")
 
             # Prepare the temporary message content
             image_context_data = {
@@ -187,20 +209,16 @@ class SandboxVisionTool(SandboxToolsBase):
                 "base64": base64_image,
                 "file_path": cleaned_path, # Include path for context
                 "original_size": file_info.size,
-                "compressed_size": len(compressed_bytes)
+                "compressed_size": compressed_size
             }
 
-            # Add the temporary message using the thread_manager callback
-            # Use a distinct type like 'image_context'
-            await self.thread_manager.add_message(
-                thread_id=self.thread_id,
-                type="image_context", # Use a specific type for this
-                content=image_context_data, # Store the dict directly
-                is_llm_message=False # This is context generated by a tool
-            )
+            # Hand the image to the next LLM turn through a short-lived Redis slot
+            key = _image_context_key(self.thread_id)
+            await redis.rpush(key, json.dumps(image_context_data))
+            await redis.expire(key, IMAGE_CONTEXT_TTL)
 
             # Inform the agent the image will be available next turn
-            return self.success_response(f"Successfully loaded and compressed the image '{cleaned_path}' (reduced from {file_info.size / 1024:.1f}KB to {len(compressed_bytes) / 1024:.1f}KB).")
+            return self.success_response(f"Successfully loaded and compressed the image '{cleaned_path}' (reduced from {file_info.size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB).")
 
         except Exception as e:
             return self.fail_response(f"An unexpected error occurred while trying to see the image: {str(e)}") 
\ No newline at end of file
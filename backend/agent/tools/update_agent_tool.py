@@ -1,8 +1,8 @@
 import json
-import httpx
 from typing import Optional, Dict, Any, List
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolFootprint
 from agentpress.thread_manager import ThreadManager
+from mcp_local import registry
 
 class UpdateAgentTool(Tool):
     """Tool for updating agent configuration.
@@ -16,10 +16,6 @@ class UpdateAgentTool(Tool):
         self.thread_manager = thread_manager
         self.db = db_connection
         self.agent_id = agent_id
-        # Smithery API configuration
-        self.smithery_api_base_url = "https://registry.smithery.ai"
-        import os
-        self.smithery_api_key = os.getenv("SMITHERY_API_KEY")
 
     @openapi_schema({
         "type": "function",
@@ -80,7 +76,7 @@ class UpdateAgentTool(Tool):
                 "required": []
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["agent_config"]))
     @xml_schema(
         tag_name="update-agent",
         mappings=[
@@ -185,7 +181,7 @@ class UpdateAgentTool(Tool):
                 "required": []
             }
         }
-    })
+    }, footprint=ToolFootprint(reads=["agent_config"]))
     @xml_schema(
         tag_name="get-current-agent-config",
         mappings=[],
@@ -262,7 +258,7 @@ class UpdateAgentTool(Tool):
                 "required": ["query"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="search-mcp-servers",
         mappings=[
@@ -296,68 +292,46 @@ class UpdateAgentTool(Tool):
             ToolResult with matching MCP servers
         """
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Accept": "application/json",
-                    "User-Agent": "Suna-MCP-Integration/1.0"
-                }
-                
-                if self.smithery_api_key:
-                    headers["Authorization"] = f"Bearer {self.smithery_api_key}"
-                
-                params = {
-                    "q": query,
-                    "page": 1,
-                    "pageSize": min(limit * 2, 50)  # Get more results to filter
-                }
-                
-                response = await client.get(
-                    f"{self.smithery_api_base_url}/servers",
-                    headers=headers,
-                    params=params,
-                    timeout=30.0
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                servers = data.get("servers", [])
-                
-                # Filter by category if specified
-                if category:
-                    filtered_servers = []
-                    for server in servers:
-                        server_category = self._categorize_server(server)
-                        if server_category == category:
-                            filtered_servers.append(server)
-                    servers = filtered_servers
-                
-                # Sort by useCount and limit results
-                servers = sorted(servers, key=lambda x: x.get("useCount", 0), reverse=True)[:limit]
-                
-                # Format results for user-friendly display
-                formatted_servers = []
+            # Registry responses are shared and cached across agents
+            data = await registry.list_servers(q=query, page=1, page_size=min(limit * 2, 50))  # Get more results to filter
+            servers = data.get("servers", [])
+            
+            # Filter by category if specified
+            if category:
+                filtered_servers = []
                 for server in servers:
-                    formatted_servers.append({
-                        "name": server.get("displayName", server.get("qualifiedName", "Unknown")),
-                        "qualifiedName": server.get("qualifiedName"),
-                        "description": server.get("description", "No description available"),
-                        "useCount": server.get("useCount", 0),
-                        "category": self._categorize_server(server),
-                        "homepage": server.get("homepage", ""),
-                        "isDeployed": server.get("isDeployed", False)
-                    })
-                
-                if not formatted_servers:
-                    return ToolResult(
-                        success=False,
-                        output=json.dumps([], ensure_ascii=False)
-                    )
-                
+                    server_category = self._categorize_server(server)
+                    if server_category == category:
+                        filtered_servers.append(server)
+                servers = filtered_servers
+            
+            # Sort by useCount and limit results
+            servers = sorted(servers, key=lambda x: x.get("useCount", 0), reverse=True)[:limit]
+            
+            # Format results for user-friendly display
+            formatted_servers = []
+            for server in servers:
+                formatted_servers.append({
+                    "name": server.get("displayName", server.get("qualifiedName", "Unknown")),
+                    "qualifiedName": server.get("qualifiedName"),
+                    "description": server.get("description", "No description available"),
+                    "useCount": server.get("useCount", 0),
+                    "category": self._categorize_server(server),
+                    "homepage": server.get("homepage", ""),
+                    "isDeployed": server.get("isDeployed", False)
+                })
+            
+            if not formatted_servers:
                 return ToolResult(
-                    success=True,
-                    output=json.dumps(formatted_servers, ensure_ascii=False)
+                    success=False,
+                    output=json.dumps([], ensure_ascii=False)
                 )
-                
+            
+            return ToolResult(
+                success=True,
+                output=json.dumps(formatted_servers, ensure_ascii=False)
+            )
+            
         except Exception as e:
             return self.fail_response(f"Error searching MCP servers: {str(e)}")
 
@@ -377,7 +351,7 @@ class UpdateAgentTool(Tool):
                 "required": ["qualified_name"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="get-mcp-server-tools",
         mappings=[
@@ -402,32 +376,7 @@ class UpdateAgentTool(Tool):
         """
         try:
             # First get server metadata from registry
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Accept": "application/json",
-                    "User-Agent": "Suna-MCP-Integration/1.0"
-                }
-                
-                if self.smithery_api_key:
-                    headers["Authorization"] = f"Bearer {self.smithery_api_key}"
-                
-                # URL encode the qualified name if it contains special characters
-                from urllib.parse import quote
-                if '@' in qualified_name or '/' in qualified_name:
-                    encoded_name = quote(qualified_name, safe='')
-                else:
-                    encoded_name = qualified_name
-                
-                url = f"{self.smithery_api_base_url}/servers/{encoded_name}"
-                
-                response = await client.get(
-                    url,
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                response.raise_for_status()
-                server_data = response.json()
+            server_data = await registry.get_server(qualified_name)
             
             # Now connect to the MCP server to get actual tools using ClientSession
             try:
@@ -585,7 +534,7 @@ class UpdateAgentTool(Tool):
                 "required": ["qualified_name", "display_name", "enabled_tools"]
             }
         }
-    })
+    }, footprint=ToolFootprint(writes=["agent_config"]))
     @xml_schema(
         tag_name="configure-mcp-server",
         mappings=[
@@ -692,7 +641,7 @@ class UpdateAgentTool(Tool):
                 "required": []
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="get-popular-mcp-servers",
         mappings=[
@@ -716,55 +665,38 @@ class UpdateAgentTool(Tool):
             ToolResult with popular MCP servers
         """
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Accept": "application/json",
-                    "User-Agent": "Suna-MCP-Integration/1.0"
-                }
-                
-                if self.smithery_api_key:
-                    headers["Authorization"] = f"Bearer {self.smithery_api_key}"
-                
-                response = await client.get(
-                    f"{self.smithery_api_base_url}/servers",
-                    headers=headers,
-                    params={"page": 1, "pageSize": 50},
-                    timeout=30.0
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                servers = data.get("servers", [])
-                
-                # Categorize servers
-                categorized = {}
-                for server in servers:
-                    server_category = self._categorize_server(server)
-                    if category and server_category != category:
-                        continue
-                        
-                    if server_category not in categorized:
-                        categorized[server_category] = []
+            data = await registry.list_servers(page=1, page_size=50)
+            servers = data.get("servers", [])
+            
+            # Categorize servers
+            categorized = {}
+            for server in servers:
+                server_category = self._categorize_server(server)
+                if category and server_category != category:
+                    continue
                     
-                    categorized[server_category].append({
-                        "name": server.get("displayName", server.get("qualifiedName", "Unknown")),
-                        "qualifiedName": server.get("qualifiedName"),
-                        "description": server.get("description", "No description available"),
-                        "useCount": server.get("useCount", 0),
-                        "homepage": server.get("homepage", ""),
-                        "isDeployed": server.get("isDeployed", False)
-                    })
-                
-                # Sort categories and servers within each category
-                for cat in categorized:
-                    categorized[cat] = sorted(categorized[cat], key=lambda x: x["useCount"], reverse=True)[:5]
-                
-                return self.success_response({
-                    "message": f"Found popular MCP servers" + (f" in category '{category}'" if category else ""),
-                    "categorized_servers": categorized,
-                    "total_categories": len(categorized)
+                if server_category not in categorized:
+                    categorized[server_category] = []
+                
+                categorized[server_category].append({
+                    "name": server.get("displayName", server.get("qualifiedName", "Unknown")),
+                    "qualifiedName": server.get("qualifiedName"),
+                    "description": server.get("description", "No description available"),
+                    "useCount": server.get("useCount", 0),
+                    "homepage": server.get("homepage", ""),
+                    "isDeployed": server.get("isDeployed", False)
                 })
-                
+            
+            # Sort categories and servers within each category
+            for cat in categorized:
+                categorized[cat] = sorted(categorized[cat], key=lambda x: x["useCount"], reverse=True)[:5]
+            
+            return self.success_response({
+                "message": f"Found popular MCP servers" + (f" in category '{category}'" if category else ""),
+                "categorized_servers": categorized,
+                "total_categories": len(categorized)
+            })
+            
         except Exception as e:
             return self.fail_response(f"Error getting popular MCP servers: {str(e)}")
 
@@ -818,7 +750,7 @@ class UpdateAgentTool(Tool):
                 "required": ["qualified_name"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="test-mcp-server-connection",
         mappings=[
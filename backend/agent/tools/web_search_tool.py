@@ -1,18 +1,89 @@
 from tavily import AsyncTavilyClient
 import httpx
 from dotenv import load_dotenv
-from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema
+from agentpress.tool import Tool, ToolResult, openapi_schema, xml_schema, ToolFootprint
 from utils.config import config
 from sandbox.tool_base import SandboxToolsBase
 from agentpress.thread_manager import ThreadManager
+from services import redis
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
 import json
 import os
 import datetime
 import asyncio
+import hashlib
 import logging
+import random
+import re
 
 # TODO: add subpages, etc... in filters as sometimes its necessary 
 
+# Maximum number of URLs scraped at the same time in one scrape_webpage call
+SCRAPE_CONCURRENCY = 5
+# How long scraped page content is reused across runs (seconds)
+SCRAPE_CACHE_TTL = 3600
+# Pages with more content than this are not cached
+SCRAPE_CACHE_MAX_BYTES = 2 * 1024 * 1024
+SCRAPE_TIMEOUT = 120
+SCRAPE_MAX_RETRIES = 3
+SCRAPE_RETRY_BACKOFF = 0.5
+
+# How long search results are reused; queries asking for recent information expire sooner (seconds)
+SEARCH_CACHE_TTL = 6 * 3600
+SEARCH_CACHE_TTL_RECENT = 600
+# Queries matching this are about fast-changing information
+RECENCY_PATTERN = re.compile(
+    r"\b(latest|today|tonight|yesterday|tomorrow|now|current|currently|breaking|news|live|recent|recently|"
+    r"this (week|month|year)|price|prices|stock|stocks|weather|score|scores|election|20\d\d)\b"
+)
+
+# Query parameters that do not change page content
+TRACKING_PARAMS = {"gclid", "fbclid", "mc_cid", "mc_eid", "ref_src"}
+
+_scrape_client: httpx.AsyncClient | None = None
+
+# Searches currently in progress by cache key, so concurrent identical searches share one Tavily call
+_inflight_searches: dict[str, asyncio.Future] = {}
+
+
+def _get_scrape_client() -> httpx.AsyncClient:
+    """Shared HTTP client for scrape requests, so connections are reused across calls."""
+    global _scrape_client
+    if _scrape_client is None or _scrape_client.is_closed:
+        _scrape_client = httpx.AsyncClient(
+            timeout=SCRAPE_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _scrape_client
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip("?!.")
+
+
+def search_cache_ttl(query: str) -> int:
+    """Cache lifetime for a normalized query, shorter for queries about recent information."""
+    return SEARCH_CACHE_TTL_RECENT if RECENCY_PATTERN.search(query) else SEARCH_CACHE_TTL
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so that equivalent spellings of the same page share a cache entry."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not ((scheme == "http" and parsed.port == 80) or (scheme == "https" and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
 class SandboxWebSearchTool(SandboxToolsBase):
     """Tool for performing web searches using Tavily API and web scraping using Firecrawl."""
 
@@ -32,6 +103,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
 
         # Tavily asynchronous search client
         self.tavily_client = AsyncTavilyClient(api_key=self.tavily_api_key)
+        self._account_id = None
 
     @openapi_schema({
         "type": "function",
@@ -49,17 +121,23 @@ class SandboxWebSearchTool(SandboxToolsBase):
                         "type": "integer",
                         "description": "The number of search results to return. Increase for more comprehensive research or decrease for focused, high-relevance results.",
                         "default": 20
+                    },
+                    "fresh": {
+                        "type": "boolean",
+                        "description": "Skip cached results and always run a new search. Only use this for time-critical queries where results from the last few minutes matter.",
+                        "default": False
                     }
                 },
                 "required": ["query"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="web-search",
         mappings=[
             {"param_name": "query", "node_type": "attribute", "path": "."},
-            {"param_name": "num_results", "node_type": "attribute", "path": "."}
+            {"param_name": "num_results", "node_type": "attribute", "path": "."},
+            {"param_name": "fresh", "node_type": "attribute", "path": ".", "required": False}
         ],
         example='''
         <function_calls>
@@ -81,7 +159,8 @@ class SandboxWebSearchTool(SandboxToolsBase):
     async def web_search(
         self, 
         query: str,
-        num_results: int = 20
+        num_results: int = 20,
+        fresh: bool = False
     ) -> ToolResult:
         """
         Search the web using the Tavily API to find relevant and up-to-date information.
@@ -104,15 +183,12 @@ class SandboxWebSearchTool(SandboxToolsBase):
             else:
                 num_results = 20
 
-            # Execute the search with Tavily
+            if isinstance(fresh, str):
+                fresh = fresh.lower() == "true"
+
+            # Execute the search with Tavily, reusing cached and in-flight searches
             logging.info(f"Executing web search for query: '{query}' with {num_results} results")
-            search_response = await self.tavily_client.search(
-                query=query,
-                max_results=num_results,
-                include_images=True,
-                include_answer="advanced",
-                search_depth="advanced",
-            )
+            search_response = await self._cached_search(query, num_results, bypass_cache=bool(fresh))
             
             # Check if we have actual results or an answer
             results = search_response.get('results', [])
@@ -144,6 +220,90 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 simplified_message += "..."
             return self.fail_response(simplified_message)
 
+    async def _get_account_id(self) -> str:
+        """Account that owns the project, used to attribute search cache metrics."""
+        if self._account_id is None:
+            try:
+                client = await self.thread_manager.db.client
+                result = await client.table('projects').select('account_id').eq('project_id', self.project_id).execute()
+                self._account_id = result.data[0]['account_id'] if result.data else "unknown"
+            except Exception as e:
+                logging.warning(f"Could not resolve account for project {self.project_id}: {str(e)}")
+                return "unknown"
+        return self._account_id
+
+    async def _record_search_cache_result(self, outcome: str):
+        try:
+            redis_client = await redis.get_client()
+            await redis_client.hincrby(f"web_search_cache:stats:{await self._get_account_id()}", outcome, 1)
+        except Exception as e:
+            logging.warning(f"Failed to record search cache metrics: {str(e)}")
+
+    async def _cached_search(self, query: str, num_results: int, bypass_cache: bool = False) -> dict:
+        """
+        Run a Tavily search through the shared result cache.
+
+        Results are cached by normalized query and result count. Identical
+        searches running at the same time in this process share one Tavily
+        call. With bypass_cache the cache is not read, but the fresh result
+        still replaces the cached one.
+        """
+        normalized = normalize_query(query)
+        cache_key = f"web_search_cache:{hashlib.sha256(f'{normalized}|{num_results}'.encode()).hexdigest()}"
+
+        if not bypass_cache:
+            try:
+                cached = await redis.get(cache_key)
+            except Exception as e:
+                logging.warning(f"Failed to read search cache: {str(e)}")
+                cached = None
+            if cached:
+                logging.info(f"Using cached search results for query: '{query}'")
+                await self._record_search_cache_result("hits")
+                return json.loads(cached)
+
+            inflight = _inflight_searches.get(cache_key)
+            if inflight is not None:
+                logging.info(f"Joining in-flight search for query: '{query}'")
+                await self._record_search_cache_result("coalesced")
+                try:
+                    return await asyncio.shield(inflight)
+                except asyncio.CancelledError:
+                    if not inflight.cancelled():
+                        raise
+                    # The search we joined was cancelled, so run our own
+
+        await self._record_search_cache_result("bypassed" if bypass_cache else "misses")
+        future = asyncio.get_running_loop().create_future()
+        _inflight_searches.setdefault(cache_key, future)
+        try:
+            search_response = await self.tavily_client.search(
+                query=query,
+                max_results=num_results,
+                include_images=True,
+                include_answer="advanced",
+                search_depth="advanced",
+            )
+            future.set_result(search_response)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters receive the exception; mark it retrieved so it is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            if _inflight_searches.get(cache_key) is future:
+                del _inflight_searches[cache_key]
+
+        if search_response.get('results') or (search_response.get('answer') or '').strip():
+            try:
+                await redis.set(cache_key, json.dumps(search_response, ensure_ascii=False), ex=search_cache_ttl(normalized))
+            except Exception as e:
+                logging.warning(f"Failed to write search cache: {str(e)}")
+        return search_response
+
     @openapi_schema({
         "type": "function",
         "function": {
@@ -160,7 +320,7 @@ class SandboxWebSearchTool(SandboxToolsBase):
                 "required": ["urls"]
             }
         }
-    })
+    }, footprint=ToolFootprint())
     @xml_schema(
         tag_name="scrape-webpage",
         mappings=[
@@ -210,26 +370,33 @@ class SandboxWebSearchTool(SandboxToolsBase):
             
             logging.info(f"Processing {len(url_list)} URLs: {url_list}")
             
-            # Process each URL and collect results
+            # Add protocol if missing and drop duplicates
+            url_list = list(dict.fromkeys(
+                url if url.startswith(('http://', 'https://')) else 'https://' + url for url in url_list
+            ))
+            
+            # Scrape concurrently; each result is saved to the sandbox as soon as it completes
+            scrape_dir = f"{self.workspace_path}/scrape"
+            await asyncio.to_thread(self.sandbox.fs.create_folder, scrape_dir, "755")
+            semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+            
+            async def scrape(url: str) -> dict:
+                async with semaphore:
+                    try:
+                        return await self._scrape_single_url(url)
+                    except Exception as e:
+                        logging.error(f"Error processing URL {url}: {str(e)}")
+                        return {
+                            "url": url,
+                            "success": False,
+                            "error": str(e)
+                        }
+            
             results = []
-            for url in url_list:
-                try:
-                    # Add protocol if missing
-                    if not (url.startswith('http://') or url.startswith('https://')):
-                        url = 'https://' + url
-                        logging.info(f"Added https:// protocol to URL: {url}")
-                    
-                    # Scrape this URL
-                    result = await self._scrape_single_url(url)
-                    results.append(result)
-                    
-                except Exception as e:
-                    logging.error(f"Error processing URL {url}: {str(e)}")
-                    results.append({
-                        "url": url,
-                        "success": False,
-                        "error": str(e)
-                    })
+            for completed in asyncio.as_completed([scrape(url) for url in url_list]):
+                result = await completed
+                logging.info(f"Finished scraping {result['url']} ({len(results) + 1}/{len(url_list)})")
+                results.append(result)
             
             # Summarize results
             successful = sum(1 for r in results if r.get("success", False))
@@ -264,6 +431,62 @@ class SandboxWebSearchTool(SandboxToolsBase):
             logging.error(f"Error in scrape_webpage: {error_message}")
             return self.fail_response(f"Error processing scrape request: {error_message[:200]}")
     
+    async def _get_cached_scrape(self, cache_key: str) -> dict | None:
+        try:
+            cached = await redis.get(cache_key)
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            logging.warning(f"Failed to read scrape cache: {str(e)}")
+            return None
+    
+    async def _cache_scrape(self, cache_key: str, data: dict):
+        # Only cache pages that actually returned content
+        if not data.get("data", {}).get("markdown"):
+            return
+        content = json.dumps(data, ensure_ascii=False)
+        if len(content) > SCRAPE_CACHE_MAX_BYTES:
+            return
+        try:
+            await redis.set(cache_key, content, ex=SCRAPE_CACHE_TTL)
+        except Exception as e:
+            logging.warning(f"Failed to write scrape cache: {str(e)}")
+    
+    async def _firecrawl_scrape(self, url: str) -> dict:
+        """Scrape a URL with Firecrawl, retrying timeouts with jittered exponential backoff."""
+        logging.info(f"Sending request to Firecrawl for URL: {url}")
+        headers = {
+            "Authorization": f"Bearer {self.firecrawl_api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "url": url,
+            "formats": ["markdown"]
+        }
+        
+        client = _get_scrape_client()
+        for attempt in range(1, SCRAPE_MAX_RETRIES + 1):
+            try:
+                logging.info(f"Sending request to Firecrawl (attempt {attempt}/{SCRAPE_MAX_RETRIES})")
+                response = await client.post(
+                    f"{self.firecrawl_url}/v1/scrape",
+                    json=payload,
+                    headers=headers,
+                )
+                response.raise_for_status()
+                logging.info(f"Successfully received response from Firecrawl for {url}")
+                return response.json()
+            except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadError) as timeout_err:
+                logging.warning(f"Request timed out (attempt {attempt}/{SCRAPE_MAX_RETRIES}): {str(timeout_err)}")
+                if attempt >= SCRAPE_MAX_RETRIES:
+                    raise Exception(f"Request timed out after {SCRAPE_MAX_RETRIES} attempts with {SCRAPE_TIMEOUT}s timeout")
+                delay = SCRAPE_RETRY_BACKOFF * 2 ** (attempt - 1) + random.uniform(0, SCRAPE_RETRY_BACKOFF)
+                logging.info(f"Waiting {delay:.1f}s before retry")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                # Don't retry on non-timeout errors
+                logging.error(f"Error during scraping: {str(e)}")
+                raise e
+    
     async def _scrape_single_url(self, url: str) -> dict:
         """
         Helper function to scrape a single URL and return the result information.
@@ -271,48 +494,13 @@ class SandboxWebSearchTool(SandboxToolsBase):
         logging.info(f"Scraping single URL: {url}")
         
         try:
-            # ---------- Firecrawl scrape endpoint ----------
-            logging.info(f"Sending request to Firecrawl for URL: {url}")
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {self.firecrawl_api_key}",
-                    "Content-Type": "application/json",
-                }
-                payload = {
-                    "url": url,
-                    "formats": ["markdown"]
-                }
-                
-                # Use longer timeout and retry logic for more reliability
-                max_retries = 3
-                timeout_seconds = 120
-                retry_count = 0
-                
-                while retry_count < max_retries:
-                    try:
-                        logging.info(f"Sending request to Firecrawl (attempt {retry_count + 1}/{max_retries})")
-                        response = await client.post(
-                            f"{self.firecrawl_url}/v1/scrape",
-                            json=payload,
-                            headers=headers,
-                            timeout=timeout_seconds,
-                        )
-                        response.raise_for_status()
-                        data = response.json()
-                        logging.info(f"Successfully received response from Firecrawl for {url}")
-                        break
-                    except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ReadError) as timeout_err:
-                        retry_count += 1
-                        logging.warning(f"Request timed out (attempt {retry_count}/{max_retries}): {str(timeout_err)}")
-                        if retry_count >= max_retries:
-                            raise Exception(f"Request timed out after {max_retries} attempts with {timeout_seconds}s timeout")
-                        # Exponential backoff
-                        logging.info(f"Waiting {2 ** retry_count}s before retry")
-                        await asyncio.sleep(2 ** retry_count)
-                    except Exception as e:
-                        # Don't retry on non-timeout errors
-                        logging.error(f"Error during scraping: {str(e)}")
-                        raise e
+            cache_key = f"scrape_cache:{hashlib.sha256(normalize_url(url).encode()).hexdigest()}"
+            data = await self._get_cached_scrape(cache_key)
+            if data is not None:
+                logging.info(f"Using cached content for {url}")
+            else:
+                data = await self._firecrawl_scrape(url)
+                await self._cache_scrape(cache_key, data)
 
             # Format the response
             title = data.get("data", {}).get("metadata", {}).get("title", "")
@@ -334,25 +522,23 @@ class SandboxWebSearchTool(SandboxToolsBase):
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             
             # Extract domain from URL for the filename
-            from urllib.parse import urlparse
             parsed_url = urlparse(url)
             domain = parsed_url.netloc.replace("www.", "")
             
-            # Clean up domain for filename
+            # Clean up domain for filename; the URL hash keeps concurrent scrapes of one domain apart
             domain = "".join([c if c.isalnum() else "_" for c in domain])
-            safe_filename = f"{timestamp}_{domain}.json"
+            url_hash = hashlib.sha256(url.encode()).hexdigest()[:8]
+            safe_filename = f"{timestamp}_{domain}_{url_hash}.json"
             
             logging.info(f"Generated filename: {safe_filename}")
             
             # Save results to a file in the /workspace/scrape directory
-            scrape_dir = f"{self.workspace_path}/scrape"
-            self.sandbox.fs.create_folder(scrape_dir, "755")
-            
-            results_file_path = f"{scrape_dir}/{safe_filename}"
+            results_file_path = f"{self.workspace_path}/scrape/{safe_filename}"
             json_content = json.dumps(formatted_result, ensure_ascii=False, indent=2)
             logging.info(f"Saving content to file: {results_file_path}, size: {len(json_content)} bytes")
             
-            self.sandbox.fs.upload_file(
+            await asyncio.to_thread(
+                self.sandbox.fs.upload_file,
                 json_content.encode(),
                 results_file_path,
             )
@@ -16,11 +16,14 @@ from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, Union, Callable, Literal, Any
 from dataclasses import dataclass
 from utils.logger import logger
-from agentpress.tool import ToolResult
+from agentpress.tool import ToolResult, ToolCachePolicy, ToolFootprint
+from agentpress import tool_result_cache
+from agentpress.tool_scheduler import ToolScheduler
 from agentpress.tool_registry import ToolRegistry
 from agentpress.xml_tool_parser import XMLToolParser
 from langfuse import Langfuse
 from services.langfuse import langfuse
+from services.supabase import DBConnection
 from agentpress.utils.json_helpers import (
     ensure_dict, ensure_list, safe_json_parse, 
     to_json_string, format_for_yield
@@ -31,7 +34,7 @@ from litellm import token_counter
 XmlAddingStrategy = Literal["user_message", "assistant_message", "inline_edit"]
 
 # Type alias for tool execution strategy
-ToolExecutionStrategy = Literal["sequential", "parallel"]
+ToolExecutionStrategy = Literal["sequential", "parallel", "dependency"]
 
 @dataclass
 class ToolExecutionContext:
@@ -58,7 +61,8 @@ class ProcessorConfig:
         native_tool_calling: Enable OpenAI-style function calling format
         execute_tools: Whether to automatically execute detected tool calls
         execute_on_stream: For streaming, execute tools as they appear vs. at the end
-        tool_execution_strategy: How to execute multiple tools ("sequential" or "parallel")
+        tool_execution_strategy: How to execute multiple tools ("sequential", "parallel", or
+            "dependency" to run calls concurrently unless their tool footprints conflict)
         xml_adding_strategy: How to add XML tool results to the conversation
         max_xml_tool_calls: Maximum number of XML tool calls to process (0 = no limit)
     """
@@ -103,6 +107,8 @@ class ResponseProcessor:
         self.xml_parser = XMLToolParser(strict_mode=False)
         self.is_agent_builder = is_agent_builder
         self.target_agent_id = target_agent_id
+        # Account IDs of threads, for account-scoped tool result caching
+        self._thread_accounts: Dict[str, Optional[str]] = {}
 
     async def _yield_message(self, message_obj: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Helper to yield a message with proper formatting.
@@ -165,6 +171,7 @@ class ResponseProcessor:
                    f"Execute on stream={config.execute_on_stream}, Strategy={config.tool_execution_strategy}")
 
         thread_run_id = str(uuid.uuid4())
+        tool_scheduler = self._create_tool_scheduler(thread_id) if config.tool_execution_strategy == "dependency" else None
 
         try:
             # --- Save and Yield Start Events ---
@@ -266,7 +273,10 @@ class ResponseProcessor:
                                         if started_msg_obj: yield format_for_yield(started_msg_obj)
                                         yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                        execution_task = asyncio.create_task(self._execute_tool(tool_call))
+                                        if tool_scheduler:
+                                            execution_task = tool_scheduler.schedule(tool_call)
+                                        else:
+                                            execution_task = asyncio.create_task(self._execute_tool(tool_call, thread_id))
                                         pending_tool_executions.append({
                                             "task": execution_task, "tool_call": tool_call,
                                             "tool_index": tool_index, "context": context
@@ -336,7 +346,10 @@ class ResponseProcessor:
                                 if started_msg_obj: yield format_for_yield(started_msg_obj)
                                 yielded_tool_indices.add(tool_index) # Mark status as yielded
 
-                                execution_task = asyncio.create_task(self._execute_tool(tool_call_data))
+                                if tool_scheduler:
+                                    execution_task = tool_scheduler.schedule(tool_call_data)
+                                else:
+                                    execution_task = asyncio.create_task(self._execute_tool(tool_call_data, thread_id))
                                 pending_tool_executions.append({
                                     "task": execution_task, "tool_call": tool_call_data,
                                     "tool_index": tool_index, "context": context
@@ -583,7 +596,7 @@ class ResponseProcessor:
                 elif final_tool_calls_to_process and not config.execute_on_stream:
                     logger.info(f"Executing {len(final_tool_calls_to_process)} tools ({config.tool_execution_strategy}) after stream")
                     self.trace.event(name="executing_tools_after_stream", level="DEFAULT", status_message=(f"Executing {len(final_tool_calls_to_process)} tools ({config.tool_execution_strategy}) after stream"))
-                    results_list = await self._execute_tools(final_tool_calls_to_process, config.tool_execution_strategy)
+                    results_list = await self._execute_tools(final_tool_calls_to_process, config.tool_execution_strategy, thread_id)
                     current_tool_idx = 0
                     for tc, res in results_list:
                        # Map back using all_tool_data_map which has correct indices
@@ -900,7 +913,7 @@ class ResponseProcessor:
             if config.execute_tools and tool_calls_to_execute:
                 logger.info(f"Executing {len(tool_calls_to_execute)} tools with strategy: {config.tool_execution_strategy}")
                 self.trace.event(name="executing_tools_with_strategy", level="DEFAULT", status_message=(f"Executing {len(tool_calls_to_execute)} tools with strategy: {config.tool_execution_strategy}"))
-                tool_results = await self._execute_tools(tool_calls_to_execute, config.tool_execution_strategy)
+                tool_results = await self._execute_tools(tool_calls_to_execute, config.tool_execution_strategy, thread_id)
 
                 for i, (returned_tool_call, result) in enumerate(tool_results):
                     original_data = all_tool_data[i]
@@ -1314,8 +1327,32 @@ class ResponseProcessor:
         return parsed_data
 
     # Tool execution methods
-    async def _execute_tool(self, tool_call: Dict[str, Any]) -> ToolResult:
-        """Execute a single tool call and return the result."""
+    async def _get_cache_scope_id(self, policy: ToolCachePolicy, thread_id: Optional[str]) -> Optional[str]:
+        """Resolve the ID that cached results are shared under, or None if caching is not possible."""
+        if policy.scope == "global":
+            return "global"
+        if not thread_id:
+            return None
+        if policy.scope == "thread":
+            return thread_id
+
+        if thread_id not in self._thread_accounts:
+            try:
+                client = await DBConnection().client
+                result = await client.table('threads').select('account_id').eq('thread_id', thread_id).execute()
+                self._thread_accounts[thread_id] = result.data[0]['account_id'] if result.data else None
+            except Exception as e:
+                logger.warning(f"Could not resolve account for thread {thread_id}: {str(e)}")
+                return None
+        return self._thread_accounts[thread_id]
+
+    async def _execute_tool(self, tool_call: Dict[str, Any], thread_id: Optional[str] = None) -> ToolResult:
+        """Execute a single tool call and return the result.
+        
+        Tools whose schema declares a cache policy get successful results
+        memoized per scope; identical calls are then answered from the cache
+        with result.cached set.
+        """
         span = self.trace.span(name=f"execute_tool.{tool_call['function_name']}", input=tool_call["arguments"])            
         try:
             function_name = tool_call["function_name"]
@@ -1340,9 +1377,23 @@ class ResponseProcessor:
                 span.end(status_message="tool_not_found", level="ERROR")
                 return ToolResult(success=False, output=f"Tool function '{function_name}' not found")
             
+            cache_policy = getattr(tool_fn, 'tool_cache_policy', None)
+            cache_key = None
+            if cache_policy:
+                scope_id = await self._get_cache_scope_id(cache_policy, thread_id)
+                if scope_id:
+                    cache_key = tool_result_cache.result_cache_key(cache_policy, scope_id, function_name, arguments)
+                    cached_result = await tool_result_cache.get_cached_result(cache_key)
+                    if cached_result:
+                        logger.info(f"Using cached result for tool {function_name}")
+                        span.end(status_message="tool_result_cached", output=cached_result)
+                        return cached_result
+
             logger.debug(f"Found tool function for '{function_name}', executing...")
             result = await tool_fn(**arguments)
             logger.info(f"Tool execution complete: {function_name} -> {result}")
+            if cache_key:
+                await tool_result_cache.cache_result(cache_key, result, cache_policy.ttl)
             span.end(status_message="tool_executed", output=result)
             return result
         except Exception as e:
@@ -1353,7 +1404,8 @@ class ResponseProcessor:
     async def _execute_tools(
         self, 
         tool_calls: List[Dict[str, Any]], 
-        execution_strategy: ToolExecutionStrategy = "sequential"
+        execution_strategy: ToolExecutionStrategy = "sequential",
+        thread_id: Optional[str] = None
     ) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls with the specified strategy.
         
@@ -1365,6 +1417,8 @@ class ResponseProcessor:
             execution_strategy: Strategy for executing tools:
                 - "sequential": Execute tools one after another, waiting for each to complete
                 - "parallel": Execute all tools simultaneously for better performance 
+                - "dependency": Execute tools simultaneously unless their footprints conflict
+            thread_id: ID of the conversation thread, used to scope cached tool results
                 
         Returns:
             List of tuples containing the original tool call and its result
@@ -1373,14 +1427,16 @@ class ResponseProcessor:
         self.trace.event(name="executing_tools_with_strategy", level="DEFAULT", status_message=(f"Executing {len(tool_calls)} tools with strategy: {execution_strategy}"))
             
         if execution_strategy == "sequential":
-            return await self._execute_tools_sequentially(tool_calls)
+            return await self._execute_tools_sequentially(tool_calls, thread_id)
         elif execution_strategy == "parallel":
-            return await self._execute_tools_in_parallel(tool_calls)
+            return await self._execute_tools_in_parallel(tool_calls, thread_id)
+        elif execution_strategy == "dependency":
+            return await self._execute_tools_with_dependencies(tool_calls, thread_id)
         else:
             logger.warning(f"Unknown execution strategy: {execution_strategy}, falling back to sequential")
-            return await self._execute_tools_sequentially(tool_calls)
+            return await self._execute_tools_sequentially(tool_calls, thread_id)
 
-    async def _execute_tools_sequentially(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
+    async def _execute_tools_sequentially(self, tool_calls: List[Dict[str, Any]], thread_id: Optional[str] = None) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls sequentially and return results.
         
         This method executes tool calls one after another, waiting for each tool to complete
@@ -1388,6 +1444,7 @@ class ResponseProcessor:
         
         Args:
             tool_calls: List of tool calls to execute
+            thread_id: ID of the conversation thread, used to scope cached tool results
             
         Returns:
             List of tuples containing the original tool call and its result
@@ -1406,7 +1463,7 @@ class ResponseProcessor:
                 logger.debug(f"Executing tool {index+1}/{len(tool_calls)}: {tool_name}")
                 
                 try:
-                    result = await self._execute_tool(tool_call)
+                    result = await self._execute_tool(tool_call, thread_id)
                     results.append((tool_call, result))
                     logger.debug(f"Completed tool {tool_name} with success={result.success}")
                     
@@ -1438,7 +1495,7 @@ class ResponseProcessor:
                             
             return (results if 'results' in locals() else []) + error_results
 
-    async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
+    async def _execute_tools_in_parallel(self, tool_calls: List[Dict[str, Any]], thread_id: Optional[str] = None) -> List[Tuple[Dict[str, Any], ToolResult]]:
         """Execute tool calls in parallel and return results.
         
         This method executes all tool calls simultaneously using asyncio.gather, which
@@ -1446,6 +1503,7 @@ class ResponseProcessor:
         
         Args:
             tool_calls: List of tool calls to execute
+            thread_id: ID of the conversation thread, used to scope cached tool results
             
         Returns:
             List of tuples containing the original tool call and its result
@@ -1459,7 +1517,7 @@ class ResponseProcessor:
             self.trace.event(name="executing_tools_in_parallel", level="DEFAULT", status_message=(f"Executing {len(tool_calls)} tools in parallel: {tool_names}"))
             
             # Create tasks for all tool calls
-            tasks = [self._execute_tool(tool_call) for tool_call in tool_calls]
+            tasks = [self._execute_tool(tool_call, thread_id) for tool_call in tool_calls]
             
             # Execute all tasks concurrently with error handling
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -1487,6 +1545,53 @@ class ResponseProcessor:
             return [(tool_call, ToolResult(success=False, output=f"Execution error: {str(e)}")) 
                     for tool_call in tool_calls]
 
+    def _get_tool_footprint(self, function_name: str) -> Optional[ToolFootprint]:
+        """Footprint declared by a tool function, or None if it declares none."""
+        tool_fn = self.tool_registry.get_available_functions().get(function_name)
+        return getattr(tool_fn, 'tool_footprint', None)
+
+    def _create_tool_scheduler(self, thread_id: Optional[str] = None) -> ToolScheduler:
+        """Create a scheduler for the tool calls of one assistant response."""
+        return ToolScheduler(
+            execute=lambda tool_call: self._execute_tool(tool_call, thread_id),
+            get_footprint=self._get_tool_footprint
+        )
+
+    async def _execute_tools_with_dependencies(self, tool_calls: List[Dict[str, Any]], thread_id: Optional[str] = None) -> List[Tuple[Dict[str, Any], ToolResult]]:
+        """Execute tool calls concurrently, keeping the order of calls that conflict.
+        
+        Calls whose tool footprints do not conflict run at the same time; a call
+        that conflicts with an earlier one waits for it to finish. Terminating
+        tools (ask or complete) wait for all earlier calls and stop execution of
+        the remaining ones, as with sequential execution.
+        
+        Args:
+            tool_calls: List of tool calls to execute
+            thread_id: ID of the conversation thread, used to scope cached tool results
+            
+        Returns:
+            List of tuples containing the original tool call and its result
+        """
+        if not tool_calls:
+            return []
+            
+        try:
+            tool_names = [t.get('function_name', 'unknown') for t in tool_calls]
+            logger.info(f"Executing {len(tool_calls)} tools with dependency scheduling: {tool_names}")
+            self.trace.event(name="executing_tools_with_dependencies", level="DEFAULT", status_message=(f"Executing {len(tool_calls)} tools with dependency scheduling: {tool_names}"))
+            
+            results = await self._create_tool_scheduler(thread_id).run_all(tool_calls)
+            
+            logger.info(f"Dependency-scheduled execution completed for {len(results)} tools (out of {len(tool_calls)} total)")
+            self.trace.event(name="dependency_execution_completed", level="DEFAULT", status_message=(f"Dependency-scheduled execution completed for {len(results)} tools (out of {len(tool_calls)} total)"))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in dependency-scheduled tool execution: {str(e)}", exc_info=True)
+            self.trace.event(name="error_in_dependency_tool_execution", level="ERROR", status_message=(f"Error in dependency-scheduled tool execution: {str(e)}"))
+            return [(tool_call, ToolResult(success=False, output=f"Execution error: {str(e)}")) 
+                    for tool_call in tool_calls]
+
     async def _add_tool_result(
         self, 
         thread_id: str, 
@@ -1712,6 +1817,8 @@ class ResponseProcessor:
                 # }
             }
         } 
+        if getattr(result, 'cached', False):
+            structured_result_v1["tool_execution"]["result"]["cached"] = True
 
         # STRUCTURED_OUTPUT_TOOLS = {
         #     "str_replace", 
@@ -1826,6 +1933,8 @@ class ResponseProcessor:
             "message": message_text, "tool_index": context.tool_index,
             "tool_call_id": context.tool_call.get("id")
         }
+        if getattr(context.result, "cached", False):
+            content["cached"] = True
         metadata = {"thread_run_id": thread_run_id}
         # Add the *actual* tool result message ID to the metadata if available and successful
         if context.result.success and tool_message_id:
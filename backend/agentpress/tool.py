@@ -5,9 +5,11 @@ This module defines the base classes and decorators for creating tools in AgentP
 - Tool base class for implementing tool functionality
 - Schema decorators for OpenAPI and XML tool definitions
 - Result containers for standardized tool outputs
+- Cache policies for memoizing results of read-only tools
+- Resource footprints for scheduling tool calls concurrently
 """
 
-from typing import Dict, Any, Union, Optional, List
+from typing import Dict, Any, Union, Optional, List, Literal
 from dataclasses import dataclass, field
 from abc import ABC
 import json
@@ -15,6 +17,10 @@ import inspect
 from enum import Enum
 from utils.logger import logger
 
+# Whose calls share memoized results: calls in the same thread, in any thread
+# of the same account, or everywhere
+CacheScope = Literal["thread", "account", "global"]
+
 class SchemaType(Enum):
     """Enumeration of supported schema types for tool definitions."""
     OPENAPI = "openapi"
@@ -82,6 +88,40 @@ class ToolSchema:
     schema: Dict[str, Any]
     xml_schema: Optional[XMLTagSchema] = None
 
+@dataclass
+class ToolCachePolicy:
+    """Memoization policy for a read-only tool function.
+    
+    Attributes:
+        ttl (int): Seconds to reuse a successful result for identical arguments
+        scope (CacheScope): Which calls share results ("thread", "account" or "global")
+    """
+    ttl: int
+    scope: CacheScope = "thread"
+
+@dataclass
+class ToolFootprint:
+    """Shared resources a tool call touches, used to run independent calls concurrently.
+    
+    Resources are named by strings:
+    - "workspace": the whole /workspace directory
+    - "workspace:{param}": the workspace path passed in the call's `param`
+      argument (the whole workspace if the argument is missing)
+    - any other name (e.g. "browser") is an opaque resource matched by name
+    
+    Calls conflict when they touch the same resource and at least one of them
+    writes it. An empty footprint marks a tool that touches no shared state.
+    Tools without a footprint conflict with every other call.
+    
+    Attributes:
+        reads (List[str]): Resources the tool reads
+        writes (List[str]): Resources the tool modifies
+        terminating (bool): Whether the tool ends the agent's turn
+    """
+    reads: List[str] = field(default_factory=list)
+    writes: List[str] = field(default_factory=list)
+    terminating: bool = False
+
 @dataclass
 class ToolResult:
     """Container for tool execution results.
@@ -89,9 +129,11 @@ class ToolResult:
     Attributes:
         success (bool): Whether the tool execution succeeded
         output (str): Output message or error description
+        cached (bool): Whether the result was served from the tool result cache
     """
     success: bool
     output: str
+    cached: bool = False
 
 class Tool(ABC):
     """Abstract base class for all tools.
@@ -165,10 +207,41 @@ def _add_schema(func, schema: ToolSchema):
     logger.debug(f"Added {schema.schema_type.value} schema to function {func.__name__}")
     return func
 
-def openapi_schema(schema: Dict[str, Any]):
-    """Decorator for OpenAPI schema tools."""
+def _set_cache_policy(func, cache_ttl: int, cache_scope: CacheScope):
+    """Helper to mark a function's results as cacheable."""
+    if cache_scope not in ("thread", "account", "global"):
+        raise ValueError("cache_scope must be 'thread', 'account', or 'global'")
+    if cache_ttl > 0:
+        func.tool_cache_policy = ToolCachePolicy(ttl=cache_ttl, scope=cache_scope)
+        logger.debug(f"Caching results of function {func.__name__} for {cache_ttl}s per {cache_scope}")
+    return func
+
+def _set_footprint(func, footprint: Optional[ToolFootprint]):
+    """Helper to declare the resources a function touches."""
+    if footprint is not None:
+        func.tool_footprint = footprint
+    return func
+
+def openapi_schema(
+    schema: Dict[str, Any],
+    cache_ttl: int = 0,
+    cache_scope: CacheScope = "thread",
+    footprint: Optional[ToolFootprint] = None
+):
+    """Decorator for OpenAPI schema tools.
+    
+    Args:
+        schema: OpenAPI function schema
+        cache_ttl: Seconds to memoize successful results for identical arguments.
+            Only for read-only tools; 0 (the default) disables memoization.
+        cache_scope: Which calls share memoized results ("thread", "account" or "global")
+        footprint: Resources the tool touches, so that independent calls can run
+            concurrently. Without one, calls to the tool never overlap other calls.
+    """
     def decorator(func):
         logger.debug(f"Applying OpenAPI schema to function {func.__name__}")
+        _set_cache_policy(func, cache_ttl, cache_scope)
+        _set_footprint(func, footprint)
         return _add_schema(func, ToolSchema(
             schema_type=SchemaType.OPENAPI,
             schema=schema
@@ -178,7 +251,10 @@ def openapi_schema(schema: Dict[str, Any]):
 def xml_schema(
     tag_name: str,
     mappings: List[Dict[str, Any]] = None,
-    example: str = None
+    example: str = None,
+    cache_ttl: int = 0,
+    cache_scope: CacheScope = "thread",
+    footprint: Optional[ToolFootprint] = None
 ):
     """
     Decorator for XML schema tools with improved node mapping.
@@ -191,6 +267,11 @@ def xml_schema(
             - path: Path to the node (default "." for root)
             - required: Whether the parameter is required (default True)
         example: Optional example showing how to use the XML tag
+        cache_ttl: Seconds to memoize successful results for identical arguments.
+            Only for read-only tools; 0 (the default) disables memoization.
+        cache_scope: Which calls share memoized results ("thread", "account" or "global")
+        footprint: Resources the tool touches, so that independent calls can run
+            concurrently. Without one, calls to the tool never overlap other calls.
     
     Example:
         @xml_schema(
@@ -210,6 +291,8 @@ def xml_schema(
     """
     def decorator(func):
         logger.debug(f"Applying XML schema with tag '{tag_name}' to function {func.__name__}")
+        _set_cache_policy(func, cache_ttl, cache_scope)
+        _set_footprint(func, footprint)
         xml_schema = XMLTagSchema(tag_name=tag_name, example=example)
         
         # Add mappings
@@ -0,0 +1,50 @@
+"""
+Redis cache of tool results for memoizing read-only tool calls.
+
+Tools opt in through the cache_ttl and cache_scope arguments of their schema
+decorators. Successful results are stored per (scope, function name,
+arguments) and served to later identical calls until they expire; failed
+results are never cached. Results served from the cache are marked with
+ToolResult.cached.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from agentpress.tool import ToolCachePolicy, ToolResult
+from services import redis
+from utils.logger import logger
+
+
+def result_cache_key(policy: ToolCachePolicy, scope_id: str, function_name: str, arguments: Dict[str, Any]) -> str:
+    """Cache key for a tool call within its scope (a thread ID, account ID, or "global")."""
+    arguments_json = json.dumps(arguments, sort_keys=True, default=str)
+    digest = hashlib.sha256(arguments_json.encode()).hexdigest()
+    return f"tool_result_cache:{policy.scope}:{scope_id}:{function_name}:{digest}"
+
+
+async def get_cached_result(cache_key: str) -> Optional[ToolResult]:
+    """Return the cached result for a key, or None on a miss."""
+    try:
+        data = await redis.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Failed to read tool result cache: {str(e)}")
+        return None
+    if not data:
+        return None
+    try:
+        cached = json.loads(data)
+        return ToolResult(success=cached["success"], output=cached["output"], cached=True)
+    except (ValueError, KeyError):
+        return None
+
+
+async def cache_result(cache_key: str, result: ToolResult, ttl: int):
+    """Store a successful result for a key."""
+    if not getattr(result, 'success', False):
+        return
+    try:
+        await redis.set(cache_key, json.dumps({"success": result.success, "output": result.output}, default=str), ex=ttl)
+    except Exception as e:
+        logger.warning(f"Failed to write tool result cache: {str(e)}")
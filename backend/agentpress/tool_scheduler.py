@@ -0,0 +1,144 @@
+"""
+Dependency-aware scheduling of the tool calls in one assistant response.
+
+Each call's resources come from the ToolFootprint declared on its tool. A call
+starts as soon as every earlier call it conflicts with has finished, so
+independent calls (searches, scrapes, data provider calls) run concurrently
+while, for example, a file write and a later shell command keep their order.
+Calls to tools without a footprint wait for all earlier calls and block all
+later ones.
+
+Terminating tools (ask, complete) wait for every earlier call, and calls after
+them in the same response are not executed, as with sequential execution.
+"""
+
+import asyncio
+import posixpath
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agentpress.tool import ToolFootprint, ToolResult
+from utils.logger import logger
+
+WORKSPACE = "workspace"
+WORKSPACE_ROOT = "/workspace"
+
+
+@dataclass(frozen=True)
+class ResourceClaim:
+    """A read or write of a resource, or of one path within the workspace."""
+    resource: str
+    path: Optional[str]
+    write: bool
+
+
+def normalize_workspace_path(path: Any) -> Optional[str]:
+    """Path relative to /workspace, or None if it refers to the whole workspace."""
+    if not isinstance(path, str) or not path.strip():
+        return None
+    path = path.strip()
+    if path == WORKSPACE_ROOT or path.startswith(WORKSPACE_ROOT + "/"):
+        path = path[len(WORKSPACE_ROOT):]
+    return posixpath.normpath("/" + path).lstrip("/") or None
+
+
+def resolve_claims(footprint: ToolFootprint, arguments: Any) -> List[ResourceClaim]:
+    """Resolve a footprint against the arguments of a call."""
+    claims = []
+    for resources, write in ((footprint.reads, False), (footprint.writes, True)):
+        for resource in resources:
+            if resource.startswith(f"{WORKSPACE}:"):
+                param = resource.split(":", 1)[1]
+                path = arguments.get(param) if isinstance(arguments, dict) else None
+                claims.append(ResourceClaim(WORKSPACE, normalize_workspace_path(path), write))
+            else:
+                claims.append(ResourceClaim(resource, None, write))
+    return claims
+
+
+def _paths_overlap(a: Optional[str], b: Optional[str]) -> bool:
+    return a is None or b is None or a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def claims_conflict(a: List[ResourceClaim], b: List[ResourceClaim]) -> bool:
+    """Whether two calls touch a common resource and at least one of them writes it."""
+    return any(
+        x.resource == y.resource and (x.write or y.write) and _paths_overlap(x.path, y.path)
+        for x in a for y in b
+    )
+
+
+class ToolScheduler:
+    """Runs the tool calls of one assistant response, overlapping calls that do not conflict."""
+
+    def __init__(
+        self,
+        execute: Callable[[Dict[str, Any]], Awaitable[ToolResult]],
+        get_footprint: Callable[[str], Optional[ToolFootprint]],
+    ):
+        """
+        Args:
+            execute: Executes a single tool call
+            get_footprint: Returns the footprint declared for a function name, if any
+        """
+        self._execute = execute
+        self._get_footprint = get_footprint
+        # Claims of each scheduled call (None for calls that conflict with everything)
+        self._scheduled: List[Tuple[Optional[List[ResourceClaim]], asyncio.Task]] = []
+        self.terminated_by: Optional[str] = None
+
+    def schedule(self, tool_call: Dict[str, Any]) -> asyncio.Task:
+        """
+        Start a tool call once the earlier calls it conflicts with have finished.
+
+        Calls must be scheduled in the order the model made them. Returns a
+        task that resolves to the call's ToolResult.
+        """
+        function_name = tool_call.get("function_name", "unknown")
+        if self.terminated_by:
+            logger.info(f"Not executing tool '{function_name}' after terminating tool '{self.terminated_by}'")
+            return asyncio.create_task(self._skipped())
+
+        footprint = self._get_footprint(function_name)
+        if footprint is None or footprint.terminating:
+            claims = None
+            dependencies = [task for _, task in self._scheduled]
+            if footprint is not None:
+                self.terminated_by = function_name
+        else:
+            claims = resolve_claims(footprint, tool_call.get("arguments"))
+            dependencies = [
+                task for other, task in self._scheduled
+                if other is None or claims_conflict(claims, other)
+            ]
+
+        logger.debug(f"Scheduling tool '{function_name}' after {len(dependencies)} of {len(self._scheduled)} earlier calls")
+        task = asyncio.create_task(self._run(tool_call, dependencies))
+        self._scheduled.append((claims, task))
+        return task
+
+    async def run_all(self, tool_calls: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], ToolResult]]:
+        """Schedule tool calls and wait for them, returning results in call order.
+
+        Calls after a terminating tool are left out of the results.
+        """
+        scheduled = []
+        for tool_call in tool_calls:
+            if self.terminated_by:
+                logger.info(f"Terminating tool '{self.terminated_by}' scheduled. Skipping {len(tool_calls) - len(scheduled)} remaining tools.")
+                break
+            scheduled.append((tool_call, self.schedule(tool_call)))
+
+        results = await asyncio.gather(*(task for _, task in scheduled), return_exceptions=True)
+        return [
+            (tool_call, ToolResult(success=False, output=f"Error executing tool: {str(result)}") if isinstance(result, Exception) else result)
+            for (tool_call, _), result in zip(scheduled, results)
+        ]
+
+    async def _run(self, tool_call: Dict[str, Any], dependencies: List[asyncio.Task]) -> ToolResult:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        return await self._execute(tool_call)
+
+    async def _skipped(self) -> ToolResult:
+        return ToolResult(success=False, output=f"Not executed: '{self.terminated_by}' was called earlier in this response")
@@ -61,6 +61,10 @@ async def lifespan(app: FastAPI):
             logger.error(f"Failed to initialize Redis connection: {e}")
             # Continue without Redis - the application will handle Redis failures gracefully
         
+        # Start warm sandbox pool refills (no-op when SANDBOX_POOL_SIZE is 0)
+        from sandbox.pool import sandbox_pool
+        sandbox_pool.start()
+        
         # Start background tasks
         # asyncio.create_task(agent_api.restore_running_agent_runs())
         
@@ -70,6 +74,11 @@ async def lifespan(app: FastAPI):
         logger.info("Cleaning up agent resources")
         await agent_api.cleanup()
         
+        await sandbox_pool.stop()
+        
+        from mcp_local import registry as mcp_registry
+        await mcp_registry.close()
+        
         # Clean up Redis connection
         try:
             logger.info("Closing Redis connection")
@@ -42,6 +42,8 @@ except ImportError:
         ToolResult = Any
 
 from utils.logger import logger
+from mcp_local.session_pool import mcp_session_pool, session_key, http_transport
+from mcp_local.tool_cache import get_cached_tools, cache_tools, tool_to_dict, is_read_only
 import os
 
 # Get Smithery API key from environment
@@ -102,16 +104,21 @@ class MCPManager:
             # Create server URL
             url = f"{SMITHERY_SERVER_BASE_URL}/{qualified_name}/mcp?config={config_b64}&api_key={SMITHERY_API_KEY}"
             
-            # Test connection and get available tools
-            async with streamablehttp_client(url) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    # Initialize the connection
-                    await session.initialize()
-                    logger.info(f"MCP session initialized for {qualified_name}")
+            key = session_key(f"smithery:{qualified_name}", mcp_config["config"])
+            cached_tools = await get_cached_tools(key)
+            if cached_tools is not None:
+                # The session is opened by the pool on the first tool call
+                logger.info(f"Using cached tool list for MCP server {qualified_name}")
+                tools = [Tool.model_validate(tool) for tool in cached_tools]
+            else:
+                # Get available tools; the pooled session stays open for later tool calls
+                async with mcp_session_pool.session(key, http_transport(url)) as session:
+                    logger.info(f"MCP session ready for {qualified_name}")
                     
                     # List available tools
                     tools_result = await session.list_tools()
-            tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
+                tools = tools_result.tools if hasattr(tools_result, 'tools') else tools_result
+                await cache_tools(key, [tool_to_dict(tool) for tool in tools])
             
             logger.info(f"Available tools from {qualified_name}: {[t.name for t in tools]}")
             
@@ -121,7 +128,7 @@ class MCPManager:
                 name=mcp_config["name"],
                 config=mcp_config["config"],
                 enabled_tools=mcp_config.get("enabledTools", []),
-                session=None,  # No persistent session
+                session=None,  # Sessions are held by the MCP session pool
                 tools=tools
             )
             
@@ -133,13 +140,15 @@ class MCPManager:
             raise
             
     async def connect_all(self, mcp_configs: List[Dict[str, Any]]) -> None:
-        """Connect to all MCP servers in the configuration"""
-        for config in mcp_configs:
-            try:
-                await self.connect_server(config)
-            except Exception as e:
-                logger.error(f"Failed to connect to {config['qualifiedName']}: {str(e)}")
-                # Continue with other servers even if one fails
+        """Connect to all MCP servers in the configuration concurrently"""
+        results = await asyncio.gather(
+            *(self.connect_server(config) for config in mcp_configs),
+            return_exceptions=True
+        )
+        for config, result in zip(mcp_configs, results):
+            # Continue with other servers even if one fails
+            if isinstance(result, Exception):
+                logger.error(f"Failed to connect to {config['qualifiedName']}: {str(result)}")
                 
     def get_all_tools_openapi(self) -> List[Dict[str, Any]]:
         """
@@ -162,6 +171,7 @@ class MCPManager:
                 openapi_tool = {
                     "name": f"mcp_{conn.qualified_name}_{tool.name}",  # Prefix to avoid conflicts
                     "description": tool.description or f"MCP tool from {conn.name}",
+                    "read_only": is_read_only(getattr(tool, 'annotations', None)),
                     "parameters": {
                         "type": "object",
                         "properties": {},
@@ -211,53 +221,51 @@ class MCPManager:
             raise ValueError("SMITHERY_API_KEY environment variable is not set")
         
         try:
-            # Create fresh connection for this tool call
             config_json = json.dumps(conn.config)
             config_b64 = base64.b64encode(config_json.encode()).decode()
             url = f"{SMITHERY_SERVER_BASE_URL}/{qualified_name}/mcp?config={config_b64}&api_key={SMITHERY_API_KEY}"
             
-            # Use the documented pattern with proper context management
-            async with streamablehttp_client(url) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    # Initialize the connection
-                    await session.initialize()
-                    
-                    # Call the tool
-                    result = await session.call_tool(original_tool_name, arguments)
+            # Reuse the pooled session for this server instead of connecting per call
+            result = await mcp_session_pool.call_tool(
+                session_key(f"smithery:{qualified_name}", conn.config),
+                http_transport(url),
+                original_tool_name,
+                arguments,
+            )
             
-                    # Convert result to dict - handle MCP response properly
-                    if hasattr(result, 'content'):
-                        # Handle content which might be a list of TextContent objects
-                        content = result.content
-                        if isinstance(content, list):
-                            # Extract text from TextContent objects
-                            text_parts = []
-                            for item in content:
-                                if hasattr(item, 'text'):
-                                    text_parts.append(item.text)
-                                elif hasattr(item, 'content'):
-                                    text_parts.append(str(item.content))
-                                else:
-                                    text_parts.append(str(item))
-                            content_str = "\n".join(text_parts)
-                        elif hasattr(content, 'text'):
-                            # Single TextContent object
-                            content_str = content.text
-                        elif hasattr(content, 'content'):
-                            content_str = str(content.content)
+            # Convert result to dict - handle MCP response properly
+            if hasattr(result, 'content'):
+                # Handle content which might be a list of TextContent objects
+                content = result.content
+                if isinstance(content, list):
+                    # Extract text from TextContent objects
+                    text_parts = []
+                    for item in content:
+                        if hasattr(item, 'text'):
+                            text_parts.append(item.text)
+                        elif hasattr(item, 'content'):
+                            text_parts.append(str(item.content))
                         else:
-                            content_str = str(content)
-                        
-                        is_error = getattr(result, 'isError', False)
-                    else:
-                        content_str = str(result)
-                        is_error = False
-                        
-                return {
-                        "content": content_str,
-                        "isError": is_error
-                }
+                            text_parts.append(str(item))
+                    content_str = "\n".join(text_parts)
+                elif hasattr(content, 'text'):
+                    # Single TextContent object
+                    content_str = content.text
+                elif hasattr(content, 'content'):
+                    content_str = str(content.content)
+                else:
+                    content_str = str(content)
+                
+                is_error = getattr(result, 'isError', False)
+            else:
+                content_str = str(result)
+                is_error = False
                 
+            return {
+                "content": content_str,
+                "isError": is_error
+            }
+
         except Exception as e:
             logger.error(f"Error executing MCP tool {tool_name}: {str(e)}")
             return {
@@ -0,0 +1,133 @@
+"""
+Cached access to the Smithery registry API.
+
+The marketplace UI and the agent builder ask the registry for the same server
+listings and server details over and over. Requests go through one pooled
+HTTP client, and successful responses are cached in Redis per query with
+stale-while-revalidate semantics:
+
+- younger than FRESH_TTL: served from the cache
+- younger than STALE_TTL: served from the cache while a background task
+  refreshes the entry
+- older, or missing: fetched from the registry before answering
+
+Registry errors are raised as httpx.HTTPStatusError, the same as calling the
+registry directly, and are never cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Set
+from urllib.parse import quote
+
+import httpx
+
+from services import redis
+from utils.logger import logger
+
+SMITHERY_API_BASE_URL = "https://registry.smithery.ai"
+SMITHERY_API_KEY = os.getenv("SMITHERY_API_KEY")
+
+# Serve cached responses without revalidating for this long (seconds)
+FRESH_TTL = 300
+# Serve cached responses while refreshing them in the background for this long (seconds)
+STALE_TTL = 3600
+
+REQUEST_TIMEOUT = 30.0
+
+_client: Optional[httpx.AsyncClient] = None
+_refreshing: Set[str] = set()
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        headers = {
+            "Accept": "application/json",
+            "User-Agent": "Suna-MCP-Integration/1.0"
+        }
+        if SMITHERY_API_KEY:
+            headers["Authorization"] = f"Bearer {SMITHERY_API_KEY}"
+        _client = httpx.AsyncClient(
+            base_url=SMITHERY_API_BASE_URL,
+            headers=headers,
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def close():
+    """Close the shared registry client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _cache_key(path: str, params: Optional[Dict[str, Any]]) -> str:
+    query = json.dumps(params or {}, sort_keys=True)
+    digest = hashlib.sha256(f"{path}?{query}".encode()).hexdigest()[:16]
+    return f"smithery_registry:{digest}"
+
+
+async def _fetch(cache_key: str, path: str, params: Optional[Dict[str, Any]]) -> Any:
+    response = await _get_client().get(path, params=params)
+    if response.status_code == 401:
+        logger.warning("Smithery API authentication failed. API key may be required.")
+    response.raise_for_status()
+    data = response.json()
+    try:
+        await redis.set(cache_key, json.dumps({"fetched_at": time.time(), "data": data}), ex=STALE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to cache Smithery registry response for {path}: {str(e)}")
+    return data
+
+
+async def _refresh(cache_key: str, path: str, params: Optional[Dict[str, Any]]):
+    try:
+        await _fetch(cache_key, path, params)
+    except Exception as e:
+        logger.warning(f"Background refresh of Smithery registry {path} failed: {str(e)}")
+    finally:
+        _refreshing.discard(cache_key)
+
+
+async def _get(path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    cache_key = _cache_key(path, params)
+    try:
+        cached = await redis.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Failed to read Smithery registry cache: {str(e)}")
+        cached = None
+
+    if cached:
+        entry = json.loads(cached)
+        age = time.time() - entry["fetched_at"]
+        if age >= FRESH_TTL and cache_key not in _refreshing:
+            _refreshing.add(cache_key)
+            asyncio.create_task(_refresh(cache_key, path, params))
+        return entry["data"]
+
+    return await _fetch(cache_key, path, params)
+
+
+async def list_servers(q: Optional[str] = None, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+    """List servers from the registry, optionally filtered by a search query."""
+    params = {"page": page, "pageSize": page_size}
+    if q:
+        params["q"] = q
+    return await _get("/servers", params)
+
+
+async def get_server(qualified_name: str) -> Dict[str, Any]:
+    """Get the registry details of a server."""
+    # URL encode the qualified name only if it contains special characters
+    if '@' in qualified_name or '/' in qualified_name:
+        encoded_name = quote(qualified_name, safe='')
+    else:
+        encoded_name = qualified_name
+    return await _get(f"/servers/{encoded_name}")
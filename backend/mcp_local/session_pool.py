@@ -0,0 +1,268 @@
+"""
+Pool of long-lived MCP client sessions.
+
+Opening an MCP connection means a transport handshake plus session.initialize(),
+and for stdio servers spawning a process. The pool keeps one initialized
+session per (server, config hash) alive and reuses it for every call, so only
+the first call to a server pays the connection cost.
+
+The transport and session context managers have to be entered and exited by
+the same task, so every pooled session is owned by a background task that
+opens the connection, publishes the session and holds it open until the
+session is closed. Calls from any task go through the published session; the
+MCP session multiplexes concurrent requests, and a per-server semaphore caps
+how many run at once.
+
+Sessions idle for longer than a health check interval are pinged before use
+and reconnected if the ping fails. Sessions unused for IDLE_TIMEOUT are closed
+by a background reaper. The pool is a module-level singleton, so it is shared
+by all agent runs in a worker process.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import anyio
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from utils.logger import logger
+
+# Close sessions that have not been used for this long (seconds)
+IDLE_TIMEOUT = 300
+# Ping sessions that have been idle for this long before reusing them (seconds)
+HEALTH_CHECK_INTERVAL = 30
+PING_TIMEOUT = 5
+CONNECT_TIMEOUT = 30
+# Maximum concurrent calls per server
+MAX_CONCURRENCY_PER_SERVER = 4
+REAPER_INTERVAL = 60
+
+# Errors raised when the connection is gone before a request could be sent,
+# which makes retrying on a fresh session safe
+CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+
+TransportFactory = Callable[[], AsyncContextManager[Tuple[Any, ...]]]
+
+
+def session_key(server: str, config: Any) -> Tuple[str, str]:
+    """Pool key for a server and its configuration."""
+    config_json = json.dumps(config, sort_keys=True, default=str)
+    return server, hashlib.sha256(config_json.encode()).hexdigest()[:16]
+
+
+def http_transport(url: str) -> TransportFactory:
+    """Transport factory for a streamable HTTP server."""
+    return lambda: streamablehttp_client(url)
+
+
+def sse_transport(url: str, headers: Optional[Dict[str, str]] = None) -> TransportFactory:
+    """Transport factory for an SSE server."""
+    def factory():
+        try:
+            return sse_client(url, headers=headers or {})
+        except TypeError:
+            # Older MCP versions do not accept headers
+            return sse_client(url)
+    return factory
+
+
+def stdio_transport(command: str, args: Optional[list] = None, env: Optional[Dict[str, str]] = None) -> TransportFactory:
+    """Transport factory for a stdio server process."""
+    server_params = StdioServerParameters(command=command, args=args or [], env=env or {})
+    return lambda: stdio_client(server_params)
+
+
+class PooledSession:
+    """A single MCP session held open by a background owner task."""
+
+    def __init__(self, key: Tuple[str, str], transport_factory: TransportFactory):
+        self.key = key
+        self.transport_factory = transport_factory
+        self.session: Optional[ClientSession] = None
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def _run(self):
+        try:
+            async with self.transport_factory() as streams:
+                read_stream, write_stream = streams[0], streams[1]
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except BaseException as e:
+            self._error = e
+            if not isinstance(e, asyncio.CancelledError):
+                logger.warning(f"MCP session {self.key[0]} closed: {str(e)}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def connect(self, timeout: float = CONNECT_TIMEOUT):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise TimeoutError(f"Timed out connecting to MCP server {self.key[0]}")
+        except asyncio.CancelledError:
+            # Do not leave the owner task holding a connection nobody will use
+            self._closing.set()
+            self._task.cancel()
+            raise
+        if self.session is None:
+            raise ConnectionError(f"Failed to connect to MCP server {self.key[0]}: {self._error}")
+
+    async def ping(self) -> bool:
+        try:
+            await asyncio.wait_for(self.session.send_ping(), PING_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.info(f"MCP session {self.key[0]} failed health check: {str(e)}")
+            return False
+
+    async def close(self):
+        self._closing.set()
+        if self._task and not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), 5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+        self.session = None
+
+
+class MCPSessionPool:
+    """Keeps MCP sessions alive per (server, config hash) and hands them out for calls."""
+
+    def __init__(
+        self,
+        idle_timeout: float = IDLE_TIMEOUT,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+        max_concurrency: int = MAX_CONCURRENCY_PER_SERVER,
+    ):
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.max_concurrency = max_concurrency
+        self._sessions: Dict[Tuple[str, str], PooledSession] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+
+    async def _get_session(self, key: Tuple[str, str], transport_factory: TransportFactory) -> PooledSession:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            pooled = self._sessions.get(key)
+            if pooled and pooled.alive:
+                idle = time.monotonic() - pooled.last_used
+                if pooled.in_use or idle < self.health_check_interval or await pooled.ping():
+                    return pooled
+            if pooled:
+                await pooled.close()
+                logger.info(f"Reconnecting MCP session for {key[0]}")
+
+            pooled = PooledSession(key, transport_factory)
+            try:
+                await pooled.connect()
+            except Exception:
+                self._sessions.pop(key, None)
+                raise
+            self._sessions[key] = pooled
+            logger.info(f"Opened pooled MCP session for {key[0]}")
+            self._ensure_reaper()
+            return pooled
+
+    @asynccontextmanager
+    async def session(self, key: Tuple[str, str], transport_factory: TransportFactory) -> AsyncIterator[ClientSession]:
+        """
+        Use the pooled session for a server, connecting on first use.
+
+        Args:
+            key: Pool key from session_key()
+            transport_factory: Returns a new transport context manager (e.g. a
+                streamablehttp_client, sse_client or stdio_client call) that
+                yields (read_stream, write_stream, ...)
+        """
+        semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self.max_concurrency))
+        async with semaphore:
+            pooled = await self._get_session(key, transport_factory)
+            pooled.in_use += 1
+            try:
+                yield pooled.session
+            finally:
+                pooled.in_use -= 1
+                pooled.last_used = time.monotonic()
+
+    async def call_tool(
+        self,
+        key: Tuple[str, str],
+        transport_factory: TransportFactory,
+        tool_name: str,
+        arguments: Dict[str, Any],
+    ):
+        """Call a tool on a pooled session, retrying once on a fresh session if the connection was lost."""
+        for attempt in range(2):
+            try:
+                async with self.session(key, transport_factory) as session:
+                    return await session.call_tool(tool_name, arguments)
+            except CONNECTION_ERRORS as e:
+                await self.evict(key)
+                if attempt:
+                    raise
+                logger.info(f"MCP session for {key[0]} lost ({type(e).__name__}), retrying on a new session")
+
+    async def evict(self, key: Tuple[str, str]):
+        """Close and forget the session for a key."""
+        pooled = self._sessions.pop(key, None)
+        if pooled:
+            await pooled.close()
+
+    def _ensure_reaper(self):
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_idle_sessions())
+
+    async def _reap_idle_sessions(self):
+        while self._sessions:
+            await asyncio.sleep(REAPER_INTERVAL)
+            now = time.monotonic()
+            for key, pooled in list(self._sessions.items()):
+                if not pooled.alive or (not pooled.in_use and now - pooled.last_used > self.idle_timeout):
+                    logger.info(f"Closing idle MCP session for {key[0]}")
+                    self._sessions.pop(key, None)
+                    await pooled.close()
+
+    async def close_all(self):
+        """Close every pooled session."""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(pooled.close() for pooled in sessions), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "servers": [
+                {"server": key[0], "alive": pooled.alive, "in_use": pooled.in_use}
+                for key, pooled in self._sessions.items()
+            ],
+        }
+
+
+mcp_session_pool = MCPSessionPool()
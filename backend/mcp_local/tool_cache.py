@@ -0,0 +1,71 @@
+"""
+Redis cache of MCP tool schemas.
+
+Listing the tools of an MCP server means connecting to it and initializing a
+session, which every agent run used to do for every configured server before
+the first LLM call. Tool lists rarely change, so they are cached in Redis per
+(server, config hash) for TOOL_CACHE_TTL and shared by all workers.
+
+Cached tools are stored in the MCP wire format: {"name", "description",
+"inputSchema"}, plus "annotations" when the server provides them.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import redis
+from utils.logger import logger
+
+TOOL_CACHE_TTL = 3600
+
+
+def _cache_key(key: Tuple[str, str]) -> str:
+    server, config_hash = key
+    return f"mcp_tools:{server}:{config_hash}"
+
+
+def tool_to_dict(tool: Any) -> Dict[str, Any]:
+    """Convert an MCP Tool into its cached form."""
+    tool_dict = {
+        "name": tool.name,
+        "description": tool.description,
+        "inputSchema": tool.inputSchema,
+    }
+    # Annotations are only sent by servers (and parsed by SDK versions) that support them
+    annotations = getattr(tool, "annotations", None)
+    if annotations:
+        tool_dict["annotations"] = annotations.model_dump(exclude_none=True) if hasattr(annotations, "model_dump") else annotations
+    return tool_dict
+
+
+def is_read_only(annotations: Any) -> bool:
+    """Whether MCP tool annotations declare that the tool does not modify its environment."""
+    if not annotations:
+        return False
+    if isinstance(annotations, dict):
+        return annotations.get("readOnlyHint") is True
+    return getattr(annotations, "readOnlyHint", None) is True
+
+
+async def get_cached_tools(key: Tuple[str, str]) -> Optional[List[Dict[str, Any]]]:
+    """Return the cached tool list for a session key, or None on a miss."""
+    try:
+        data = await redis.get(_cache_key(key))
+    except Exception as e:
+        logger.warning(f"Failed to read MCP tool cache for {key[0]}: {str(e)}")
+        return None
+    if not data:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+async def cache_tools(key: Tuple[str, str], tools: List[Dict[str, Any]]):
+    """Store the tool list for a session key."""
+    try:
+        await redis.set(_cache_key(key), json.dumps(tools), ex=TOOL_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to write MCP tool cache for {key[0]}: {str(e)}")
+
@@ -1,20 +1,27 @@
+import asyncio
+import hashlib
 import os
 import urllib.parse
-from typing import Optional
+from typing import Any, AsyncIterator, Optional, Tuple
 
+import httpx
 from fastapi import FastAPI, UploadFile, File, HTTPException, APIRouter, Form, Depends, Request
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
 from sandbox.sandbox import get_or_start_sandbox, delete_sandbox
+from sandbox.pool import sandbox_pool
 from utils.logger import logger
-from utils.auth_utils import get_optional_user_id
+from utils.auth_utils import get_optional_user_id, get_current_user_id_from_jwt
 from services.supabase import DBConnection
 
 # Initialize shared resources
 router = APIRouter(tags=["sandbox"])
 db = None
 
+# Chunk size for streamed file downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 def initialize(_db: DBConnection):
     """Initialize the sandbox API with resources from the main API."""
     global db
@@ -65,6 +72,109 @@ def normalize_path(path: str) -> str:
         logger.error(f"Error normalizing path '{path}': {str(e)}")
         return path  # Return original path if decoding fails
 
+def build_file_etag(size: int, mod_time: Any) -> str:
+    """Build a strong ETag from a file's size and modification time."""
+    digest = hashlib.md5(f"{size}:{mod_time}".encode()).hexdigest()
+    return f'"{digest}"'
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header.
+    
+    Args:
+        range_header: The Range header value, e.g. "bytes=0-1023", "bytes=500-" or "bytes=-500"
+        size: The size of the file in bytes
+        
+    Returns:
+        Inclusive (start, end) byte positions, or None to serve the full file
+        
+    Raises:
+        HTTPException: 416 if the range cannot be satisfied
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        # Missing, unknown unit or multiple ranges: serve the full file
+        return None
+    
+    start_str, _, end_str = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range: the last N bytes
+            suffix_length = int(end_str)
+            if suffix_length <= 0:
+                raise ValueError("Empty suffix range")
+            start = max(size - suffix_length, 0)
+            end = size - 1
+    except ValueError:
+        return None
+    
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+async def open_sandbox_file_stream(sandbox, path: str, start: int, end: int, ranged: bool = False) -> AsyncIterator[bytes]:
+    """
+    Open a streaming download of a sandbox file and return an iterator over bytes start..end.
+    
+    The request goes straight to the sandbox toolbox API (as the SDK does for
+    downloads to disk), so the file is never held in memory. The Range header is
+    forwarded; if the toolbox ignores it, the range is cut from the full stream.
+    The upstream status is checked before returning so errors surface as HTTP errors.
+    """
+    # pylint: disable=protected-access
+    method, url, headers, *_ = sandbox.fs._toolbox_api._download_file_serialize(
+        sandbox.id,
+        path=path,
+        x_daytona_organization_id=None,
+        _request_auth=None,
+        _content_type=None,
+        _headers=None,
+        _host_index=None,
+    )
+    headers = dict(headers or {})
+    if ranged:
+        headers["Range"] = f"bytes={start}-{end}"
+    
+    http_client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None))
+    try:
+        upstream = await http_client.send(http_client.build_request(method, url, headers=headers), stream=True)
+        upstream.raise_for_status()
+    except Exception:
+        await http_client.aclose()
+        raise
+    
+    # Bytes to skip / send when the toolbox answered a range request with the full file
+    skip = start if ranged and upstream.status_code != 206 else 0
+    remaining = end - start + 1
+    
+    async def iterate():
+        nonlocal skip, remaining
+        try:
+            async for chunk in upstream.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if skip:
+                    if len(chunk) <= skip:
+                        skip -= len(chunk)
+                        continue
+                    chunk = chunk[skip:]
+                    skip = 0
+                if len(chunk) >= remaining:
+                    yield chunk[:remaining]
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            await upstream.aclose()
+            await http_client.aclose()
+    
+    return iterate()
+
 async def verify_sandbox_access(client, sandbox_id: str, user_id: Optional[str] = None):
     """
     Verify that a user has access to a specific sandbox based on account membership.
@@ -226,7 +336,13 @@ async def read_file(
     request: Request = None,
     user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    """Read a file from the sandbox"""
+    """
+    Stream a file from the sandbox.
+
+    Supports single HTTP byte ranges (206 responses) and conditional requests:
+    the ETag is derived from the file size and modification time, so a matching
+    If-None-Match is answered with 304 without transferring the file.
+    """
     # Normalize the path to handle UTF-8 encoding correctly
     original_path = path
     path = normalize_path(path)
@@ -244,29 +360,61 @@ async def read_file(
         # Get sandbox using the safer method
         sandbox = await get_sandbox_by_id_safely(client, sandbox_id)
         
-        # Read file directly - don't check existence first with a separate call
         try:
-            content = sandbox.fs.download_file(path)
-        except Exception as download_err:
-            logger.error(f"Error downloading file {path} from sandbox {sandbox_id}: {str(download_err)}")
+            file_info = await asyncio.to_thread(sandbox.fs.get_file_info, path)
+        except Exception as info_err:
+            logger.error(f"Error getting file info for {path} in sandbox {sandbox_id}: {str(info_err)}")
             raise HTTPException(
                 status_code=404, 
-                detail=f"Failed to download file: {str(download_err)}"
+                detail=f"Failed to download file: {str(info_err)}"
             )
+        if file_info.is_dir:
+            raise HTTPException(status_code=400, detail=f"Path is a directory: {path}")
         
-        # Return a Response object with the content directly
-        filename = os.path.basename(path)
-        logger.info(f"Successfully read file {filename} from sandbox {sandbox_id}")
+        size = file_info.size
+        etag = build_file_etag(size, file_info.mod_time)
         
         # Ensure proper encoding by explicitly using UTF-8 for the filename in Content-Disposition header
         # This applies RFC 5987 encoding for the filename to support non-ASCII characters
+        filename = os.path.basename(path)
         encoded_filename = filename.encode('utf-8').decode('latin-1')
-        content_disposition = f"attachment; filename*=UTF-8''{encoded_filename}"
+        headers = {
+            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "private, no-cache",
+        }
+        
+        if_none_match = request.headers.get("if-none-match") if request else None
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
         
-        return Response(
-            content=content,
+        byte_range = parse_range_header(request.headers.get("range") if request else None, size)
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+        else:
+            # Full responses use chunked transfer encoding
+            start, end = 0, size - 1
+            status_code = 200
+        
+        try:
+            chunks = await open_sandbox_file_stream(sandbox, path, start, end, ranged=byte_range is not None)
+        except Exception as download_err:
+            logger.error(f"Error downloading file {path} from sandbox {sandbox_id}: {str(download_err)}")
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Failed to download file: {str(download_err)}"
+            )
+        
+        logger.info(f"Streaming file {filename} from sandbox {sandbox_id} (bytes {start}-{end}/{size})")
+        return StreamingResponse(
+            chunks,
+            status_code=status_code,
             media_type="application/octet-stream",
-            headers={"Content-Disposition": content_disposition}
+            headers=headers
         )
     except HTTPException:
         # Re-raise HTTP exceptions without wrapping
@@ -327,6 +475,17 @@ async def delete_sandbox_route(
         logger.error(f"Error deleting sandbox {sandbox_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/sandboxes/pool/stats")
+async def get_sandbox_pool_stats(
+    user_id: str = Depends(get_current_user_id_from_jwt)
+):
+    """Get warm sandbox pool size and hit/miss metrics"""
+    try:
+        return await sandbox_pool.get_stats()
+    except Exception as e:
+        logger.error(f"Error getting sandbox pool stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Should happen on server-side fully
 @router.post("/project/{project_id}/sandbox/ensure-active")
 async def ensure_project_sandbox_active(
@@ -0,0 +1,312 @@
+"""
+Command runner for tmux sessions inside a sandbox.
+
+Commands are sent to a tmux session wrapped with an exit-code sentinel: once the
+command finishes, its exit code is written to a per-session file. The pane
+output is piped to a per-session log file, and a per-session cursor file keeps
+the byte offset of the last read so each read returns only new output.
+
+Waiting for completion happens inside the sandbox in a single exec that returns
+as soon as the sentinel appears, and the exec runs in a worker thread so the
+event loop is never blocked.
+
+Short control commands (tmux has-session, kill-session, reads) go through one
+persistent sandbox session, and several of them can be sent as a single script
+with `run_batch`, so a tool call costs one round trip instead of one per command.
+"""
+
+import asyncio
+import base64
+import re
+import shlex
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from daytona_sdk import Sandbox, SessionExecuteRequest
+
+SESSION_LOG_DIR = "/tmp/suna_sessions"
+
+# How often the in-sandbox wait loop checks the sentinel file
+WAIT_POLL_INTERVAL = 0.1
+
+# Maximum bytes of output returned by a single read
+MAX_OUTPUT_BYTES = 64 * 1024
+
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07]*(\x07|\x1b\\)|\x1b[()][A-Za-z0-9]|\x1b[=>]')
+
+
+@dataclass
+class CommandResult:
+    """Result of waiting for (or reading from) a session command."""
+    output: str
+    exit_code: Optional[int] = None
+    completed: bool = False
+    # Byte offset in the session log the output starts at, and the offset after it
+    start_offset: int = 0
+    offset: int = 0
+    # Total size of the session log in bytes
+    total_size: int = 0
+    # Unread bytes skipped because the output exceeded the read limit
+    omitted_bytes: int = 0
+
+
+@dataclass
+class BatchCommandResult:
+    """Output and exit code of one command in a batch."""
+    output: str
+    exit_code: int
+
+
+class SandboxCommandRunner:
+    """
+    Runs commands in named tmux sessions of a sandbox and tracks their output.
+
+    Each session has a log file and a cursor file holding the byte offset of
+    the last read, both inside the sandbox, so cursors survive across tool
+    instances and agent runs.
+    """
+
+    def __init__(self, sandbox: Sandbox):
+        self.sandbox = sandbox
+        self._session_id: Optional[str] = None
+        self._session_lock = asyncio.Lock()
+
+    @staticmethod
+    def log_file(session_name: str) -> str:
+        return f"{SESSION_LOG_DIR}/{session_name}.log"
+
+    @staticmethod
+    def exit_file(session_name: str) -> str:
+        return f"{SESSION_LOG_DIR}/{session_name}.exit"
+
+    @staticmethod
+    def cursor_file(session_name: str) -> str:
+        return f"{SESSION_LOG_DIR}/{session_name}.cursor"
+
+    async def _ensure_session(self) -> str:
+        """Create the persistent control session on first use."""
+        async with self._session_lock:
+            if self._session_id is None:
+                session_id = f"suna-control-{uuid4().hex[:12]}"
+                await asyncio.to_thread(self.sandbox.process.create_session, session_id)
+                self._session_id = session_id
+        return self._session_id
+
+    async def exec(self, script: str, timeout: int = 30) -> Tuple[int, str]:
+        """
+        Run a short shell script in the persistent control session.
+
+        The script is passed base64-encoded to a child shell, so it can span
+        several lines and needs no extra quoting.
+        """
+        session_id = await self._ensure_session()
+        encoded = base64.b64encode(script.encode()).decode()
+        req = SessionExecuteRequest(command=f"echo '{encoded}' | base64 -d | sh", var_async=False)
+        response = await asyncio.to_thread(
+            self.sandbox.process.execute_session_command, session_id, req, timeout
+        )
+        output = response.output
+        if output is None:
+            # Older toolbox versions only return output through the logs endpoint
+            output = await asyncio.to_thread(
+                self.sandbox.process.get_session_command_logs, session_id, response.cmd_id
+            )
+        return int(response.exit_code or 0), output or ""
+
+    async def exec_detached(self, script: str, timeout: int = 30) -> Tuple[int, str]:
+        """Run a long-running shell script outside the control session so it does not block it."""
+        response = await asyncio.to_thread(self.sandbox.process.exec, script, timeout=timeout)
+        return response.exit_code, response.result or ""
+
+    async def run_batch(self, commands: List[str], timeout: int = 30) -> List[BatchCommandResult]:
+        """
+        Run several commands in one round trip and return a result per command.
+
+        Each command's output is framed by a random marker together with its
+        index and exit code, so the combined output can be split reliably.
+        """
+        marker = f"__SUNA_BATCH_{uuid4().hex}__"
+        script = "".join(
+            f"echo '{marker} {index} BEGIN'\n"
+            f"{{ {command}\n}} 2>&1\n"
+            f"printf '\\n{marker} {index} END %s\\n' \"$?\"\n"
+            for index, command in enumerate(commands)
+        )
+        _, output = await self.exec(script, timeout=timeout)
+
+        pattern = re.compile(rf"{marker} (\d+) BEGIN\n(.*?)\n{marker} \1 END (-?\d+)", re.S)
+        results = [BatchCommandResult(output="", exit_code=-1) for _ in commands]
+        for match in pattern.finditer(output):
+            index = int(match.group(1))
+            if index < len(results):
+                results[index] = BatchCommandResult(output=match.group(2), exit_code=int(match.group(3)))
+        return results
+
+    async def close(self):
+        """Delete the persistent control session."""
+        if self._session_id is None:
+            return
+        try:
+            await asyncio.to_thread(self.sandbox.process.delete_session, self._session_id)
+        finally:
+            self._session_id = None
+
+    def clean_output(self, session_name: str, raw: str) -> str:
+        """Strip terminal control sequences and the sentinel bookkeeping from pane output."""
+        text = ANSI_ESCAPE_RE.sub('', raw).replace('\r\n', '\n').replace('\r', '')
+        exit_file = self.exit_file(session_name)
+        return '\n'.join(line for line in text.split('\n') if exit_file not in line)
+
+    def _read_script(
+        self,
+        session_name: str,
+        since: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+        max_bytes: int = MAX_OUTPUT_BYTES,
+    ) -> str:
+        """
+        Script that prints "<size> <start> <from> <exit>" on the first line followed
+        by the log from byte <from> to <size>, and moves the session cursor to <size>.
+
+        <start> is `since` or the stored cursor; <from> is later than <start> when
+        more than `max_bytes` are unread. <exit> is the exit code of the last
+        command, or "-" while it is still running.
+        """
+        log_file = shlex.quote(self.log_file(session_name))
+        exit_file = shlex.quote(self.exit_file(session_name))
+        cursor_file = shlex.quote(self.cursor_file(session_name))
+        start = str(int(since)) if since is not None else f"$(cat {cursor_file} 2>/dev/null || echo 0)"
+        tail = f" | tail -n {int(tail_lines)}" if tail_lines else ""
+        return (
+            f"size=$(stat -c %s {log_file} 2>/dev/null || echo 0)\n"
+            f"start={start}\n"
+            f"if [ \"$start\" -gt \"$size\" ]; then start=0; fi\n"
+            f"from=$start\n"
+            f"if [ $((size - from)) -gt {int(max_bytes)} ]; then from=$((size - {int(max_bytes)})); fi\n"
+            f"echo \"$size $start $from $(cat {exit_file} 2>/dev/null || echo -)\"\n"
+            f"[ -f {log_file} ] && echo \"$size\" > {cursor_file}\n"
+            f"if [ \"$size\" -gt \"$from\" ]; then tail -c +$((from + 1)) {log_file} | head -c $((size - from)){tail}; fi\n"
+        )
+
+    def _parse_read(self, session_name: str, text: str) -> CommandResult:
+        """Parse the output of `_read_script`."""
+        header, _, raw = text.partition('\n')
+        try:
+            size, start, read_from, exit_code = header.split()
+            size, start, read_from = int(size), int(start), int(read_from)
+            exit_code = int(exit_code) if exit_code.lstrip('-').isdigit() else None
+        except ValueError:
+            return CommandResult(output=self.clean_output(session_name, text))
+        return CommandResult(
+            output=self.clean_output(session_name, raw),
+            exit_code=exit_code,
+            completed=exit_code is not None,
+            start_offset=start,
+            offset=size,
+            total_size=size,
+            omitted_bytes=read_from - start,
+        )
+
+    async def start(self, session_name: str, command: str, cwd: str):
+        """
+        Send a command to a tmux session, creating the session if needed.
+
+        The command is evaluated in the session's shell so state such as the
+        working directory and exported variables is kept between commands.
+        """
+        session = shlex.quote(session_name)
+        log_file = shlex.quote(self.log_file(session_name))
+        exit_file = shlex.quote(self.exit_file(session_name))
+        cursor_file = shlex.quote(self.cursor_file(session_name))
+        # Write the exit code to a temp file first so readers never see a partial sentinel
+        wrapped = (
+            f"cd {shlex.quote(cwd)} && eval {shlex.quote(command)}; "
+            f"echo $? > {exit_file}.tmp; mv {exit_file}.tmp {exit_file}"
+        )
+
+        script = (
+            f"mkdir -p {SESSION_LOG_DIR}\n"
+            f"rm -f {exit_file}\n"
+            f"if ! tmux has-session -t {session} 2>/dev/null; then\n"
+            f"  : > {log_file}; rm -f {cursor_file}\n"
+            f"  tmux new-session -d -s {session} -x 250 -y 50 || exit 1\n"
+            f"fi\n"
+            # pipe-pane toggles an existing pipe off, so only open one if the pane has none
+            f"if [ \"$(tmux display-message -p -t {session} '#{{pane_pipe}}')\" != 1 ]; then\n"
+            f"  tmux pipe-pane -t {session} {shlex.quote(f'cat >> {log_file}')}\n"
+            f"fi\n"
+            f"tmux send-keys -t {session} -l {shlex.quote(wrapped)} && tmux send-keys -t {session} Enter\n"
+        )
+        exit_code, output = await self.exec(script)
+        if exit_code != 0:
+            raise RuntimeError(f"Failed to start command in session '{session_name}': {output}")
+
+    async def wait(self, session_name: str, timeout: int = 60) -> CommandResult:
+        """
+        Wait until the last command in a session exits or the timeout elapses.
+
+        Returns:
+            CommandResult with the exit code (None if still running) and the output
+            produced since the last read.
+        """
+        exit_file = shlex.quote(self.exit_file(session_name))
+        script = (
+            f"end=$(( $(date +%s) + {int(timeout)} ))\n"
+            f"while [ ! -f {exit_file} ] && [ $(date +%s) -lt $end ]; do sleep {WAIT_POLL_INTERVAL}; done\n"
+            + self._read_script(session_name)
+        )
+        _, text = await self.exec_detached(script, timeout=int(timeout) + 30)
+        return self._parse_read(session_name, text)
+
+    async def read_output(
+        self,
+        session_name: str,
+        since: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+        max_bytes: int = MAX_OUTPUT_BYTES,
+    ) -> CommandResult:
+        """
+        Read session output and move the session cursor to the end of the log.
+
+        Args:
+            session_name: The tmux session to read from
+            since: Byte offset to read from. Defaults to the session cursor (last read).
+            tail_lines: Only return the last N lines of the selected range
+            max_bytes: Maximum number of bytes to return; older unread bytes are omitted
+        """
+        _, text = await self.exec(self._read_script(session_name, since, tail_lines, max_bytes))
+        return self._parse_read(session_name, text)
+
+    def has_session_command(self, session_name: str) -> str:
+        """Command that succeeds if the tmux session exists."""
+        return f"tmux has-session -t {shlex.quote(session_name)} 2>/dev/null"
+
+    def read_output_command(
+        self,
+        session_name: str,
+        since: Optional[int] = None,
+        tail_lines: Optional[int] = None,
+        max_bytes: int = MAX_OUTPUT_BYTES,
+    ) -> str:
+        """Command for `run_batch` whose output is parsed with `parse_output`."""
+        return self._read_script(session_name, since, tail_lines, max_bytes)
+
+    def parse_output(self, session_name: str, output: str) -> CommandResult:
+        """Parse the output of `read_output_command`."""
+        return self._parse_read(session_name, output)
+
+    def kill_session_command(self, session_name: str) -> str:
+        """Command that kills a tmux session and removes its log, sentinel and cursor files."""
+        files = " ".join(
+            shlex.quote(path) for path in (
+                self.log_file(session_name),
+                self.exit_file(session_name),
+                self.cursor_file(session_name),
+            )
+        )
+        return f"tmux kill-session -t {shlex.quote(session_name)} 2>/dev/null; rm -f {files}"
+
+    async def kill_session(self, session_name: str):
+        """Kill a tmux session and remove its log, sentinel and cursor files."""
+        await self.exec(self.kill_session_command(session_name))
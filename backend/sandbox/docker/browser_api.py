@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Body
+from fastapi import FastAPI, APIRouter, HTTPException, Body, Request, Response
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
@@ -12,10 +12,302 @@ import os
 import random
 from functools import cached_property
 import traceback
+import hashlib
+import contextvars
+import multiprocessing
+import re
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import pytesseract
 from PIL import Image
 import io
 
+#######################################################
+# Screenshot settings
+#######################################################
+
+# "jpeg" is captured directly by the browser, "webp" is re-encoded from a PNG capture
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg").lower()
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "60"))
+# Recent screenshots kept in memory for GET /automation/screenshot/{id}
+SCREENSHOT_CACHE_SIZE = 5
+# Side of the difference hash grid (16 -> 256-bit hash)
+SCREENSHOT_HASH_SIZE = 16
+
+# Clients sending "X-Screenshot-Transfer: binary" get a screenshot id instead of
+# inline base64 and fetch the image bytes separately (only when it changed)
+SCREENSHOT_TRANSFER_HEADER = "X-Screenshot-Transfer"
+screenshot_transfer = contextvars.ContextVar("screenshot_transfer", default="base64")
+
+#######################################################
+# OCR settings
+#######################################################
+
+# OCR is computed on demand (GET /automation/ocr/{screenshot_id}) unless a
+# request sends "X-Include-OCR: true", in which case it is returned inline
+OCR_HEADER = "X-Include-OCR"
+include_ocr = contextvars.ContextVar("include_ocr", default=False)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_CACHE_SIZE = 100
+
+
+def ocr_image_bytes(image_bytes: bytes) -> str:
+    """Run tesseract on an image. Executed in the OCR process pool."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image).strip()
+
+
+def perceptual_hash(image_bytes: bytes, hash_size: int = SCREENSHOT_HASH_SIZE) -> str:
+    """Difference hash of an image: one bit per horizontally adjacent pixel pair of a downscaled grayscale copy."""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        pixels = list(img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+#######################################################
+# DOM tracker
+#######################################################
+
+# Injected into every page. A MutationObserver (plus scroll, resize and input
+# listeners) bumps a version number whenever something that could change the
+# interactive elements happens. snapshot(token, version) answers "unchanged"
+# when the caller already has the current version, and otherwise returns the
+# element order plus only the elements whose data changed since the previous
+# snapshot. Elements keep a stable id (eid) for the lifetime of the document,
+# and actions resolve elements of the latest snapshot by that id.
+DOM_TRACKER_JS = """
+(() => {
+    if (window.__sunaDomTracker) return;
+
+    const INTERACTIVE_SELECTOR = 'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])';
+    const token = Math.random().toString(36).slice(2) + Date.now().toString(36);
+    const elementIds = new WeakMap();
+    let nextId = 1;
+    let version = 0;
+    let snapshotVersion = null;
+    let lastRecords = new Map();
+    let lastElements = new Map();
+    let lastChange = performance.now();
+    let lastShift = 0;
+
+    const bump = () => { version++; lastChange = performance.now(); };
+    new MutationObserver(bump).observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+    window.addEventListener('scroll', bump, { passive: true, capture: true });
+    window.addEventListener('resize', bump);
+    // Form values are not reflected in attributes
+    document.addEventListener('input', bump, true);
+    document.addEventListener('change', bump, true);
+    // Visibility and geometry can change without a mutation: CSS transitions
+    // and animations, and images (e.g. lazy-loaded ones) finishing loading
+    document.addEventListener('transitionend', bump, true);
+    document.addEventListener('animationend', bump, true);
+    document.addEventListener('load', bump, true);
+    try {
+        new PerformanceObserver(() => { lastShift = performance.now(); }).observe({ type: 'layout-shift' });
+    } catch (e) {
+        // Layout shift entries are not supported everywhere
+    }
+
+    function elementId(el) {
+        let id = elementIds.get(el);
+        if (!id) {
+            id = nextId++;
+            elementIds.set(el, id);
+        }
+        return id;
+    }
+
+    function getAttributes(el) {
+        const attributes = {};
+        for (const attr of el.attributes) {
+            attributes[attr.name] = attr.value;
+        }
+        return attributes;
+    }
+
+    function collect(elements) {
+        const records = [];
+        for (const el of document.querySelectorAll(INTERACTIVE_SELECTOR)) {
+            const style = window.getComputedStyle(el);
+            const rect = el.getBoundingClientRect();
+            if (style.display === 'none' || style.visibility === 'hidden' || style.opacity === '0' ||
+                rect.width <= 0 || rect.height <= 0) {
+                continue;
+            }
+            elements.set(elementId(el), el);
+            records.push({
+                eid: elementId(el),
+                tagName: el.tagName.toLowerCase(),
+                text: el.innerText || el.value || '',
+                attributes: getAttributes(el),
+                isVisible: true,
+                isInteractive: true,
+                pageCoordinates: {
+                    x: rect.left + window.scrollX,
+                    y: rect.top + window.scrollY,
+                    width: rect.width,
+                    height: rect.height
+                },
+                viewportCoordinates: {
+                    x: rect.left,
+                    y: rect.top,
+                    width: rect.width,
+                    height: rect.height
+                },
+                isInViewport: rect.top >= 0 && rect.left >= 0 &&
+                              rect.bottom <= window.innerHeight && rect.right <= window.innerWidth
+            });
+        }
+        return records;
+    }
+
+    function scrollInfo() {
+        const body = document.body || document.documentElement;
+        const html = document.documentElement;
+        const totalHeight = Math.max(
+            body.scrollHeight, body.offsetHeight,
+            html.clientHeight, html.scrollHeight, html.offsetHeight
+        );
+        const scrollY = window.scrollY || window.pageYOffset;
+        return {
+            pixelsAbove: scrollY,
+            pixelsBelow: Math.max(0, totalHeight - scrollY - window.innerHeight)
+        };
+    }
+
+    window.__sunaDomTracker = {
+        readiness() {
+            const now = performance.now();
+            return {
+                readyState: document.readyState,
+                domIdleMs: now - lastChange,
+                shiftIdleMs: lastShift ? now - lastShift : now,
+                fontsReady: !document.fonts || document.fonts.status === 'loaded'
+            };
+        },
+        snapshot(knownToken, knownVersion) {
+            if (knownToken === token && knownVersion === version) {
+                return { token, version, unchanged: true };
+            }
+            // A diff is only valid against the snapshot the caller holds
+            const full = knownToken !== token || knownVersion !== snapshotVersion;
+            const currentVersion = version;
+            const elements = new Map();
+            const records = collect(elements);
+            const current = new Map();
+            const changed = [];
+            for (const record of records) {
+                const serialized = JSON.stringify(record);
+                current.set(record.eid, serialized);
+                if (full || lastRecords.get(record.eid) !== serialized) {
+                    changed.push(record);
+                }
+            }
+            lastRecords = current;
+            lastElements = elements;
+            snapshotVersion = currentVersion;
+            return {
+                token,
+                version: currentVersion,
+                unchanged: false,
+                full,
+                order: records.map(record => record.eid),
+                changed,
+                scroll: scrollInfo()
+            };
+        },
+        element(eid) {
+            const el = lastElements.get(eid);
+            return el && el.isConnected ? el : null;
+        }
+    };
+})();
+"""
+
+DOM_SNAPSHOT_JS = """
+([knownToken, knownVersion]) => window.__sunaDomTracker
+    ? window.__sunaDomTracker.snapshot(knownToken, knownVersion)
+    : null
+"""
+
+ELEMENT_BY_ID_JS = """
+(eid) => window.__sunaDomTracker ? window.__sunaDomTracker.element(eid) : null
+"""
+
+READINESS_JS = """
+() => window.__sunaDomTracker ? window.__sunaDomTracker.readiness() : null
+"""
+
+#######################################################
+# Page readiness
+#######################################################
+
+# A page is ready once the DOM has not changed and no layout shift happened for
+# DOM_QUIET_MS, fonts are loaded, and no relevant request has been in flight
+# for NETWORK_QUIET_MS. Each action waits at most its latency budget.
+READINESS_POLL_INTERVAL = 0.1
+DOM_QUIET_MS = 300
+NETWORK_QUIET_MS = 300
+# Requests open longer than this are treated as long-polling and ignored
+LONG_REQUEST_MS = 5000
+READINESS_BUDGETS_MS = {
+    "navigate": 8000,
+    "tab": 8000,
+    "click": 3000,
+    "input": 1500,
+    "keys": 1500,
+    "scroll": 800,
+    "state": 1500,
+}
+DEFAULT_READINESS_BUDGET_MS = 2000
+
+# Requests that never settle or do not affect what is rendered
+IGNORED_RESOURCE_TYPES = {"websocket", "eventsource", "ping", "media", "manifest"}
+TRACKER_URL_RE = re.compile(
+    r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|googlesyndication\.com|"
+    r"connect\.facebook\.net|facebook\.com/tr|hotjar\.(com|io)|segment\.(com|io)|mixpanel\.com|"
+    r"clarity\.ms|sentry\.io|nr-data\.net|newrelic\.com|amplitude\.com|fullstory\.com|"
+    r"intercom\.io|bat\.bing\.com|/collect\?|/beacon"
+)
+
+
+class NetworkActivity:
+    """Tracks in-flight requests of a page that matter for readiness"""
+    
+    def __init__(self, page: Page):
+        self.pending: Dict[Any, float] = {}
+        self.last_activity = time.monotonic()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+    
+    @staticmethod
+    def _is_relevant(request) -> bool:
+        return request.resource_type not in IGNORED_RESOURCE_TYPES and not TRACKER_URL_RE.search(request.url)
+    
+    def _on_request(self, request):
+        if self._is_relevant(request):
+            self.pending[request] = time.monotonic()
+            self.last_activity = time.monotonic()
+    
+    def _on_done(self, request):
+        if self.pending.pop(request, None) is not None:
+            self.last_activity = time.monotonic()
+    
+    def is_quiet(self) -> bool:
+        now = time.monotonic()
+        active = [started for started in self.pending.values() if (now - started) * 1000 < LONG_REQUEST_MS]
+        return not active and (now - self.last_activity) * 1000 >= NETWORK_QUIET_MS
+
 #######################################################
 # Action model definitions
 #######################################################
@@ -130,6 +422,7 @@ class DOMElementNode(DOMBaseNode):
     is_in_viewport: bool = False
     shadow_root: bool = False
     highlight_index: Optional[int] = None
+    element_id: Optional[int] = None  # Stable id assigned by the DOM tracker
     viewport_coordinates: Optional[CoordinateSet] = None
     page_coordinates: Optional[CoordinateSet] = None
     viewport_info: Optional[ViewportInfo] = None
@@ -260,6 +553,9 @@ class BrowserActionResult(BaseModel):
     title: Optional[str] = None
     elements: Optional[str] = None  # Formatted string of clickable elements
     screenshot_base64: Optional[str] = None
+    screenshot_id: Optional[str] = None  # SHA-256 of the image bytes
+    screenshot_phash: Optional[str] = None  # Perceptual hash for change detection
+    screenshot_format: Optional[str] = None
     pixels_above: int = 0
     pixels_below: int = 0
     content: Optional[str] = None
@@ -289,6 +585,15 @@ class BrowserAutomation:
         self.include_attributes = ["id", "href", "src", "alt", "aria-label", "placeholder", "name", "role", "title", "value"]
         self.screenshot_dir = os.path.join(os.getcwd(), "screenshots")
         os.makedirs(self.screenshot_dir, exist_ok=True)
+        self.screenshots: "OrderedDict[str, bytes]" = OrderedDict()
+        self.last_screenshot_id: Optional[str] = None
+        self.last_screenshot_phash: Optional[str] = None
+        # Last DOM snapshot per page: token, version, element records, selector map and scroll info
+        self.dom_snapshots: "weakref.WeakKeyDictionary[Page, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        self.network_activity: "weakref.WeakKeyDictionary[Page, NetworkActivity]" = weakref.WeakKeyDictionary()
+        self.ocr_pool: Optional[ProcessPoolExecutor] = None
+        self.ocr_cache: "OrderedDict[str, str]" = OrderedDict()
+        self.ocr_pending: Dict[str, asyncio.Future] = {}
         
         # Register routes
         self.router.on_startup.append(self.startup)
@@ -326,6 +631,10 @@ class BrowserAutomation:
         
         # Drag and drop
         self.router.post("/automation/drag_drop")(self.drag_drop)
+        
+        # Screenshot bytes for clients using binary transfer
+        self.router.get("/automation/screenshot/{screenshot_id}")(self.get_screenshot)
+        self.router.get("/automation/ocr/{screenshot_id}")(self.get_ocr)
 
     async def startup(self):
         """Initialize the browser instance on startup"""
@@ -353,6 +662,9 @@ class BrowserAutomation:
                 self.browser_context = await self.browser.new_context(viewport={'width': 1024, 'height': 768})
                 print("Browser launched with minimal options")
 
+            # Track interactive elements inside every page for incremental snapshots
+            await self.browser_context.add_init_script(DOM_TRACKER_JS)
+
             try:
                 await self.get_current_page()
                 print("Found existing page, using it")
@@ -361,6 +673,7 @@ class BrowserAutomation:
                 print(f"Error finding existing page, creating new one. ( {page_error})")
                 page = await self.browser_context.new_page()
                 print("New page created successfully")
+                self.track_page(page)
                 self.pages.append(page)
                 self.current_page_index = 0
                 # Navigate directly to google.com instead of about:blank
@@ -386,9 +699,12 @@ class BrowserAutomation:
             await self.browser_context.close()
         if self.browser:
             await self.browser.close()
+        if self.ocr_pool:
+            self.ocr_pool.shutdown(wait=False, cancel_futures=True)
 
     async def handle_page_created(self, page: Page):
         """Handle new page creation"""
+        self.track_page(page)
         await asyncio.sleep(0.5)
         self.pages.append(page)
         self.current_page_index = len(self.pages) - 1
@@ -400,6 +716,145 @@ class BrowserAutomation:
             raise HTTPException(status_code=500, detail="No browser pages available")
         return self.pages[self.current_page_index]
     
+    def track_page(self, page: Page) -> NetworkActivity:
+        """Start tracking the network activity of a page"""
+        activity = self.network_activity.get(page)
+        if activity is None:
+            activity = NetworkActivity(page)
+            self.network_activity[page] = activity
+        return activity
+    
+    async def wait_until_ready(self, page: Page, action: str) -> bool:
+        """Wait until the page is ready after an action, within the action's latency budget.
+        
+        Returns True if the page became ready, False if the budget ran out first.
+        """
+        budget = READINESS_BUDGETS_MS.get(action, DEFAULT_READINESS_BUDGET_MS) / 1000
+        start = time.monotonic()
+        deadline = start + budget
+        network = self.track_page(page)
+        ready = False
+        
+        while True:
+            try:
+                # Evaluation waits for a new document during navigations, so bound it too
+                state = await asyncio.wait_for(page.evaluate(READINESS_JS), max(deadline - time.monotonic(), 0.05))
+                if state is None:
+                    await page.evaluate(DOM_TRACKER_JS)
+            except Exception:
+                state = None
+            
+            ready = bool(
+                state
+                and state["readyState"] != "loading"
+                and state["domIdleMs"] >= DOM_QUIET_MS
+                and state["shiftIdleMs"] >= DOM_QUIET_MS
+                and state["fontsReady"]
+                and network.is_quiet()
+            )
+            if ready or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(READINESS_POLL_INTERVAL)
+        
+        elapsed_ms = (time.monotonic() - start) * 1000
+        print(f"Page {'ready' if ready else 'not ready, budget exhausted'} after {action} in {elapsed_ms:.0f}ms")
+        return ready
+    
+    def build_selector_map(self, records: List[Dict[str, Any]]) -> Dict[int, DOMElementNode]:
+        """Build element nodes, indexed from 1 in document order, from tracker records"""
+        selector_map = {}
+        
+        # Create a root element for the tree
+        root = DOMElementNode(
+            is_visible=True,
+            tag_name="body",
+            is_interactive=False,
+            is_top_element=True
+        )
+        
+        # Create element nodes for each element
+        for idx, el in enumerate(records):
+            # Create coordinate sets
+            page_coordinates = None
+            viewport_coordinates = None
+            
+            if 'pageCoordinates' in el:
+                coords = el['pageCoordinates']
+                page_coordinates = CoordinateSet(
+                    x=coords.get('x', 0),
+                    y=coords.get('y', 0),
+                    width=coords.get('width', 0),
+                    height=coords.get('height', 0)
+                )
+            
+            if 'viewportCoordinates' in el:
+                coords = el['viewportCoordinates']
+                viewport_coordinates = CoordinateSet(
+                    x=coords.get('x', 0),
+                    y=coords.get('y', 0),
+                    width=coords.get('width', 0),
+                    height=coords.get('height', 0)
+                )
+            
+            # Create the element node
+            element_node = DOMElementNode(
+                is_visible=el.get('isVisible', True),
+                tag_name=el.get('tagName', 'div'),
+                attributes=el.get('attributes', {}),
+                is_interactive=el.get('isInteractive', True),
+                is_in_viewport=el.get('isInViewport', False),
+                highlight_index=idx + 1,
+                element_id=el.get('eid'),
+                page_coordinates=page_coordinates,
+                viewport_coordinates=viewport_coordinates
+            )
+            
+            # Add a text node if there's text content
+            if el.get('text'):
+                text_node = DOMTextNode(is_visible=True, text=el.get('text', ''))
+                text_node.parent = element_node
+                element_node.children.append(text_node)
+            
+            selector_map[idx + 1] = element_node
+            root.children.append(element_node)
+            element_node.parent = root
+        
+        return selector_map
+    
+    async def get_dom_snapshot(self, page: Page) -> Dict[str, Any]:
+        """Get the interactive elements of a page from the in-page tracker.
+        
+        Unchanged pages are answered from the cached snapshot; otherwise only the
+        elements that changed since the previous snapshot are transferred.
+        """
+        cached = self.dom_snapshots.get(page)
+        known = [cached["token"], cached["version"]] if cached else [None, None]
+        
+        result = await page.evaluate(DOM_SNAPSHOT_JS, known)
+        if result is None:
+            # Pages opened before the init script was registered
+            await page.evaluate(DOM_TRACKER_JS)
+            result = await page.evaluate(DOM_SNAPSHOT_JS, known)
+        
+        if result["unchanged"] and cached:
+            return cached
+        
+        records = {} if result["full"] or not cached else cached["records"]
+        for record in result["changed"]:
+            records[record["eid"]] = record
+        records = {eid: records[eid] for eid in result["order"]}
+        
+        snapshot = {
+            "token": result["token"],
+            "version": result["version"],
+            "records": records,
+            "selector_map": self.build_selector_map(list(records.values())),
+            "scroll": result.get("scroll"),
+        }
+        self.dom_snapshots[page] = snapshot
+        print(f"DOM snapshot: {len(records)} interactive elements, {len(result['changed'])} changed")
+        return snapshot
+    
     async def get_selector_map(self) -> Dict[int, DOMElementNode]:
         """Get a map of selectable elements on the page"""
         page = await self.get_current_page()
@@ -408,127 +863,14 @@ class BrowserAutomation:
         selector_map = {}
         
         try:
-            # More comprehensive JavaScript to find interactive elements
-            elements_js = """
-            (() => {
-                // Helper function to get all attributes as an object
-                function getAttributes(el) {
-                    const attributes = {};
-                    for (const attr of el.attributes) {
-                        attributes[attr.name] = attr.value;
-                    }
-                    return attributes;
-                }
-                
-                // Find all potentially interactive elements
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-                
-                // Filter for visible elements
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && 
-                           style.visibility !== 'hidden' && 
-                           style.opacity !== '0' &&
-                           rect.width > 0 && 
-                           rect.height > 0;
-                });
-                
-                // Map to our expected structure
-                return visibleElements.map((el, index) => {
-                    const rect = el.getBoundingClientRect();
-                    const isInViewport = rect.top >= 0 && 
-                                      rect.left >= 0 && 
-                                      rect.bottom <= window.innerHeight &&
-                                      rect.right <= window.innerWidth;
-                    
-                    return {
-                        index: index + 1,
-                        tagName: el.tagName.toLowerCase(),
-                        text: el.innerText || el.value || '',
-                        attributes: getAttributes(el),
-                        isVisible: true,
-                        isInteractive: true,
-                        pageCoordinates: {
-                            x: rect.left + window.scrollX,
-                            y: rect.top + window.scrollY,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        viewportCoordinates: {
-                            x: rect.left,
-                            y: rect.top,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        isInViewport: isInViewport
-                    };
-                });
-            })();
-            """
-            
-            elements = await page.evaluate(elements_js)
-            print(f"Found {len(elements)} interactive elements in selector map")
-            
-            # Create a root element for the tree
-            root = DOMElementNode(
-                is_visible=True,
-                tag_name="body",
-                is_interactive=False,
-                is_top_element=True
-            )
-            
-            # Create element nodes for each element
-            for idx, el in enumerate(elements):
-                # Create coordinate sets
-                page_coordinates = None
-                viewport_coordinates = None
-                
-                if 'pageCoordinates' in el:
-                    coords = el['pageCoordinates']
-                    page_coordinates = CoordinateSet(
-                        x=coords.get('x', 0),
-                        y=coords.get('y', 0),
-                        width=coords.get('width', 0),
-                        height=coords.get('height', 0)
-                    )
-                
-                if 'viewportCoordinates' in el:
-                    coords = el['viewportCoordinates']
-                    viewport_coordinates = CoordinateSet(
-                        x=coords.get('x', 0),
-                        y=coords.get('y', 0),
-                        width=coords.get('width', 0),
-                        height=coords.get('height', 0)
-                    )
-                
-                # Create the element node
-                element_node = DOMElementNode(
-                    is_visible=el.get('isVisible', True),
-                    tag_name=el.get('tagName', 'div'),
-                    attributes=el.get('attributes', {}),
-                    is_interactive=el.get('isInteractive', True),
-                    is_in_viewport=el.get('isInViewport', False),
-                    highlight_index=el.get('index', idx + 1),
-                    page_coordinates=page_coordinates,
-                    viewport_coordinates=viewport_coordinates
-                )
-                
-                # Add a text node if there's text content
-                if el.get('text'):
-                    text_node = DOMTextNode(is_visible=True, text=el.get('text', ''))
-                    text_node.parent = element_node
-                    element_node.children.append(text_node)
-                
-                selector_map[el.get('index', idx + 1)] = element_node
-                root.children.append(element_node)
-                element_node.parent = root
+            snapshot = await self.get_dom_snapshot(page)
+            selector_map = snapshot["selector_map"]
+            print(f"Found {len(selector_map)} interactive elements in selector map")
                 
         except Exception as e:
             print(f"Error getting selector map: {e}")
             traceback.print_exc()
+            self.dom_snapshots.pop(page, None)
             # Create a dummy element to avoid breaking tests
             dummy = DOMElementNode(
                 is_visible=True,
@@ -571,9 +913,10 @@ class BrowserAutomation:
             except:
                 title = "Unknown Title"
             
-            # Get more accurate scroll information - fix JavaScript syntax
+            # Scroll information comes with the DOM snapshot; evaluate it only as a fallback
+            snapshot = self.dom_snapshots.get(page)
             try:
-                scroll_info = await page.evaluate("""
+                scroll_info = snapshot["scroll"] if snapshot and snapshot.get("scroll") else await page.evaluate("""
                 () => {
                     const body = document.body;
                     const html = document.documentElement;
@@ -638,24 +981,23 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
             
-            # Wait for network to be idle and DOM to be stable
-            try:
-                await page.wait_for_load_state("networkidle", timeout=60000)  # Increased timeout to 60s
-            except Exception as e:
-                print(f"Warning: Network idle timeout, proceeding anyway: {e}")
-            
-            # Wait for any animations to complete
-            # await page.wait_for_timeout(1000)  # Wait 1 second for animations
+            # Readiness is awaited by the caller (get_updated_browser_state)
             
             # Take screenshot with increased timeout and better options
             screenshot_bytes = await page.screenshot(
-                type='jpeg',
-                quality=60,
+                type='png' if SCREENSHOT_FORMAT == 'webp' else 'jpeg',
+                quality=None if SCREENSHOT_FORMAT == 'webp' else SCREENSHOT_QUALITY,
                 full_page=False,
                 timeout=60000,  # Increased timeout to 60s
                 scale='device'  # Use device scale factor
             )
+            if SCREENSHOT_FORMAT == 'webp':
+                with Image.open(io.BytesIO(screenshot_bytes)) as img:
+                    buffer = io.BytesIO()
+                    img.save(buffer, format='WEBP', quality=SCREENSHOT_QUALITY, method=4)
+                    screenshot_bytes = buffer.getvalue()
             
+            self.remember_screenshot(screenshot_bytes)
             return base64.b64encode(screenshot_bytes).decode('utf-8')
         except Exception as e:
             print(f"Error taking screenshot: {e}")
@@ -663,6 +1005,32 @@ class BrowserAutomation:
             # Return an empty string rather than failing
             return ""
     
+    def remember_screenshot(self, screenshot_bytes: bytes):
+        """Keep the screenshot for binary transfer and record its content and perceptual hashes"""
+        screenshot_id = hashlib.sha256(screenshot_bytes).hexdigest()
+        self.screenshots[screenshot_id] = screenshot_bytes
+        self.screenshots.move_to_end(screenshot_id)
+        while len(self.screenshots) > SCREENSHOT_CACHE_SIZE:
+            self.screenshots.popitem(last=False)
+        self.last_screenshot_id = screenshot_id
+        try:
+            self.last_screenshot_phash = perceptual_hash(screenshot_bytes)
+        except Exception as e:
+            print(f"Error hashing screenshot: {e}")
+            self.last_screenshot_phash = None
+    
+    async def get_screenshot(self, screenshot_id: str):
+        """Return the bytes of a recent screenshot"""
+        screenshot_bytes = self.screenshots.get(screenshot_id)
+        if screenshot_bytes is None:
+            raise HTTPException(status_code=404, detail="Screenshot not found")
+        media_type = 'image/webp' if SCREENSHOT_FORMAT == 'webp' else 'image/jpeg'
+        return Response(
+            content=screenshot_bytes,
+            media_type=media_type,
+            headers={"ETag": f'"{screenshot_id}"', "Cache-Control": "private, max-age=300, immutable"}
+        )
+    
     async def save_screenshot_to_file(self) -> str:
         """Take a screenshot and save to file, returning the path"""
         try:
@@ -678,35 +1046,66 @@ class BrowserAutomation:
             print(f"Error saving screenshot: {e}")
             return ""
     
-    async def extract_ocr_text_from_screenshot(self, screenshot_base64: str) -> str:
-        """Extract text from screenshot using OCR"""
-        if not screenshot_base64:
-            return ""
-            
+    def get_ocr_pool(self) -> ProcessPoolExecutor:
+        """Create the OCR process pool on first use"""
+        if self.ocr_pool is None:
+            # spawn: forking a process that runs Playwright threads is unsafe
+            self.ocr_pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.ocr_pool
+    
+    async def extract_ocr_text(self, screenshot_id: str) -> Optional[str]:
+        """Extract text from a recent screenshot using OCR in the process pool, cached by screenshot hash.
+        
+        Returns None if the screenshot is no longer available.
+        """
+        if screenshot_id in self.ocr_cache:
+            self.ocr_cache.move_to_end(screenshot_id)
+            return self.ocr_cache[screenshot_id]
+        
+        # Concurrent requests for the same screenshot share one OCR run
+        pending = self.ocr_pending.get(screenshot_id)
+        if pending is None:
+            screenshot_bytes = self.screenshots.get(screenshot_id)
+            if screenshot_bytes is None:
+                return None
+            loop = asyncio.get_running_loop()
+            pending = asyncio.ensure_future(
+                loop.run_in_executor(self.get_ocr_pool(), ocr_image_bytes, screenshot_bytes)
+            )
+            self.ocr_pending[screenshot_id] = pending
+        
         try:
-            # Decode base64 to image
-            image_bytes = base64.b64decode(screenshot_base64)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Extract text using pytesseract
-            ocr_text = pytesseract.image_to_string(image)
-            
-            # Clean up the text
-            ocr_text = ocr_text.strip()
-            
-            return ocr_text
+            ocr_text = await asyncio.shield(pending)
         except Exception as e:
             print(f"Error performing OCR: {e}")
             traceback.print_exc()
             return ""
+        finally:
+            self.ocr_pending.pop(screenshot_id, None)
+        
+        self.ocr_cache[screenshot_id] = ocr_text
+        while len(self.ocr_cache) > OCR_CACHE_SIZE:
+            self.ocr_cache.popitem(last=False)
+        return ocr_text
+    
+    async def get_ocr(self, screenshot_id: str):
+        """Return the OCR text of a recent screenshot"""
+        cached = screenshot_id in self.ocr_cache
+        ocr_text = await self.extract_ocr_text(screenshot_id)
+        if ocr_text is None:
+            raise HTTPException(status_code=404, detail="Screenshot not found")
+        return {"screenshot_id": screenshot_id, "ocr_text": ocr_text, "cached": cached}
     
     async def get_updated_browser_state(self, action_name: str) -> tuple:
         """Helper method to get updated browser state after any action
         Returns a tuple of (dom_state, screenshot, elements, metadata)
         """
         try:
-            # Wait a moment for any potential async processes to settle
-            await asyncio.sleep(0.5)
+            # Wait for the page to settle
+            await self.wait_until_ready(await self.get_current_page(), "state")
             
             # Get updated state
             dom_state = await self.get_current_dom_state()
@@ -760,11 +1159,9 @@ class BrowserAutomation:
                 metadata['viewport_width'] = 0
                 metadata['viewport_height'] = 0
             
-            # Extract OCR text from screenshot if available
-            ocr_text = ""
-            if screenshot:
-                ocr_text = await self.extract_ocr_text_from_screenshot(screenshot)
-                metadata['ocr_text'] = ocr_text
+            # OCR is only computed inline when the request asks for it
+            if screenshot and include_ocr.get() and self.last_screenshot_id:
+                metadata['ocr_text'] = await self.extract_ocr_text(self.last_screenshot_id) or ""
             
             print(f"Got updated state after {action_name}: {len(dom_state.selector_map)} elements")
             return dom_state, screenshot, elements, metadata
@@ -782,6 +1179,9 @@ class BrowserAutomation:
         if elements is None:
             elements = ""
             
+        # Screenshot ids refer to the last capture; an empty screenshot means it failed
+        binary_transfer = bool(screenshot) and screenshot_transfer.get() == "binary"
+            
         return BrowserActionResult(
             success=success,
             message=message,
@@ -789,7 +1189,10 @@ class BrowserAutomation:
             url=dom_state.url if dom_state else fallback_url or "",
             title=dom_state.title if dom_state else "",
             elements=elements,
-            screenshot_base64=screenshot,
+            screenshot_base64=None if binary_transfer else screenshot,
+            screenshot_id=self.last_screenshot_id if screenshot else None,
+            screenshot_phash=self.last_screenshot_phash if screenshot else None,
+            screenshot_format=SCREENSHOT_FORMAT if screenshot else None,
             pixels_above=dom_state.pixels_above if dom_state else 0,
             pixels_below=dom_state.pixels_below if dom_state else 0,
             content=content,
@@ -807,7 +1210,7 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
             await page.goto(action.url, wait_until="domcontentloaded")
-            await page.wait_for_load_state("networkidle", timeout=10000)
+            await self.wait_until_ready(page, "navigate")
             
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"navigate_to({action.url})")
@@ -858,8 +1261,8 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
             search_url = f"https://www.google.com/search?q={action.query}"
-            await page.goto(search_url)
-            await page.wait_for_load_state()
+            await page.goto(search_url, wait_until="domcontentloaded")
+            await self.wait_until_ready(page, "navigate")
             
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"search_google({action.query})")
@@ -906,8 +1309,8 @@ class BrowserAutomation:
         """Navigate back in browser history"""
         try:
             page = await self.get_current_page()
-            await page.go_back()
-            await page.wait_for_load_state()
+            await page.go_back(wait_until="domcontentloaded")
+            await self.wait_until_ready(page, "navigate")
             
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state("go_back")
@@ -975,9 +1378,8 @@ class BrowserAutomation:
             await page.mouse.click(action.x, action.y)
             
             # Give time for any navigation or DOM updates to occur
-            await page.wait_for_load_state("networkidle", timeout=5000)
+            await self.wait_until_ready(page, "click")
             
-            await asyncio.sleep(1)
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"click_coordinates({action.x}, {action.y})")
             
@@ -1046,31 +1448,9 @@ class BrowserAutomation:
             element_to_click = selector_map[action.index]
             print(f"Attempting to click element: {element_to_click}")
 
-            # Construct a more reliable selector using JavaScript evaluation
-            # Find the element based on its properties captured in selector_map
-            js_selector_script = """
-            (targetElementInfo) => {
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-                
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0' && rect.width > 0 && rect.height > 0;
-                });
-
-                if (targetElementInfo.index > 0 && targetElementInfo.index <= visibleElements.length) {
-                    // Return the element at the specified index (1-based)
-                    return visibleElements[targetElementInfo.index - 1];
-                }
-                return null; // Element not found at the expected index
-            }
-            """
-            
-            element_info = {'index': action.index} # Pass the target index to the script
-            
-            target_element_handle = await page.evaluate_handle(js_selector_script, element_info)
+            # Resolve the element the index refers to in the snapshot, instead of
+            # recomputing the element list, which can differ from the snapshot
+            target_element_handle = await page.evaluate_handle(ELEMENT_BY_ID_JS, element_to_click.element_id)
 
             click_success = False
             error_message = ""
@@ -1088,16 +1468,12 @@ class BrowserAutomation:
                     # Optional: Add fallback methods here if needed
                     # e.g., target_element_handle.dispatch_event('click')
             else:
-                 error_message = f"Could not locate the target element handle for index {action.index} using JS script."
+                 error_message = f"Element with index {action.index} is no longer on the page"
                  print(error_message)
 
 
             # Wait for potential page changes/network activity
-            try:
-                await page.wait_for_load_state("networkidle", timeout=5000)
-            except Exception as wait_error:
-                print(f"Timeout or error waiting for network idle after click: {wait_error}")
-            await asyncio.sleep(1)
+            await self.wait_until_ready(page, "click")
 
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"click_element({action.index})")
@@ -1182,7 +1558,7 @@ class BrowserAutomation:
                 # Fallback to xpath
                 await page.fill(f"//{element.tag_name}[{action.index}]", action.text)
             
-            await asyncio.sleep(1)
+            await self.wait_until_ready(page, "input")
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"input_text({action.index}, '{action.text}')")
             
@@ -1214,7 +1590,7 @@ class BrowserAutomation:
             page = await self.get_current_page()
             await page.keyboard.press(action.keys)
             
-            await asyncio.sleep(1)
+            await self.wait_until_ready(page, "keys")
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"send_keys({action.keys})")
             
@@ -1295,7 +1671,7 @@ class BrowserAutomation:
             
             # Navigate to the URL
             await new_page.goto(action.url, wait_until="domcontentloaded")
-            await new_page.wait_for_load_state("networkidle", timeout=10000)
+            await self.wait_until_ready(new_page, "tab")
             print(f"Navigated to URL in new tab: {action.url}")
             
             # Add to page list and make it current
@@ -1481,7 +1857,7 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, window.innerHeight);")
                 amount_str = "one page"
             
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
+            await self.wait_until_ready(page, "scroll")  # Wait for scroll to complete
             
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"scroll_down({amount_str})")
@@ -1519,7 +1895,7 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, -window.innerHeight);")
                 amount_str = "one page"
             
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
+            await self.wait_until_ready(page, "scroll")  # Wait for scroll to complete
             
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"scroll_up({amount_str})")
@@ -1844,6 +2220,17 @@ automation_service = BrowserAutomation()
 # Create API app
 api_app = FastAPI()
 
+@api_app.middleware("http")
+async def screenshot_transfer_middleware(request: Request, call_next):
+    """Select how screenshots and OCR text are returned for this request"""
+    transfer_token = screenshot_transfer.set(request.headers.get(SCREENSHOT_TRANSFER_HEADER, "base64").lower())
+    ocr_token = include_ocr.set(request.headers.get(OCR_HEADER, "").lower() in ("1", "true", "yes"))
+    try:
+        return await call_next(request)
+    finally:
+        screenshot_transfer.reset(transfer_token)
+        include_ocr.reset(ocr_token)
+
 @api_app.get("/api")
 async def health_check():
     return {"status": "ok", "message": "API server is running"}
@@ -1854,6 +2241,9 @@ api_app.include_router(automation_service.router, prefix="/api")
 async def test_browser_api():
     """Test the browser automation API functionality"""
     try:
+        # The tests print OCR text, so compute it inline
+        include_ocr.set(True)
+        
         # Initialize browser automation
         print("\n=== Starting Browser Automation Test ===")
         await automation_service.startup()
@@ -1987,6 +2377,9 @@ async def test_browser_api():
 async def test_browser_api_2():
     """Test the browser automation API functionality on the chess page"""
     try:
+        # The tests print OCR text, so compute it inline
+        include_ocr.set(True)
+        
         # Initialize browser automation
         print("\n=== Starting Browser Automation Test 2 (Chess Page) ===")
         await automation_service.startup()
@@ -0,0 +1,145 @@
+"""
+In-sandbox file edit primitives.
+
+Edits are applied by a small Python helper that runs inside the sandbox, so a
+str_replace only sends the old/new fragments instead of downloading and
+re-uploading the whole file. Existence and uniqueness checks, line-number
+reporting, parent directory creation, permissions and the atomic write
+(temp file + rename) all happen in the same exec.
+
+The request travels inline in the exec command, so edits for which
+fits_inline() is false should use the regular upload API instead.
+"""
+
+import asyncio
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from daytona_sdk import Sandbox
+
+# Limit for the edit command after the SDK base64-encodes it into a single
+# shell argument, which Linux caps at 128 KB (MAX_ARG_STRLEN). The headroom
+# covers the SDK's own wrapper around the encoded command.
+MAX_COMMAND_BYTES = 128 * 1024 - 4096
+
+_EDIT_SCRIPT = '''python3 - <<'SUNA_EDIT_EOF'
+import base64, json, os, tempfile
+
+req = json.loads(base64.b64decode("{payload}").decode("utf-8"))
+path = req["path"]
+
+def atomic_write(data, mode):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, mode=0o755, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".suna-edit-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def run():
+    exists = os.path.isfile(path)
+    if req["op"] == "write":
+        if req.get("must_exist") and not exists:
+            return {{"status": "not_found"}}
+        if req.get("must_not_exist") and os.path.exists(path):
+            return {{"status": "exists"}}
+        atomic_write(req["content"].encode("utf-8"), int(req["mode"], 8))
+        return {{"status": "ok"}}
+
+    if req["op"] == "replace":
+        if not exists:
+            return {{"status": "not_found"}}
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            content = f.read()
+        old, new = req["old"], req["new"]
+        occurrences = content.count(old)
+        if occurrences == 0:
+            return {{"status": "no_match"}}
+        if occurrences > 1:
+            lines = [i + 1 for i, line in enumerate(content.split("\\n")) if old in line]
+            return {{"status": "multiple", "lines": lines}}
+        atomic_write(content.replace(old, new).encode("utf-8"), os.stat(path).st_mode & 0o7777)
+        return {{"status": "ok", "line": content.split(old)[0].count("\\n") + 1}}
+
+    return {{"status": "error", "error": "Unknown operation: " + req["op"]}}
+
+try:
+    result = run()
+except UnicodeDecodeError:
+    result = {{"status": "error", "error": "File is not valid UTF-8 text"}}
+except Exception as e:
+    result = {{"status": "error", "error": str(e)}}
+print(json.dumps(result))
+SUNA_EDIT_EOF'''
+
+
+def _build_command(request: Dict[str, Any]) -> str:
+    payload = base64.b64encode(json.dumps(request, ensure_ascii=False).encode("utf-8")).decode()
+    return _EDIT_SCRIPT.format(payload=payload)
+
+
+def _encoded_size(command: str) -> int:
+    """Size of the command once base64-encoded by the SDK."""
+    return (len(command.encode("utf-8")) + 2) // 3 * 4
+
+
+def fits_inline(path: str, *fragments: str) -> bool:
+    """Check whether an edit of path carrying the given text fragments can be sent inline."""
+    request = {"op": "replace", "path": path, "mode": "0644", "must_exist": False, "must_not_exist": False, "fragments": list(fragments)}
+    return _encoded_size(_build_command(request)) <= MAX_COMMAND_BYTES
+
+
+async def _run_edit(sandbox: Sandbox, request: Dict[str, Any]) -> Dict[str, Any]:
+    command = _build_command(request)
+    if _encoded_size(command) > MAX_COMMAND_BYTES:
+        raise ValueError("Edit is too large to send inline; upload the file instead")
+    response = await asyncio.to_thread(sandbox.process.exec, command, timeout=60)
+    try:
+        result = json.loads(response.result.strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        raise RuntimeError(f"File edit helper failed: {response.result}")
+    if result.get("status") == "error":
+        raise RuntimeError(result.get("error", "Unknown error"))
+    return result
+
+
+async def replace_in_file(sandbox: Sandbox, path: str, old_str: str, new_str: str) -> Dict[str, Any]:
+    """
+    Replace a unique occurrence of old_str in a sandbox file, in place.
+
+    Returns:
+        dict with "status": "ok" (and the 1-based "line" of the replacement),
+        "not_found", "no_match" or "multiple" (with the matching "lines")
+    """
+    return await _run_edit(sandbox, {"op": "replace", "path": path, "old": old_str, "new": new_str})
+
+
+async def write_file(
+    sandbox: Sandbox,
+    path: str,
+    content: str,
+    mode: str = "644",
+    must_exist: bool = False,
+    must_not_exist: bool = False,
+) -> Dict[str, Any]:
+    """
+    Atomically write a sandbox file with the given permissions, creating parent directories.
+
+    Returns:
+        dict with "status": "ok", "not_found" (must_exist) or "exists" (must_not_exist)
+    """
+    return await _run_edit(sandbox, {
+        "op": "write",
+        "path": path,
+        "content": content,
+        "mode": str(mode),
+        "must_exist": must_exist,
+        "must_not_exist": must_not_exist,
+    })
@@ -0,0 +1,215 @@
+"""
+Warm sandbox pool.
+
+Creating a sandbox (image pull, container start, supervisord session) is the
+largest part of the time-to-first-token for a new chat. The pool keeps a number
+of pre-created sandboxes per image that are not yet bound to a project, hands
+one out when a project is created and refills itself in the background.
+
+Pool state lives in Redis so every API instance shares the same pool:
+    sandbox_pool:{image}:ids      list of warm sandbox IDs (LPOP = atomic claim)
+    sandbox_pool:{image}:hits     number of claims served from the pool
+    sandbox_pool:{image}:misses   number of claims that fell back to create_sandbox
+    sandbox_pool:{image}:refill   lock so only one instance refills at a time
+"""
+
+import asyncio
+import shlex
+import uuid
+from typing import Any, Dict, Optional
+
+from daytona_sdk import Sandbox, SandboxState
+
+from sandbox.sandbox import daytona, create_sandbox, VNC_PASSWORD_FILE
+from services import redis
+from utils.config import config, Configuration
+from utils.logger import logger
+
+# Label marking a sandbox as an unclaimed pool member
+POOL_LABEL = "suna_pool"
+
+# Auto-stop applied once a sandbox is claimed. Warm sandboxes never auto-stop,
+# otherwise an idle pool would hand out stopped sandboxes.
+CLAIMED_AUTO_STOP_INTERVAL = 15
+
+REFILL_LOCK_TTL = 600
+
+
+class SandboxPool:
+    """Pool of pre-created sandboxes for a single image."""
+
+    def __init__(self, image: str, size: int, refill_interval: int = 60):
+        self.image = image
+        self.size = size
+        self.refill_interval = refill_interval
+        self._key_prefix = f"sandbox_pool:{image}"
+        self._refill_task: Optional[asyncio.Task] = None
+        self._refill_loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    @property
+    def _ids_key(self) -> str:
+        return f"{self._key_prefix}:ids"
+
+    def _create_warm_sandbox(self) -> Sandbox:
+        """Create an unclaimed sandbox with a placeholder VNC password."""
+        return create_sandbox(
+            str(uuid.uuid4()),
+            image=self.image,
+            labels={POOL_LABEL: "warm"},
+            auto_stop_interval=0,
+        )
+
+    def _prepare_claimed_sandbox(self, sandbox: Sandbox, password: str, project_id: Optional[str]):
+        """Bind a warm sandbox to a project: labels, VNC password and auto-stop."""
+        sandbox.set_labels({'id': project_id} if project_id else {})
+
+        # Rewrite the VNC password and restart x11vnc (supervisord autorestarts it).
+        # The password is also persisted so a later supervisord restart keeps it.
+        # pkill matches the process name exactly: a command-line pattern would
+        # also match, and kill, the shell running this command.
+        quoted = shlex.quote(password)
+        response = sandbox.process.exec(
+            f"/bin/sh -c \"mkdir -p /root/.vnc && echo {quoted} > {VNC_PASSWORD_FILE} && chmod 600 {VNC_PASSWORD_FILE} "
+            f"&& echo {quoted} | vncpasswd -f > /root/.vnc/passwd && chmod 600 /root/.vnc/passwd "
+            f"&& (pkill -x x11vnc || true)\"",
+            timeout=30,
+        )
+        if response.exit_code != 0:
+            raise RuntimeError(f"Failed to set VNC password: {response.result}")
+
+        sandbox.set_autostop_interval(CLAIMED_AUTO_STOP_INTERVAL)
+
+    def _discard(self, sandbox_id: str):
+        try:
+            daytona.remove(daytona.get(sandbox_id))
+        except Exception as e:
+            logger.warning(f"Failed to remove discarded pool sandbox {sandbox_id}: {str(e)}")
+
+    async def claim(self, password: str, project_id: Optional[str] = None) -> Optional[Sandbox]:
+        """
+        Claim a warm sandbox for a project.
+
+        Returns:
+            The claimed sandbox, or None if the pool is disabled or empty.
+        """
+        if not self.enabled:
+            return None
+
+        redis_client = await redis.get_client()
+        try:
+            while True:
+                sandbox_id = await redis_client.lpop(self._ids_key)
+                if not sandbox_id:
+                    break
+
+                try:
+                    sandbox = await asyncio.to_thread(daytona.get, sandbox_id)
+                    if sandbox.state != SandboxState.STARTED:
+                        logger.warning(f"Pool sandbox {sandbox_id} is in {sandbox.state} state, discarding")
+                        await asyncio.to_thread(self._discard, sandbox_id)
+                        continue
+
+                    await asyncio.to_thread(self._prepare_claimed_sandbox, sandbox, password, project_id)
+                except Exception as e:
+                    logger.error(f"Failed to claim pool sandbox {sandbox_id}: {str(e)}")
+                    await asyncio.to_thread(self._discard, sandbox_id)
+                    continue
+
+                await redis_client.incr(f"{self._key_prefix}:hits")
+                logger.info(f"Claimed warm sandbox {sandbox_id} for project {project_id}")
+                return sandbox
+
+            await redis_client.incr(f"{self._key_prefix}:misses")
+            logger.info(f"Sandbox pool for {self.image} is empty")
+            return None
+        finally:
+            self.schedule_refill()
+
+    async def refill(self):
+        """Top the pool up to its target size."""
+        if not self.enabled:
+            return
+
+        redis_client = await redis.get_client()
+        lock_key = f"{self._key_prefix}:refill"
+        if not await redis_client.set(lock_key, "1", ex=REFILL_LOCK_TTL, nx=True):
+            return
+
+        try:
+            while await redis_client.llen(self._ids_key) < self.size:
+                try:
+                    sandbox = await asyncio.to_thread(self._create_warm_sandbox)
+                except Exception as e:
+                    logger.error(f"Failed to create warm sandbox for {self.image}: {str(e)}")
+                    break
+                await redis_client.rpush(self._ids_key, sandbox.id)
+                logger.debug(f"Added warm sandbox {sandbox.id} to pool for {self.image}")
+        finally:
+            await redis_client.delete(lock_key)
+
+    def schedule_refill(self):
+        """Refill in the background unless a refill is already running in this process."""
+        if not self.enabled or (self._refill_task and not self._refill_task.done()):
+            return
+        self._refill_task = asyncio.create_task(self.refill())
+
+    async def _refill_loop(self):
+        while True:
+            try:
+                await self.refill()
+            except Exception as e:
+                logger.error(f"Error refilling sandbox pool for {self.image}: {str(e)}")
+            await asyncio.sleep(self.refill_interval)
+
+    def start(self):
+        """Start the periodic background refill."""
+        if not self.enabled or self._refill_loop_task:
+            return
+        logger.info(f"Starting warm sandbox pool for {self.image} with size {self.size}")
+        self._refill_loop_task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Stop background refills. Warm sandboxes are kept for the next start."""
+        for task in (self._refill_loop_task, self._refill_task):
+            if task and not task.done():
+                task.cancel()
+        self._refill_loop_task = None
+        self._refill_task = None
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Return pool size and hit/miss counters."""
+        redis_client = await redis.get_client()
+        hits = int(await redis_client.get(f"{self._key_prefix}:hits") or 0)
+        misses = int(await redis_client.get(f"{self._key_prefix}:misses") or 0)
+        total = hits + misses
+        return {
+            "image": self.image,
+            "enabled": self.enabled,
+            "target_size": self.size,
+            "available": await redis_client.llen(self._ids_key),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+sandbox_pool = SandboxPool(
+    Configuration.SANDBOX_IMAGE_NAME,
+    config.SANDBOX_POOL_SIZE,
+    config.SANDBOX_POOL_REFILL_INTERVAL,
+)
+
+
+async def acquire_sandbox(password: str, project_id: Optional[str] = None) -> Sandbox:
+    """Get a sandbox for a new project, from the warm pool if possible."""
+    try:
+        sandbox = await sandbox_pool.claim(password, project_id)
+        if sandbox:
+            return sandbox
+    except Exception as e:
+        logger.error(f"Error claiming sandbox from pool, creating a new one: {str(e)}")
+    return await asyncio.to_thread(create_sandbox, password, project_id)
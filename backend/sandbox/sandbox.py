@@ -1,3 +1,4 @@
+from typing import Dict, Optional
 from daytona_sdk import Daytona, DaytonaConfig, CreateSandboxFromImageParams, Sandbox, SessionExecuteRequest, Resources, SandboxState
 from dotenv import load_dotenv
 from utils.logger import logger
@@ -62,6 +63,8 @@ async def get_or_start_sandbox(sandbox_id: str):
         logger.error(f"Error retrieving or starting sandbox: {str(e)}")
         raise e
 
+VNC_PASSWORD_FILE = "/root/.vnc/suna_password"
+
 def start_supervisord_session(sandbox: Sandbox):
     """Start supervisord in a session."""
     session_id = "supervisord-session"
@@ -69,9 +72,10 @@ def start_supervisord_session(sandbox: Sandbox):
         logger.info(f"Creating session {session_id} for supervisord")
         sandbox.process.create_session(session_id)
         
-        # Execute supervisord command
+        # Execute supervisord command. Sandboxes claimed from the warm pool get their
+        # VNC password after creation, so prefer the persisted one over the env var.
         sandbox.process.execute_session_command(session_id, SessionExecuteRequest(
-            command="exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf",
+            command=f"if [ -f {VNC_PASSWORD_FILE} ]; then export VNC_PASSWORD=\"$(cat {VNC_PASSWORD_FILE})\"; fi; exec /usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf",
             var_async=True
         ))
         logger.info(f"Supervisord started in session {session_id}")
@@ -79,19 +83,24 @@ def start_supervisord_session(sandbox: Sandbox):
         logger.error(f"Error starting supervisord session: {str(e)}")
         raise e
 
-def create_sandbox(password: str, project_id: str = None):
+def create_sandbox(
+    password: str,
+    project_id: str = None,
+    image: Optional[str] = None,
+    labels: Optional[Dict[str, str]] = None,
+    auto_stop_interval: int = 15,
+):
     """Create a new sandbox with all required services configured and running."""
     
     logger.debug("Creating new Daytona sandbox environment")
     logger.debug("Configuring sandbox with browser-use image and environment variables")
     
-    labels = None
     if project_id:
         logger.debug(f"Using sandbox_id as label: {project_id}")
-        labels = {'id': project_id}
+        labels = {**(labels or {}), 'id': project_id}
         
     params = CreateSandboxFromImageParams(
-        image=Configuration.SANDBOX_IMAGE_NAME,
+        image=image or Configuration.SANDBOX_IMAGE_NAME,
         public=True,
         labels=labels,
         env_vars={
@@ -112,7 +121,7 @@ def create_sandbox(password: str, project_id: str = None):
             memory=4,
             disk=5,
         ),
-        auto_stop_interval=15,
+        auto_stop_interval=auto_stop_interval,
         auto_archive_interval=24 * 60,
     )
     
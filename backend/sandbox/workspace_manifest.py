@@ -0,0 +1,213 @@
+"""
+Content-hash manifests of a sandbox workspace.
+
+A manifest records path, size, mtime and SHA-256 for every workspace file. It is
+computed inside the sandbox in a single exec, so building one costs one round
+trip regardless of how many files the workspace holds. Manifests are kept in
+Redis by version for a while, which lets callers ask for the changes since a
+version they saw earlier and download only the files that actually changed.
+Downloaded contents are kept in a size-bounded LRU cache keyed by content hash.
+"""
+
+import asyncio
+import hashlib
+import json
+import shlex
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+from daytona_sdk import Sandbox
+
+from services import redis
+from utils.files_utils import EXCLUDED_DIRS, should_exclude_file
+from utils.logger import logger
+
+# How long previous manifest versions are kept for diffing
+MANIFEST_TTL = 3600
+
+# Maximum concurrent file downloads when fetching changed files
+FETCH_CONCURRENCY = 8
+
+# Maximum total size of the file contents a ContentCache holds (characters)
+CONTENT_CACHE_MAX_SIZE = 32 * 1024 * 1024
+
+# Walks the workspace inside the sandbox and prints a JSON list of
+# [relative path, size, mtime, sha256] for every regular file.
+_MANIFEST_SCRIPT = '''python3 - {root} <<'SUNA_MANIFEST_EOF'
+import hashlib, json, os, sys
+root = sys.argv[1]
+excluded_dirs = set({excluded_dirs})
+entries = []
+for dirpath, dirnames, filenames in os.walk(root):
+    dirnames[:] = [d for d in dirnames if d not in excluded_dirs]
+    for name in filenames:
+        full_path = os.path.join(dirpath, name)
+        try:
+            st = os.lstat(full_path)
+            if not os.path.isfile(full_path) or os.path.islink(full_path):
+                continue
+            digest = hashlib.sha256()
+            with open(full_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except OSError:
+            continue
+        entries.append([os.path.relpath(full_path, root), st.st_size, st.st_mtime, digest.hexdigest()])
+print(json.dumps(entries))
+SUNA_MANIFEST_EOF'''
+
+
+@dataclass
+class ManifestEntry:
+    """A single file in a workspace manifest."""
+    path: str
+    size: int
+    mtime: float
+    hash: str
+
+
+@dataclass
+class WorkspaceManifest:
+    """Snapshot of file metadata and content hashes for a workspace."""
+    root: str
+    entries: Dict[str, ManifestEntry] = field(default_factory=dict)
+
+    @property
+    def version(self) -> str:
+        """Deterministic version derived from the paths and content hashes."""
+        digest = hashlib.sha256()
+        for path in sorted(self.entries):
+            digest.update(f"{path}\0{self.entries[path].hash}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def to_json(self) -> str:
+        return json.dumps({"root": self.root, "entries": [asdict(entry) for entry in self.entries.values()]})
+
+    @classmethod
+    def from_json(cls, data: str) -> "WorkspaceManifest":
+        parsed = json.loads(data)
+        entries = {entry["path"]: ManifestEntry(**entry) for entry in parsed["entries"]}
+        return cls(root=parsed["root"], entries=entries)
+
+
+@dataclass
+class ManifestDiff:
+    """Changes between two manifests."""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[str]:
+        """Paths whose content has to be fetched."""
+        return self.added + self.modified
+
+    def is_empty(self) -> bool:
+        return not (self.added or self.modified or self.deleted)
+
+
+def diff_manifests(old: Optional[WorkspaceManifest], new: WorkspaceManifest) -> ManifestDiff:
+    """Compare two manifests by content hash. A missing old manifest means every file is new."""
+    old_entries = old.entries if old else {}
+    diff = ManifestDiff()
+    for path, entry in new.entries.items():
+        previous = old_entries.get(path)
+        if previous is None:
+            diff.added.append(path)
+        elif previous.hash != entry.hash:
+            diff.modified.append(path)
+    diff.deleted = [path for path in old_entries if path not in new.entries]
+    for paths in (diff.added, diff.modified, diff.deleted):
+        paths.sort()
+    return diff
+
+
+def _manifest_key(sandbox_id: str, version: str) -> str:
+    return f"workspace_manifest:{sandbox_id}:{version}"
+
+
+async def build_manifest(sandbox: Sandbox, root: str = "/workspace") -> WorkspaceManifest:
+    """Compute the manifest of a workspace inside the sandbox and remember it by version."""
+    script = _MANIFEST_SCRIPT.format(root=shlex.quote(root), excluded_dirs=sorted(EXCLUDED_DIRS))
+    response = await asyncio.to_thread(sandbox.process.exec, script, timeout=120)
+    if response.exit_code != 0:
+        raise RuntimeError(f"Failed to build workspace manifest: {response.result}")
+
+    manifest = WorkspaceManifest(root=root)
+    for path, size, mtime, digest in json.loads(response.result):
+        if should_exclude_file(path):
+            continue
+        manifest.entries[path] = ManifestEntry(path=path, size=size, mtime=mtime, hash=digest)
+
+    try:
+        await redis.set(_manifest_key(sandbox.id, manifest.version), manifest.to_json(), ex=MANIFEST_TTL)
+    except Exception as e:
+        logger.warning(f"Failed to store workspace manifest for sandbox {sandbox.id}: {str(e)}")
+    return manifest
+
+
+async def get_manifest(sandbox_id: str, version: str) -> Optional[WorkspaceManifest]:
+    """Load a previously built manifest version, if it is still stored."""
+    try:
+        data = await redis.get(_manifest_key(sandbox_id, version))
+    except Exception as e:
+        logger.warning(f"Failed to load workspace manifest {version} for sandbox {sandbox_id}: {str(e)}")
+        return None
+    return WorkspaceManifest.from_json(data) if data else None
+
+
+async def fetch_files(sandbox: Sandbox, root: str, paths: List[str]) -> Dict[str, bytes]:
+    """Download the given workspace-relative paths concurrently. Failed downloads are skipped."""
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    contents: Dict[str, bytes] = {}
+
+    async def fetch(path: str):
+        async with semaphore:
+            try:
+                contents[path] = await asyncio.to_thread(sandbox.fs.download_file, f"{root}/{path}")
+            except Exception as e:
+                logger.warning(f"Error reading file {path}: {str(e)}")
+
+    await asyncio.gather(*(fetch(path) for path in paths))
+    return contents
+
+
+class ContentCache:
+    """LRU cache of decoded file contents by content hash, bounded by total size.
+
+    None is cached for binary files, so they are not downloaded again.
+    """
+
+    def __init__(self, max_size: int = CONTENT_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: "OrderedDict[str, Optional[str]]" = OrderedDict()
+
+    @staticmethod
+    def _entry_size(digest: str, content: Optional[str]) -> int:
+        return len(digest) + len(content or "")
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> Optional[str]:
+        if digest not in self._entries:
+            return None
+        self._entries.move_to_end(digest)
+        return self._entries[digest]
+
+    def put(self, digest: str, content: Optional[str]):
+        if digest in self._entries:
+            self.size -= self._entry_size(digest, self._entries.pop(digest))
+        entry_size = self._entry_size(digest, content)
+        if entry_size > self.max_size:
+            return
+        self._entries[digest] = content
+        self.size += entry_size
+        while self.size > self.max_size:
+            evicted_digest, evicted = self._entries.popitem(last=False)
+            self.size -= self._entry_size(evicted_digest, evicted)
@@ -1,17 +1,226 @@
 import os
+import re
+import json
+import shutil
+import asyncio
 import openai
 import tempfile
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from utils.logger import logger
 from utils.auth_utils import get_current_user_id_from_jwt
 
 router = APIRouter(tags=["transcription"])
 
+TRANSCRIPTION_MODEL = "gpt-4o-mini-transcribe"
+
+# OpenAI supports these formats
+ALLOWED_TYPES = [
+    'audio/mp3', 'audio/mpeg', 'audio/mp4', 'audio/m4a',
+    'audio/wav', 'audio/webm', 'audio/mpga'
+]
+
+# Single-request limit of the transcription API
+MAX_FILE_SIZE = 25 * 1024 * 1024
+# Streaming mode transcribes segments separately, so it accepts longer recordings
+MAX_STREAMING_FILE_SIZE = 200 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Streaming mode splits audio into segments of this length, overlapping by a
+# few seconds so words cut at a boundary appear whole in one of the segments
+SEGMENT_SECONDS = 60
+SEGMENT_OVERLAP_SECONDS = 2
+# Maximum number of segments transcribed at the same time per request
+TRANSCRIPTION_CONCURRENCY = 4
+# Number of words searched for the overlap when stitching segments
+MAX_OVERLAP_WORDS = 20
+
 class TranscriptionResponse(BaseModel):
     text: str
 
+
+def _validate_content_type(audio_file: UploadFile):
+    logger.info(f"Received audio file: {audio_file.filename}, content_type: {audio_file.content_type}")
+
+    if audio_file.content_type not in ALLOWED_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {audio_file.content_type}. Supported types: {', '.join(ALLOWED_TYPES)}"
+        )
+
+
+async def _save_upload(audio_file: UploadFile, directory: str, max_size: int) -> str:
+    """Write the upload to disk chunk by chunk, so the recording is never held in memory."""
+    # Create a file with the correct extension
+    file_extension = audio_file.filename.split('.')[-1] if audio_file.filename and '.' in audio_file.filename else 'webm'
+    path = os.path.join(directory, f"upload.{file_extension}")
+
+    size = 0
+    with open(path, 'wb') as f:
+        while chunk := await audio_file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=400, detail=f"File size exceeds {max_size // (1024 * 1024)}MB limit")
+            f.write(chunk)
+    return path
+
+
+def _get_client() -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+async def _transcribe_file(client: openai.AsyncOpenAI, path: str) -> str:
+    with open(path, 'rb') as f:
+        return await client.audio.transcriptions.create(
+            model=TRANSCRIPTION_MODEL,
+            file=f,
+            response_format="text"
+        )
+
+
+async def _run(*command: str) -> Tuple[int, bytes]:
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        logger.warning(f"{command[0]} failed: {stderr.decode(errors='replace')[-500:]}")
+    return process.returncode, stdout
+
+
+def _parse_duration(output: str) -> Optional[float]:
+    """First valid duration in ffprobe output, one value per line ("N/A" when unknown)."""
+    for line in output.splitlines():
+        try:
+            duration = float(line.strip())
+        except ValueError:
+            continue
+        if duration > 0:
+            return duration
+    return None
+
+
+def _parse_progress_duration(output: str) -> Optional[float]:
+    """Position reached by an ffmpeg decode, from its -progress output."""
+    matches = re.findall(r"^out_time=(\d+):(\d+):(\d+(?:\.\d+)?)$", output, re.MULTILINE)
+    if not matches:
+        return None
+    hours, minutes, seconds = matches[-1]
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return duration if duration > 0 else None
+
+
+async def _probe_duration(path: str) -> Optional[float]:
+    """Duration of an audio file in seconds, or None if it cannot be determined."""
+    if not shutil.which("ffprobe"):
+        return None
+    returncode, stdout = await _run(
+        "ffprobe", "-v", "error", "-show_entries", "format=duration:stream=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", path
+    )
+    duration = _parse_duration(stdout.decode(errors="replace")) if returncode == 0 else None
+    if duration or not shutil.which("ffmpeg"):
+        return duration
+
+    # Recordings from MediaRecorder (WebM) have no duration in the container,
+    # so decode the audio (without encoding anything) to measure it
+    returncode, stdout = await _run(
+        "ffmpeg", "-nostdin", "-v", "error", "-i", path, "-vn", "-f", "null", "-progress", "pipe:1", "-"
+    )
+    return _parse_progress_duration(stdout.decode(errors="replace")) if returncode == 0 else None
+
+
+def _plan_segments(duration: float) -> List[Tuple[float, float]]:
+    """(start, length) of each overlapping segment covering the recording."""
+    segments = []
+    start = 0.0
+    while start < duration:
+        segments.append((start, min(SEGMENT_SECONDS + SEGMENT_OVERLAP_SECONDS, duration - start)))
+        start += SEGMENT_SECONDS
+    return segments
+
+
+async def _extract_segment(path: str, start: float, length: float, output_path: str):
+    returncode, _ = await _run(
+        "ffmpeg", "-nostdin", "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{length:.3f}",
+        "-i", path, "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "64k", output_path
+    )
+    if returncode != 0:
+        raise RuntimeError(f"Failed to extract audio segment at {start:.0f}s")
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch_transcripts(previous: str, following: str) -> str:
+    """Join two transcripts of overlapping segments, dropping the words they share."""
+    previous_words = previous.split()
+    following_words = following.split()
+    max_overlap = min(MAX_OVERLAP_WORDS, len(previous_words), len(following_words))
+    for size in range(max_overlap, 0, -1):
+        tail = [_normalize_word(w) for w in previous_words[-size:]]
+        head = [_normalize_word(w) for w in following_words[:size]]
+        if tail == head:
+            following_words = following_words[size:]
+            break
+    return " ".join(previous_words + following_words)
+
+
+async def _transcribe_segments(path: str, directory: str, user_id: str) -> AsyncIterator[dict]:
+    """Transcribe a recording segment by segment, yielding events as segments finish."""
+    client = _get_client()
+    duration = await _probe_duration(path)
+
+    if not duration or duration <= SEGMENT_SECONDS + SEGMENT_OVERLAP_SECONDS or not shutil.which("ffmpeg"):
+        # Short recording, or audio tools unavailable: transcribe in one request
+        if os.path.getsize(path) > MAX_FILE_SIZE:
+            raise HTTPException(status_code=400, detail=f"File size exceeds {MAX_FILE_SIZE // (1024 * 1024)}MB limit")
+        text = await _transcribe_file(client, path)
+        yield {"type": "segment", "index": 0, "start": 0, "text": text}
+        yield {"type": "partial", "text": text, "segments_done": 1, "segments_total": 1}
+        yield {"type": "done", "text": text}
+        return
+
+    segments = _plan_segments(duration)
+    semaphore = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+    logger.info(f"Transcribing {duration:.0f}s of audio in {len(segments)} segments for user {user_id}")
+
+    async def transcribe_segment(index: int, start: float, length: float) -> Tuple[int, str]:
+        async with semaphore:
+            segment_path = os.path.join(directory, f"segment_{index}.mp3")
+            await _extract_segment(path, start, length, segment_path)
+            try:
+                return index, (await _transcribe_file(client, segment_path)).strip()
+            finally:
+                os.unlink(segment_path)
+
+    tasks = [asyncio.create_task(transcribe_segment(i, start, length)) for i, (start, length) in enumerate(segments)]
+    texts: List[Optional[str]] = [None] * len(segments)
+    stitched = ""
+    stitched_count = 0
+    try:
+        for completed in asyncio.as_completed(tasks):
+            index, text = await completed
+            texts[index] = text
+            yield {"type": "segment", "index": index, "start": segments[index][0], "text": text}
+
+            # Extend the transcript over the segments that are now contiguous from the start
+            previous_count = stitched_count
+            while stitched_count < len(texts) and texts[stitched_count] is not None:
+                stitched = stitch_transcripts(stitched, texts[stitched_count])
+                stitched_count += 1
+            if stitched_count > previous_count:
+                yield {"type": "partial", "text": stitched, "segments_done": stitched_count, "segments_total": len(segments)}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {"type": "done", "text": stitched}
+
+
 @router.post("/transcription", response_model=TranscriptionResponse)
 async def transcribe_audio(
     audio_file: UploadFile = File(...),
@@ -19,58 +228,62 @@ async def transcribe_audio(
 ):
     """Transcribe audio file to text using OpenAI Whisper."""
     try:
-        # Validate file type - OpenAI supports these formats
-        allowed_types = [
-            'audio/mp3', 'audio/mpeg', 'audio/mp4', 'audio/m4a', 
-            'audio/wav', 'audio/webm', 'audio/mpga'
-        ]
-        
-        logger.info(f"Received audio file: {audio_file.filename}, content_type: {audio_file.content_type}")
-        
-        if audio_file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {audio_file.content_type}. Supported types: {', '.join(allowed_types)}"
-            )
-        
-        # Check file size (25MB limit)
-        content = await audio_file.read()
-        if len(content) > 25 * 1024 * 1024:  # 25MB
-            raise HTTPException(status_code=400, detail="File size exceeds 25MB limit")
-        
-        # Reset file pointer
-        await audio_file.seek(0)
-        
-        # Initialize OpenAI client
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        # Create a temporary file with the correct extension
-        file_extension = audio_file.filename.split('.')[-1] if audio_file.filename and '.' in audio_file.filename else 'webm'
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_extension}') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        try:
+        _validate_content_type(audio_file)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_file_path = await _save_upload(audio_file, temp_dir, MAX_FILE_SIZE)
+
             # Transcribe audio using the temporary file
             # OpenAI Whisper API has built-in limits: 25MB file size and handles duration limits internally
-            with open(temp_file_path, 'rb') as f:
-                transcription = client.audio.transcriptions.create(
-                    model="gpt-4o-mini-transcribe",
-                    file=f,
-                    response_format="text"
-                )
-            
-            logger.info(f"Successfully transcribed audio for user {user_id}")
-            return TranscriptionResponse(text=transcription)
-            
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temporary file {temp_file_path}: {e}")
-        
+            transcription = await _transcribe_file(_get_client(), temp_file_path)
+
+        logger.info(f"Successfully transcribed audio for user {user_id}")
+        return TranscriptionResponse(text=transcription)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error transcribing audio for user {user_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+
+
+@router.post("/transcription/stream")
+async def transcribe_audio_stream(
+    audio_file: UploadFile = File(...),
+    user_id: str = Depends(get_current_user_id_from_jwt)
+):
+    """
+    Transcribe a long recording in overlapping segments, streaming results as server-sent events.
+
+    Events:
+    - {"type": "segment", "index", "start", "text"}: a segment finished (in completion order)
+    - {"type": "partial", "text", "segments_done", "segments_total"}: transcript of the
+      segments finished so far without gaps, stitched together
+    - {"type": "done", "text"}: the full transcript
+    - {"type": "error", "message"}: transcription failed
+    """
+    _validate_content_type(audio_file)
+
+    temp_dir = tempfile.mkdtemp(prefix="transcription-")
+    try:
+        path = await _save_upload(audio_file, temp_dir, MAX_STREAMING_FILE_SIZE)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    async def stream_generator():
+        try:
+            async for event in _transcribe_segments(path, temp_dir, user_id):
+                yield f"data: {json.dumps(event)}\n\n"
+            logger.info(f"Successfully transcribed audio for user {user_id}")
+        except Exception as e:
+            message = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Error transcribing audio for user {user_id}: {message}")
+            yield f"data: {json.dumps({'type': 'error', 'message': f'Transcription failed: {message}'})}\n\n"
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return StreamingResponse(stream_generator(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache, no-transform", "Connection": "keep-alive",
+        "X-Accel-Buffering": "no", "Content-Type": "text/event-stream",
+    })
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sandbox.command_runner import SandboxCommandRunner
+
+pytestmark = pytest.mark.skipif(shutil.which("tmux") is None, reason="tmux is not installed")
+
+
+class LocalProcess:
+    """Runs sandbox process calls as local shell commands."""
+
+    def create_session(self, session_id):
+        pass
+
+    def delete_session(self, session_id):
+        pass
+
+    def execute_session_command(self, session_id, req, timeout=None):
+        completed = subprocess.run(req.command, shell=True, capture_output=True, text=True, timeout=timeout)
+        return SimpleNamespace(output=completed.stdout, exit_code=completed.returncode, cmd_id=None)
+
+    def exec(self, script, timeout=None):
+        completed = subprocess.run(["sh", "-c", script], capture_output=True, text=True, timeout=timeout)
+        return SimpleNamespace(result=completed.stdout, exit_code=completed.returncode)
+
+
+@pytest.fixture
+def runner():
+    runner = SandboxCommandRunner(SimpleNamespace(process=LocalProcess()))
+    sessions = []
+    yield runner, sessions
+    for session in sessions:
+        asyncio.run(runner.kill_session(session))
+
+
+def test_multiple_commands_in_one_session_capture_output(runner):
+    runner, sessions = runner
+    session = f"test-{uuid4().hex[:8]}"
+    sessions.append(session)
+
+    async def run_commands():
+        results = []
+        for i in range(3):
+            await runner.start(session, f"echo hello{i}", "/tmp")
+            results.append(await runner.wait(session, timeout=10))
+        return results
+
+    results = asyncio.run(run_commands())
+
+    for i, result in enumerate(results):
+        assert result.completed
+        assert result.exit_code == 0
+        assert f"hello{i}" in result.output
+        # Each read only returns output of the latest command
+        for j in range(i):
+            assert f"hello{j}" not in result.output
+
+
+def test_read_output_after_wait_returns_only_new_output(runner):
+    runner, sessions = runner
+    session = f"test-{uuid4().hex[:8]}"
+    sessions.append(session)
+
+    async def run_commands():
+        await runner.start(session, "echo first", "/tmp")
+        await runner.wait(session, timeout=10)
+        await runner.start(session, "echo second", "/tmp")
+        await runner.wait(session, timeout=10)
+        return await runner.read_output(session, since=0)
+
+    result = asyncio.run(run_commands())
+    assert "first" in result.output
+    assert "second" in result.output
@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agent.tools import sb_files_tool
+from agent.tools.sb_files_tool import SandboxFilesTool
+from sandbox.file_edits import MAX_COMMAND_BYTES, fits_inline, replace_in_file, write_file
+
+
+class LocalProcess:
+    """Runs exec commands locally, wrapped the way the Daytona SDK sends them."""
+
+    def exec(self, command, timeout=None):
+        encoded = base64.b64encode(command.encode()).decode()
+        # The whole command travels as a single sh argument, like in the sandbox
+        completed = subprocess.run(
+            ["sh", "-c", f"echo '{encoded}' | base64 -d | sh"],
+            capture_output=True, text=True, timeout=timeout
+        )
+        return SimpleNamespace(result=completed.stdout + completed.stderr, exit_code=completed.returncode)
+
+
+class LocalFileSystem:
+    """Sandbox file API backed by the local file system."""
+
+    def get_file_info(self, path):
+        return os.stat(path)
+
+    def download_file(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def upload_file(self, content, path):
+        with open(path, "wb") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def sandbox():
+    return SimpleNamespace(process=LocalProcess(), fs=LocalFileSystem())
+
+
+def test_fits_inline_small_edit():
+    assert fits_inline("/workspace/a.txt", "hello", "world")
+
+
+def test_fits_inline_accounts_for_encoding_overhead():
+    # 48 KB of raw text, but ~64 KB once base64-encoded and ~85 KB after the
+    # SDK encodes the command again; twice that does not fit
+    text = "x" * (48 * 1024)
+    assert fits_inline("/workspace/a.txt", text)
+    assert not fits_inline("/workspace/a.txt", text, text)
+
+
+def test_fits_inline_multibyte_text_uses_encoded_size():
+    # 30K CJK characters are 90 KB in UTF-8
+    assert not fits_inline("/workspace/a.txt", "字" * 30000)
+
+
+def test_write_and_replace_in_file(sandbox, tmp_path):
+    path = str(tmp_path / "dir" / "a.txt")
+
+    assert asyncio.run(write_file(sandbox, path, "one\ntwo\nthree\n", mode="600"))["status"] == "ok"
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+
+    result = asyncio.run(replace_in_file(sandbox, path, "two", "zwei"))
+    assert result == {"status": "ok", "line": 2}
+    with open(path) as f:
+        assert f.read() == "one\nzwei\nthree\n"
+    # Permissions are kept
+    assert oct(os.stat(path).st_mode & 0o777) == "0o600"
+
+
+def test_replace_in_file_reports_missing_and_ambiguous_matches(sandbox, tmp_path):
+    path = str(tmp_path / "a.txt")
+    assert asyncio.run(replace_in_file(sandbox, path, "a", "b"))["status"] == "not_found"
+
+    asyncio.run(write_file(sandbox, path, "foo\nbar\nfoo\n"))
+    assert asyncio.run(replace_in_file(sandbox, path, "baz", "qux"))["status"] == "no_match"
+    assert asyncio.run(replace_in_file(sandbox, path, "foo", "qux")) == {"status": "multiple", "lines": [1, 3]}
+
+
+def test_write_file_existence_checks(sandbox, tmp_path):
+    path = str(tmp_path / "a.txt")
+    assert asyncio.run(write_file(sandbox, path, "x", must_exist=True))["status"] == "not_found"
+    asyncio.run(write_file(sandbox, path, "x"))
+    assert asyncio.run(write_file(sandbox, path, "y", must_not_exist=True))["status"] == "exists"
+
+
+def test_largest_inline_edit_runs(sandbox, tmp_path):
+    path = str(tmp_path / "a.txt")
+    content = "字" * 1024
+    while fits_inline(path, content + "字" * 1024):
+        content += "字" * 1024
+
+    assert asyncio.run(write_file(sandbox, path, content))["status"] == "ok"
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == content
+
+
+def test_oversized_edit_is_rejected(sandbox, tmp_path):
+    content = "x" * MAX_COMMAND_BYTES
+    with pytest.raises(ValueError):
+        asyncio.run(write_file(sandbox, str(tmp_path / "a.txt"), content))
+
+
+@pytest.mark.parametrize("inline", [True, False])
+def test_str_replace_reports_line(sandbox, tmp_path, monkeypatch, inline):
+    if not inline:
+        # Force the download/upload fallback used for large edits
+        monkeypatch.setattr(sb_files_tool, "fits_inline", lambda *args: False)
+    tool = SandboxFilesTool("project", None)
+    tool._sandbox = sandbox
+    tool.workspace_path = str(tmp_path)
+    (tmp_path / "a.py").write_text("import os\n\ndef main():\n    pass\n")
+
+    result = asyncio.run(tool.str_replace("a.py", "    pass", "    print(os.getcwd())"))
+
+    assert result.success
+    assert "line 4" in result.output
+    assert (tmp_path / "a.py").read_text() == "import os\n\ndef main():\n    print(os.getcwd())\n"
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sandbox.api import build_file_etag, parse_range_header
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),  # End is clamped to the file size
+    ("bytes=-5000", (0, 999)),  # Suffix longer than the file
+    ("bytes=5-5", (5, 5)),
+])
+def test_parse_range_header(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-10",  # Unknown unit
+    "bytes=0-10,20-30",  # Multiple ranges
+    "bytes=abc-def",
+    "bytes=-0",
+])
+def test_parse_range_header_serves_full_file(header):
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=50-10"])
+def test_parse_range_header_unsatisfiable(header):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header(header, 1000)
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers["Content-Range"] == "bytes */1000"
+
+
+def test_build_file_etag_changes_with_file():
+    assert build_file_etag(10, "2024-01-01") == build_file_etag(10, "2024-01-01")
+    assert build_file_etag(10, "2024-01-01") != build_file_etag(11, "2024-01-01")
+    assert build_file_etag(10, "2024-01-01").startswith('"')
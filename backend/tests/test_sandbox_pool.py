@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sandbox.pool import CLAIMED_AUTO_STOP_INTERVAL, SandboxPool
+
+pytestmark = pytest.mark.skipif(shutil.which("pkill") is None, reason="pkill is not installed")
+
+
+class LocalSandbox:
+    """Runs the prepare command locally, with the VNC files moved into a temporary directory."""
+
+    def __init__(self, tmp_path):
+        self.vnc_dir = tmp_path / "vnc"
+        self.bin_dir = tmp_path / "bin"
+        self.bin_dir.mkdir()
+        # Stand-in for vncpasswd -f, which writes the encrypted password to stdout
+        vncpasswd = self.bin_dir / "vncpasswd"
+        vncpasswd.write_text("#!/bin/sh\ncat\n")
+        vncpasswd.chmod(0o755)
+        self.labels = None
+        self.autostop_interval = None
+        self.process = SimpleNamespace(exec=self.exec)
+
+    def exec(self, command, timeout=None):
+        command = command.replace("/root/.vnc", str(self.vnc_dir))
+        env = {**os.environ, "PATH": f"{self.bin_dir}:{os.environ['PATH']}"}
+        # The SDK runs the command as a single sh argument
+        completed = subprocess.run(["sh", "-c", command], capture_output=True, text=True, timeout=timeout, env=env)
+        return SimpleNamespace(result=completed.stdout + completed.stderr, exit_code=completed.returncode)
+
+    def set_labels(self, labels):
+        self.labels = labels
+
+    def set_autostop_interval(self, interval):
+        self.autostop_interval = interval
+
+
+@pytest.fixture
+def fake_x11vnc(tmp_path):
+    """A long-running process named x11vnc, like the one supervisord runs."""
+    binary = tmp_path / "x11vnc"
+    shutil.copy(shutil.which("sleep"), binary)
+    process = subprocess.Popen([str(binary), "30"])
+    time.sleep(0.1)
+    yield process
+    process.kill()
+    process.wait()
+
+
+def test_prepare_claimed_sandbox_restarts_x11vnc(tmp_path, fake_x11vnc):
+    sandbox = LocalSandbox(tmp_path)
+    pool = SandboxPool("image", size=1)
+
+    # Raises if the command fails, e.g. because it killed its own shell
+    pool._prepare_claimed_sandbox(sandbox, "s3cret", "project-1")
+
+    assert (sandbox.vnc_dir / "suna_password").read_text().strip() == "s3cret"
+    assert (sandbox.vnc_dir / "passwd").read_text().strip() == "s3cret"
+    # x11vnc was killed, so supervisord restarts it with the new password
+    assert fake_x11vnc.wait(timeout=5) != 0
+    assert sandbox.labels == {"id": "project-1"}
+    assert sandbox.autostop_interval == CLAIMED_AUTO_STOP_INTERVAL
+
+
+def test_prepare_claimed_sandbox_without_running_x11vnc(tmp_path):
+    sandbox = LocalSandbox(tmp_path)
+
+    SandboxPool("image", size=1)._prepare_claimed_sandbox(sandbox, "s3cret", None)
+
+    assert sandbox.labels == {}
+    assert sandbox.autostop_interval == CLAIMED_AUTO_STOP_INTERVAL
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agentpress import tool_result_cache
+from agentpress.tool import ToolCachePolicy, ToolResult
+from agentpress.tool_result_cache import cache_result, get_cached_result, result_cache_key
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """In-memory replacement for the Redis get/set used by the cache."""
+    store = {}
+
+    async def get(key, default=None):
+        return store.get(key, default)
+
+    async def set(key, value, ex=None, nx=False):
+        store[key] = value
+        return True
+
+    monkeypatch.setattr(tool_result_cache.redis, "get", get)
+    monkeypatch.setattr(tool_result_cache.redis, "set", set)
+    return store
+
+
+def test_result_cache_key_ignores_argument_order():
+    policy = ToolCachePolicy(ttl=60)
+    assert (
+        result_cache_key(policy, "thread-1", "web_search", {"query": "x", "num_results": 5})
+        == result_cache_key(policy, "thread-1", "web_search", {"num_results": 5, "query": "x"})
+    )
+
+
+def test_result_cache_key_differs_by_arguments_function_and_scope():
+    thread_policy = ToolCachePolicy(ttl=60, scope="thread")
+    account_policy = ToolCachePolicy(ttl=60, scope="account")
+    key = result_cache_key(thread_policy, "id-1", "web_search", {"query": "x"})
+
+    assert key != result_cache_key(thread_policy, "id-1", "web_search", {"query": "y"})
+    assert key != result_cache_key(thread_policy, "id-1", "scrape_webpage", {"query": "x"})
+    assert key != result_cache_key(thread_policy, "id-2", "web_search", {"query": "x"})
+    # The same ID under a different scope does not share results
+    assert key != result_cache_key(account_policy, "id-1", "web_search", {"query": "x"})
+    assert key.startswith("tool_result_cache:thread:id-1:web_search:")
+
+
+def test_cached_result_round_trip(fake_redis):
+    key = result_cache_key(ToolCachePolicy(ttl=60), "thread-1", "web_search", {"query": "x"})
+
+    assert asyncio.run(get_cached_result(key)) is None
+    asyncio.run(cache_result(key, ToolResult(success=True, output="results"), ttl=60))
+
+    cached = asyncio.run(get_cached_result(key))
+    assert cached == ToolResult(success=True, output="results", cached=True)
+
+
+def test_failed_results_are_not_cached(fake_redis):
+    key = result_cache_key(ToolCachePolicy(ttl=60), "thread-1", "web_search", {"query": "x"})
+    asyncio.run(cache_result(key, ToolResult(success=False, output="error"), ttl=60))
+
+    assert fake_redis == {}
+    assert asyncio.run(get_cached_result(key)) is None
+
+
+def test_corrupt_cache_entry_is_a_miss(fake_redis):
+    fake_redis["key"] = "not json"
+    assert asyncio.run(get_cached_result("key")) is None
+
+
+def test_redis_errors_are_a_miss(monkeypatch):
+    async def failing_get(key, default=None):
+        raise ConnectionError("Redis unavailable")
+
+    monkeypatch.setattr(tool_result_cache.redis, "get", failing_get)
+    assert asyncio.run(get_cached_result("key")) is None
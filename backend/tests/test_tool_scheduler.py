@@ -0,0 +1,201 @@
+import asyncio
+import os
+import sys
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from agentpress.tool import ToolFootprint, ToolResult
+from agentpress.tool_scheduler import (
+    ResourceClaim,
+    ToolScheduler,
+    claims_conflict,
+    normalize_workspace_path,
+    resolve_claims,
+)
+
+FOOTPRINTS = {
+    "web_search": ToolFootprint(),
+    "read_file": ToolFootprint(reads=["workspace:file_path"]),
+    "write_file": ToolFootprint(writes=["workspace:file_path"]),
+    "execute_command": ToolFootprint(writes=["workspace"]),
+    "browser_click": ToolFootprint(writes=["browser"]),
+    "complete": ToolFootprint(terminating=True),
+}
+
+
+def call(function_name, **arguments):
+    return {"function_name": function_name, "arguments": arguments}
+
+
+def run_calls(tool_calls, duration=0.05, fail=()):
+    """Run calls through a scheduler, recording when each one starts and ends."""
+    events = []
+
+    async def execute(tool_call):
+        name = tool_call["function_name"]
+        arguments = tool_call["arguments"]
+        label = f"{name}({arguments.get('file_path') or arguments.get('query') or ''})"
+        events.append(("start", label))
+        await asyncio.sleep(duration)
+        events.append(("end", label))
+        if name in fail:
+            raise RuntimeError(f"{name} failed")
+        return ToolResult(success=True, output=label)
+
+    async def run():
+        scheduler = ToolScheduler(execute, FOOTPRINTS.get)
+        return scheduler, await scheduler.run_all(tool_calls)
+
+    scheduler, results = asyncio.run(run())
+    return scheduler, results, events
+
+
+def overlapped(events, a, b):
+    """Whether b started before a ended."""
+    return events.index(("start", b)) < events.index(("end", a))
+
+
+def test_normalize_workspace_path():
+    assert normalize_workspace_path("src/main.py") == "src/main.py"
+    assert normalize_workspace_path("/workspace/src/main.py") == "src/main.py"
+    assert normalize_workspace_path("./src/../src/main.py") == "src/main.py"
+    assert normalize_workspace_path("/workspace") is None
+    assert normalize_workspace_path("") is None
+    assert normalize_workspace_path(None) is None
+
+
+def test_resolve_claims_uses_path_argument():
+    claims = resolve_claims(FOOTPRINTS["write_file"], {"file_path": "/workspace/a.txt"})
+    assert claims == [ResourceClaim("workspace", "a.txt", True)]
+    # A missing path argument claims the whole workspace
+    assert resolve_claims(FOOTPRINTS["read_file"], {}) == [ResourceClaim("workspace", None, False)]
+
+
+def test_claims_conflict():
+    read_a = [ResourceClaim("workspace", "a.txt", False)]
+    write_a = [ResourceClaim("workspace", "a.txt", True)]
+    write_b = [ResourceClaim("workspace", "b.txt", True)]
+    write_dir = [ResourceClaim("workspace", "src", True)]
+    read_src_file = [ResourceClaim("workspace", "src/main.py", False)]
+    write_all = [ResourceClaim("workspace", None, True)]
+    browser = [ResourceClaim("browser", None, True)]
+
+    assert not claims_conflict(read_a, read_a)
+    assert claims_conflict(read_a, write_a)
+    assert not claims_conflict(write_a, write_b)
+    assert claims_conflict(write_dir, read_src_file)
+    assert not claims_conflict(write_dir, [ResourceClaim("workspace", "srcfile", False)])
+    assert claims_conflict(write_all, read_a)
+    assert not claims_conflict(browser, write_a)
+    assert not claims_conflict([], write_all)
+
+
+def test_independent_calls_run_concurrently():
+    _, results, events = run_calls([call("web_search", query="a"), call("web_search", query="b")])
+
+    assert overlapped(events, "web_search(a)", "web_search(b)")
+    assert [result.success for _, result in results] == [True, True]
+
+
+def test_conflicting_calls_keep_order():
+    _, results, events = run_calls([
+        call("write_file", file_path="a.txt"),
+        call("read_file", file_path="b.txt"),
+        call("read_file", file_path="a.txt"),
+    ])
+
+    # The read of another file overlaps the write, the read of the same file waits for it
+    assert overlapped(events, "write_file(a.txt)", "read_file(b.txt)")
+    assert events.index(("end", "write_file(a.txt)")) < events.index(("start", "read_file(a.txt)"))
+    # Results are returned in call order
+    assert [result.output for _, result in results] == ["write_file(a.txt)", "read_file(b.txt)", "read_file(a.txt)"]
+
+
+def test_calls_without_footprint_are_serialized():
+    _, _, events = run_calls([
+        call("web_search", query="a"),
+        call("unknown_tool"),
+        call("web_search", query="b"),
+    ])
+
+    assert [kind for kind, _ in events] == ["start", "end", "start", "end", "start", "end"]
+
+
+def test_terminating_tool_waits_and_skips_later_calls():
+    scheduler, results, events = run_calls([
+        call("web_search", query="a"),
+        call("complete"),
+        call("web_search", query="b"),
+    ])
+
+    assert scheduler.terminated_by == "complete"
+    assert [tool_call["function_name"] for tool_call, _ in results] == ["web_search", "complete"]
+    assert events == [
+        ("start", "web_search(a)"), ("end", "web_search(a)"),
+        ("start", "complete()"), ("end", "complete()"),
+    ]
+
+
+def test_schedule_after_terminating_tool_is_not_executed():
+    executed = []
+
+    async def execute(tool_call):
+        executed.append(tool_call["function_name"])
+        return ToolResult(success=True, output="")
+
+    async def run():
+        scheduler = ToolScheduler(execute, FOOTPRINTS.get)
+        await scheduler.schedule(call("complete"))
+        return await scheduler.schedule(call("web_search", query="a"))
+
+    result = asyncio.run(run())
+    assert executed == ["complete"]
+    assert not result.success
+
+
+def test_failed_call_does_not_block_dependents():
+    _, results, _ = run_calls(
+        [call("write_file", file_path="a.txt"), call("read_file", file_path="a.txt")],
+        fail=("write_file",),
+    )
+
+    assert not results[0][1].success
+    assert "write_file failed" in results[0][1].output
+    assert results[1][1].success
+
+
+def test_browser_actions_wait_for_workspace_writes():
+    from agent.tools.sb_browser_tool import SandboxBrowserTool
+    from agent.tools.sb_files_tool import SandboxFilesTool
+    from agent.tools.sb_shell_tool import SandboxShellTool
+
+    # Footprints as declared by the tools
+    footprints = {
+        "create_file": SandboxFilesTool.create_file.tool_footprint,
+        "execute_command": SandboxShellTool.execute_command.tool_footprint,
+        "browser_navigate_to": SandboxBrowserTool.browser_navigate_to.tool_footprint,
+    }
+    events = []
+
+    async def execute(tool_call):
+        events.append(("start", tool_call["function_name"]))
+        await asyncio.sleep(0.05)
+        events.append(("end", tool_call["function_name"]))
+        return ToolResult(success=True, output="")
+
+    async def run(tool_calls):
+        events.clear()
+        await ToolScheduler(execute, footprints.get).run_all(tool_calls)
+        return [name for _, name in events]
+
+    # A page written to the workspace, then opened
+    assert asyncio.run(run([
+        call("create_file", file_path="index.html"),
+        call("browser_navigate_to", url="file:///workspace/index.html"),
+    ])) == ["create_file", "create_file", "browser_navigate_to", "browser_navigate_to"]
+    # A server started, then visited
+    assert asyncio.run(run([
+        call("execute_command", command="python -m http.server 8080"),
+        call("browser_navigate_to", url="http://localhost:8080"),
+    ])) == ["execute_command", "execute_command", "browser_navigate_to", "browser_navigate_to"]
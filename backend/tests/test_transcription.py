@@ -0,0 +1,72 @@
+import os
+import sys
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from services.transcription import (
+    SEGMENT_OVERLAP_SECONDS,
+    SEGMENT_SECONDS,
+    _parse_duration,
+    _parse_progress_duration,
+    _plan_segments,
+    stitch_transcripts,
+)
+
+
+def test_plan_segments_covers_recording_with_overlap():
+    duration = SEGMENT_SECONDS * 2.5
+    segments = _plan_segments(duration)
+
+    assert [start for start, _ in segments] == [0, SEGMENT_SECONDS, SEGMENT_SECONDS * 2]
+    assert segments[0][1] == SEGMENT_SECONDS + SEGMENT_OVERLAP_SECONDS
+    assert segments[1][1] == SEGMENT_SECONDS + SEGMENT_OVERLAP_SECONDS
+    # The last segment ends with the recording
+    start, length = segments[-1]
+    assert start + length == duration
+
+
+def test_plan_segments_exact_multiple_has_no_empty_segment():
+    segments = _plan_segments(SEGMENT_SECONDS * 2)
+
+    assert len(segments) == 2
+    assert all(length > 0 for _, length in segments)
+
+
+def test_plan_segments_short_recording_is_one_segment():
+    assert _plan_segments(10) == [(0.0, 10)]
+    assert _plan_segments(0) == []
+
+
+def test_stitch_transcripts_drops_overlapping_words():
+    stitched = stitch_transcripts("the quick brown fox jumps", "fox jumps over the lazy dog")
+    assert stitched == "the quick brown fox jumps over the lazy dog"
+
+
+def test_stitch_transcripts_ignores_case_and_punctuation_in_overlap():
+    stitched = stitch_transcripts("We met at the Station.", "the station, and then left")
+    assert stitched == "We met at the Station. and then left"
+
+
+def test_stitch_transcripts_without_overlap_concatenates():
+    assert stitch_transcripts("first part", "second part") == "first part second part"
+
+
+def test_stitch_transcripts_with_empty_transcripts():
+    assert stitch_transcripts("", "hello world") == "hello world"
+    assert stitch_transcripts("hello world", "") == "hello world"
+
+
+def test_parse_duration_skips_unknown_values():
+    assert _parse_duration("N/A\n12.5\n") == 12.5
+    assert _parse_duration("N/A\nN/A\n") is None
+    assert _parse_duration("") is None
+
+
+def test_parse_progress_duration_uses_last_position():
+    output = (
+        "out_time_us=30000000\nout_time=00:00:30.000000\nprogress=continue\n"
+        "out_time_us=3723500000\nout_time=01:02:03.500000\nprogress=end\n"
+    )
+    assert _parse_progress_duration(output) == 3723.5
+    assert _parse_progress_duration("progress=end\n") is None
@@ -0,0 +1,84 @@
+import os
+import sys
+
+# Add the backend directory to the path (go up one level from tests/)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from sandbox.workspace_manifest import ContentCache, ManifestEntry, WorkspaceManifest, diff_manifests
+
+
+def make_manifest(files):
+    manifest = WorkspaceManifest(root="/workspace")
+    for path, digest in files.items():
+        manifest.entries[path] = ManifestEntry(path=path, size=1, mtime=0.0, hash=digest)
+    return manifest
+
+
+def test_diff_manifests_by_content_hash():
+    old = make_manifest({"a.txt": "1", "b.txt": "2", "src/c.py": "3"})
+    new = make_manifest({"a.txt": "1", "b.txt": "20", "src/d.py": "4", "e.txt": "5"})
+
+    diff = diff_manifests(old, new)
+
+    assert diff.added == ["e.txt", "src/d.py"]
+    assert diff.modified == ["b.txt"]
+    assert diff.deleted == ["src/c.py"]
+    assert diff.changed == ["e.txt", "src/d.py", "b.txt"]
+    assert not diff.is_empty()
+
+
+def test_diff_manifests_without_previous_reports_everything_added():
+    diff = diff_manifests(None, make_manifest({"b.txt": "2", "a.txt": "1"}))
+
+    assert diff.added == ["a.txt", "b.txt"]
+    assert diff.modified == [] and diff.deleted == []
+
+
+def test_diff_manifests_identical_is_empty():
+    manifest = make_manifest({"a.txt": "1"})
+    assert diff_manifests(manifest, make_manifest({"a.txt": "1"})).is_empty()
+
+
+def test_manifest_version_depends_on_content():
+    assert make_manifest({"a.txt": "1"}).version == make_manifest({"a.txt": "1"}).version
+    assert make_manifest({"a.txt": "1"}).version != make_manifest({"a.txt": "2"}).version
+
+
+def test_manifest_json_round_trip():
+    manifest = make_manifest({"a.txt": "1", "src/b.py": "2"})
+    assert WorkspaceManifest.from_json(manifest.to_json()) == manifest
+
+
+def test_content_cache_evicts_least_recently_used():
+    cache = ContentCache(max_size=25)
+    cache.put("h1", "x" * 8)
+    cache.put("h2", "y" * 8)
+    # Reading h1 makes h2 the least recently used entry
+    assert cache.get("h1") == "x" * 8
+    cache.put("h3", "z" * 8)
+
+    assert "h1" in cache and "h3" in cache
+    assert "h2" not in cache
+    assert cache.size <= cache.max_size
+
+
+def test_content_cache_remembers_binary_files():
+    cache = ContentCache()
+    cache.put("h1", None)
+    assert "h1" in cache
+    assert cache.get("h1") is None
+
+
+def test_content_cache_skips_entries_larger_than_limit():
+    cache = ContentCache(max_size=10)
+    cache.put("h1", "x" * 100)
+    assert "h1" not in cache
+    assert cache.size == 0
+
+
+def test_content_cache_replacing_entry_updates_size():
+    cache = ContentCache()
+    cache.put("h1", "x" * 10)
+    cache.put("h1", "x" * 4)
+    assert len(cache) == 1
+    assert cache.size == len("h1") + 4
@@ -161,6 +161,10 @@ class Configuration:
     # Sandbox configuration
     SANDBOX_IMAGE_NAME = "kortix/suna:0.1.3"
     SANDBOX_ENTRYPOINT = "/usr/bin/supervisord -n -c /etc/supervisor/conf.d/supervisord.conf"
+    
+    # Warm sandbox pool (0 disables the pool)
+    SANDBOX_POOL_SIZE: int = 0
+    SANDBOX_POOL_REFILL_INTERVAL: int = 60
 
     # LangFuse configuration
     LANGFUSE_PUBLIC_KEY: Optional[str] = None
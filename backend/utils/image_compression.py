@@ -0,0 +1,83 @@
+"""
+Image compression for images sent to the LLM.
+
+Kept free of application imports so it can run in worker processes.
+"""
+
+from io import BytesIO
+from typing import Tuple
+
+from PIL import Image
+
+# Compression settings
+DEFAULT_MAX_WIDTH = 1920
+DEFAULT_MAX_HEIGHT = 1080
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+
+
+def compress_image_bytes(image_bytes: bytes, mime_type: str, file_path: str) -> Tuple[bytes, str]:
+    """Compress an image to reduce its size while maintaining reasonable quality.
+    
+    Runs in worker processes, so this module only depends on PIL.
+    
+    Args:
+        image_bytes: Original image bytes
+        mime_type: MIME type of the image
+        file_path: Path to the image file (for logging)
+        
+    Returns:
+        Tuple of (compressed_bytes, new_mime_type)
+    """
+    try:
+        # Open image from bytes
+        img = Image.open(BytesIO(image_bytes))
+        
+        # Convert RGBA to RGB if necessary (for JPEG)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Create a white background
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        
+        # Calculate new dimensions while maintaining aspect ratio
+        width, height = img.size
+        if width > DEFAULT_MAX_WIDTH or height > DEFAULT_MAX_HEIGHT:
+            ratio = min(DEFAULT_MAX_WIDTH / width, DEFAULT_MAX_HEIGHT / height)
+            new_width = int(width * ratio)
+            new_height = int(height * ratio)
+            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            print(f"[SeeImage] Resized image from {width}x{height} to {new_width}x{new_height}")
+        
+        # Save to bytes with compression
+        output = BytesIO()
+        
+        # Determine output format based on original mime type
+        if mime_type == 'image/gif':
+            # Keep GIFs as GIFs to preserve animation
+            img.save(output, format='GIF', optimize=True)
+            output_mime = 'image/gif'
+        elif mime_type == 'image/png':
+            # Compress PNG
+            img.save(output, format='PNG', optimize=True, compress_level=DEFAULT_PNG_COMPRESS_LEVEL)
+            output_mime = 'image/png'
+        else:
+            # Convert everything else to JPEG for better compression
+            img.save(output, format='JPEG', quality=DEFAULT_JPEG_QUALITY, optimize=True)
+            output_mime = 'image/jpeg'
+        
+        compressed_bytes = output.getvalue()
+        
+        # Log compression results
+        original_size = len(image_bytes)
+        compressed_size = len(compressed_bytes)
+        compression_ratio = (1 - compressed_size / original_size) * 100
+        print(f"[SeeImage] Compressed '{file_path}' from {original_size / 1024:.1f}KB to {compressed_size / 1024:.1f}KB ({compression_ratio:.1f}% reduction)")
+        
+        return compressed_bytes, output_mime
+        
+    except Exception as e:
+        print(f"[SeeImage] Failed to compress image: {str(e)}. Using original.")
+        return image_bytes, mime_type
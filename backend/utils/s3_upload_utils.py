@@ -3,18 +3,90 @@ Utility functions for handling image operations.
 """
 
 import base64
-import uuid
-from datetime import datetime
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
 from utils.logger import logger
 from services.supabase import DBConnection
 
+# Object names known to exist in storage, so repeated uploads skip the round trip
+_KNOWN_UPLOADS: "OrderedDict[str, str]" = OrderedDict()
+_KNOWN_UPLOADS_MAX = 1024
+
+
+def detect_image_type(image_data: bytes) -> Tuple[str, str]:
+    """Return the (content type, file extension) of image bytes based on their signature."""
+    if image_data.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg", "jpg"
+    if image_data.startswith(b'RIFF') and image_data[8:12] == b'WEBP':
+        return "image/webp", "webp"
+    if image_data.startswith((b'GIF87a', b'GIF89a')):
+        return "image/gif", "gif"
+    return "image/png", "png"
+
+
+def _is_duplicate_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return "duplicate" in message or "already exists" in message or "409" in message
+
+
+async def upload_image_bytes(image_data: bytes, bucket_name: str = "browser-screenshots", content_type: Optional[str] = None) -> str:
+    """Upload image bytes to Supabase storage under a content-addressed name and return the URL.
+
+    The object name is the SHA-256 of the bytes, so identical images are stored
+    once and uploading an image that already exists only resolves its URL.
+
+    Args:
+        image_data (bytes): Raw image data
+        bucket_name (str): Name of the storage bucket to upload to
+        content_type (str, optional): MIME type; detected from the data if omitted
+
+    Returns:
+        str: Public URL of the uploaded image
+    """
+    try:
+        detected_type, extension = detect_image_type(image_data)
+        filename = f"{hashlib.sha256(image_data).hexdigest()}.{extension}"
+        cache_key = f"{bucket_name}/{filename}"
+        if cache_key in _KNOWN_UPLOADS:
+            _KNOWN_UPLOADS.move_to_end(cache_key)
+            return _KNOWN_UPLOADS[cache_key]
+
+        db = DBConnection()
+        client = await db.client
+        try:
+            await client.storage.from_(bucket_name).upload(
+                filename,
+                image_data,
+                {"content-type": content_type or detected_type}
+            )
+        except Exception as e:
+            if not _is_duplicate_error(e):
+                raise
+            logger.debug(f"Image {filename} already exists in {bucket_name}")
+
+        # Get public URL
+        public_url = await client.storage.from_(bucket_name).get_public_url(filename)
+
+        _KNOWN_UPLOADS[cache_key] = public_url
+        if len(_KNOWN_UPLOADS) > _KNOWN_UPLOADS_MAX:
+            _KNOWN_UPLOADS.popitem(last=False)
+
+        logger.debug(f"Successfully uploaded image to {public_url}")
+        return public_url
+
+    except Exception as e:
+        logger.error(f"Error uploading image: {e}")
+        raise RuntimeError(f"Failed to upload image: {str(e)}")
+
+
 async def upload_base64_image(base64_data: str, bucket_name: str = "browser-screenshots") -> str:
     """Upload a base64 encoded image to Supabase storage and return the URL.
-    
+
     Args:
         base64_data (str): Base64 encoded image data (with or without data URL prefix)
         bucket_name (str): Name of the storage bucket to upload to
-        
+
     Returns:
         str: Public URL of the uploaded image
     """
@@ -22,30 +94,11 @@ async def upload_base64_image(base64_data: str, bucket_name: str = "browser-scre
         # Remove data URL prefix if present
         if base64_data.startswith('data:'):
             base64_data = base64_data.split(',')[1]
-        
+
         # Decode base64 data
         image_data = base64.b64decode(base64_data)
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"image_{timestamp}_{unique_id}.png"
-        
-        # Upload to Supabase storage
-        db = DBConnection()
-        client = await db.client
-        storage_response = await client.storage.from_(bucket_name).upload(
-            filename,
-            image_data,
-            {"content-type": "image/png"}
-        )
-        
-        # Get public URL
-        public_url = await client.storage.from_(bucket_name).get_public_url(filename)
-        
-        logger.debug(f"Successfully uploaded image to {public_url}")
-        return public_url
-        
     except Exception as e:
-        logger.error(f"Error uploading base64 image: {e}")
-        raise RuntimeError(f"Failed to upload image: {str(e)}") 
\ No newline at end of file
+        logger.error(f"Error decoding base64 image: {e}")
+        raise RuntimeError(f"Failed to upload image: {str(e)}")
+
+    return await upload_image_bytes(image_data, bucket_name)
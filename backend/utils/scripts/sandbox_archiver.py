@@ -0,0 +1,301 @@
+"""
+Shared engine for the sandbox archival scripts.
+
+Projects are streamed from the database page by page with the filters applied
+server-side, and their sandboxes are archived by a bounded pool of workers.
+All Daytona calls go through a shared rate limiter. Optionally, every archived
+sandbox is appended to a checkpoint file, so an interrupted run can be started
+again with the same checkpoint and only the remaining sandboxes are processed.
+Sandboxes that were skipped or failed are not recorded and are retried, and the
+checkpoint is deleted once a run completes.
+
+Usage from a script:
+    stats = await run_archival(client, created_before=threshold, checkpoint_path="archive.checkpoint")
+"""
+
+import asyncio
+import json
+import os
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from daytona_sdk import SandboxState
+
+from sandbox.sandbox import daytona
+from utils.logger import logger
+
+PAGE_SIZE = 1000
+
+# Excluded accounts are sent to the database as a NOT IN filter up to this
+# many ids; larger sets would exceed URL limits and are filtered per page.
+MAX_SERVER_SIDE_ACCOUNT_FILTER = 200
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE_LIMIT = 5.0
+PROGRESS_INTERVAL = 10
+
+
+@dataclass
+class ArchiveStats:
+    """Counters for an archival run."""
+    queued: int = 0
+    archived: int = 0
+    skipped: int = 0
+    resumed: int = 0
+    failed: int = 0
+    errors: Counter = field(default_factory=Counter)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def processed(self) -> int:
+        return self.archived + self.skipped + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Processed sandboxes per second."""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        line = (
+            f"{self.processed}/{self.queued} processed in {self.elapsed:.0f}s "
+            f"({self.throughput:.1f}/s) - archived: {self.archived}, skipped: {self.skipped}, "
+            f"failed: {self.failed}, already done: {self.resumed}"
+        )
+        if self.errors:
+            line += f", errors: {dict(self.errors)}"
+        return line
+
+
+class RateLimiter:
+    """Spaces out calls so that at most `rate` calls per second are started."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Checkpoint:
+    """Append-only file of sandbox ids that have already been archived."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: Set[str] = set()
+        self._file = None
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    self.done.add(json.loads(line)["sandbox_id"])
+                except (ValueError, KeyError):
+                    continue
+        logger.info(f"Loaded {len(self.done)} completed sandboxes from checkpoint {self.path}")
+
+    def record(self, sandbox_id: str, status: str):
+        self.done.add(sandbox_id)
+        if not self.path:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps({"sandbox_id": sandbox_id, "status": status}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Delete the checkpoint file after a completed run."""
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"Removed checkpoint {self.path} after completed run")
+
+
+def _apply_filters(query, created_before: Optional[datetime], exclude_account_ids: Optional[Set[str]]):
+    query = query.not_.is_('sandbox', 'null')
+    if created_before:
+        query = query.lt('created_at', created_before.isoformat())
+    if exclude_account_ids and len(exclude_account_ids) <= MAX_SERVER_SIDE_ACCOUNT_FILTER:
+        query = query.not_.in_('account_id', list(exclude_account_ids))
+    return query
+
+
+async def count_projects(
+    client,
+    created_before: Optional[datetime] = None,
+    exclude_account_ids: Optional[Set[str]] = None,
+) -> int:
+    """
+    Count projects with a sandbox matching the filters.
+
+    When the excluded accounts are filtered per page, this is an upper bound.
+    """
+    query = client.table('projects').select('project_id', count='exact')
+    result = await _apply_filters(query, created_before, exclude_account_ids).limit(1).execute()
+    return result.count or 0
+
+
+async def iter_projects(
+    client,
+    created_before: Optional[datetime] = None,
+    exclude_account_ids: Optional[Set[str]] = None,
+    page_size: int = PAGE_SIZE,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield projects with a sandbox matching the filters.
+
+    Pages are fetched by keyset on project_id rather than by offset, so each
+    page costs the same no matter how deep into the table it is.
+    """
+    last_project_id = None
+    while True:
+        query = client.table('projects').select('project_id', 'name', 'created_at', 'account_id', 'sandbox')
+        query = _apply_filters(query, created_before, exclude_account_ids)
+        if last_project_id:
+            query = query.gt('project_id', last_project_id)
+        result = await query.order('project_id').limit(page_size).execute()
+
+        for project in result.data:
+            if not (project.get('sandbox') or {}).get('id'):
+                continue
+            if exclude_account_ids and project.get('account_id') in exclude_account_ids:
+                continue
+            yield project
+
+        if len(result.data) < page_size:
+            return
+        last_project_id = result.data[-1]['project_id']
+
+
+def _load_sandbox_states() -> Dict[str, Any]:
+    """Fetch every sandbox in one call so sandboxes that are not stopped can be skipped without a lookup."""
+    return {sandbox.id: sandbox for sandbox in daytona.list()}
+
+
+def _archive(sandbox_id: str, known_sandbox) -> str:
+    sandbox = known_sandbox or daytona.get(sandbox_id)
+    if sandbox.state != SandboxState.STOPPED:
+        logger.debug(f"Skipping sandbox {sandbox_id} as it is not in stopped state (current: {sandbox.state})")
+        return "skipped"
+    sandbox.archive()
+    logger.info(f"Successfully archived sandbox {sandbox_id}")
+    return "archived"
+
+
+async def _report_progress(stats: ArchiveStats, interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        print(f"Progress: {stats.summary()}")
+
+
+async def run_archival(
+    client,
+    created_before: Optional[datetime] = None,
+    exclude_account_ids: Optional[Set[str]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate_limit: float = DEFAULT_RATE_LIMIT,
+    checkpoint_path: Optional[str] = None,
+    dry_run: bool = False,
+    progress_interval: int = PROGRESS_INTERVAL,
+) -> ArchiveStats:
+    """
+    Archive the stopped sandboxes of all projects matching the filters.
+
+    Args:
+        client: Supabase client
+        created_before: Only projects created before this time
+        exclude_account_ids: Skip projects owned by these accounts
+        concurrency: Number of sandboxes processed at the same time
+        rate_limit: Maximum Daytona calls started per second (0 disables the limit)
+        checkpoint_path: File recording archived sandboxes; reusing it resumes an
+            interrupted run. Deleted when the run completes.
+        dry_run: Only report what would be archived
+        progress_interval: Seconds between progress reports
+
+    Returns:
+        ArchiveStats for the run
+    """
+    stats = ArchiveStats()
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.load()
+    limiter = RateLimiter(rate_limit)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+
+    known_sandboxes: Dict[str, Any] = {}
+    if not dry_run:
+        try:
+            known_sandboxes = await asyncio.to_thread(_load_sandbox_states)
+            logger.info(f"Loaded state of {len(known_sandboxes)} sandboxes from Daytona")
+        except Exception as e:
+            logger.warning(f"Could not list sandboxes, falling back to per-sandbox lookups: {str(e)}")
+
+    async def worker():
+        while True:
+            project = await queue.get()
+            if project is None:
+                return
+            sandbox_id = project['sandbox']['id']
+            try:
+                if dry_run:
+                    print(f"Would archive sandbox {sandbox_id} for project '{project.get('name', 'Unknown')}' (Created: {project.get('created_at', 'Unknown')})")
+                    stats.archived += 1
+                    continue
+
+                known = known_sandboxes.get(sandbox_id)
+                if known is not None and known.state != SandboxState.STOPPED:
+                    status = "skipped"
+                else:
+                    await limiter.wait()
+                    status = await asyncio.to_thread(_archive, sandbox_id, known)
+                setattr(stats, status, getattr(stats, status) + 1)
+                # Skipped sandboxes may be stopped by the next run, so only archived ones are done
+                if status == "archived":
+                    checkpoint.record(sandbox_id, status)
+            except Exception as e:
+                stats.failed += 1
+                stats.errors[type(e).__name__] += 1
+                logger.error(f"Error processing sandbox {sandbox_id}: {str(e)}\n{traceback.format_exc()}")
+
+    workers: List[asyncio.Task] = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    reporter = asyncio.create_task(_report_progress(stats, progress_interval))
+    try:
+        async for project in iter_projects(client, created_before, exclude_account_ids):
+            if project['sandbox']['id'] in checkpoint.done:
+                stats.resumed += 1
+                continue
+            stats.queued += 1
+            await queue.put(project)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers + [reporter]:
+            task.cancel()
+        checkpoint.close()
+    checkpoint.remove()
+
+    logger.info(f"Sandbox archival finished: {stats.summary()}")
+    return stats
@@ -96,6 +96,7 @@ export const getToolIcon = (toolName: string): ElementType => {
     case 'browser-select-dropdown-option':
     case 'browser-scroll-to-text':
     case 'browser-wait':
+    case 'browser-get-screen-text':
       return Globe;
 
     // File operations
@@ -317,6 +318,7 @@ const TOOL_DISPLAY_NAMES = new Map([
   ['browser-send-keys', 'Pressing Keys'],
   ['browser-switch-tab', 'Switching Tab'],
   ['browser-wait', 'Waiting'],
+  ['browser-get-screen-text', 'Reading Screen Text'],
 
   ['execute-data-provider-call', 'Calling data provider'],
   ['execute_data_provider_call', 'Calling data provider'],
@@ -369,6 +371,7 @@ const TOOL_DISPLAY_NAMES = new Map([
   ['browser_send_keys', 'Pressing Keys'],
   ['browser_switch_tab', 'Switching Tab'],
   ['browser_wait', 'Waiting'],
+  ['browser_get_screen_text', 'Reading Screen Text'],
 
   ['execute_data_provider_call', 'Calling data provider'],
   ['get_data_provider_endpoints', 'Getting endpoints'],